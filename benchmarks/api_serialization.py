@@ -0,0 +1,112 @@
+"""
+Time JSON API pages of up to 1000 books.
+
+Seeds ``--copies`` book copies when the benchmark database is empty, then
+requests ``/catalog/api/v1/books/`` pages through the test client for
+several field sets, and separately times ``values()`` serialization of an
+already fetched page against building model instances for the same rows.
+
+    python -m benchmarks.api_serialization
+    DATABASE_URL=postgres://... python -m benchmarks.api_serialization
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.common import seed, setup_django, timed
+
+FIELD_SETS = [
+    "id,title",
+    "id,title,author,isbn",
+    "id,title,author_last_name,language,copies_available",
+    "id,title,author_last_name,genres,copies,copies_available",
+]
+
+
+def median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.test import Client
+
+    from catalog import api
+    from catalog.models import Book
+
+    with timed("seed %d copies" % args.copies):
+        seed(copies=args.copies)
+
+    client = Client()
+    for fields in FIELD_SETS:
+
+        def request(fields=fields):
+            # Без кэша страниц и ETag: каждый раз полный ответ.
+            cache.clear()
+            response = client.get(
+                "/catalog/api/v1/books/",
+                {"fields": fields, "limit": args.limit},
+                secure=True,
+                HTTP_HOST="127.0.0.1",
+            )
+            assert response.status_code == 200, response.content
+
+        print(
+            "request %-55s %7.2f ms"
+            % (fields, median_ms(request, args.repeat))
+        )
+
+    fields = api.BOOKS.parse_fields(FIELD_SETS[1])
+    rows = list(api.BOOKS.queryset(fields)[: args.limit])
+    print(
+        "serialize %d rows from values()            %7.2f ms"
+        % (
+            len(rows),
+            median_ms(lambda: api.BOOKS.serialize(rows, fields), args.repeat),
+        )
+    )
+    print(
+        "fetch %d model instances (for comparison)   %7.2f ms"
+        % (
+            len(rows),
+            median_ms(
+                lambda: list(
+                    Book.objects.select_related("author").order_by(
+                        "title", "id"
+                    )[: args.limit]
+                ),
+                args.repeat,
+            ),
+        )
+    )
+    print(
+        "fetch %d values() rows                      %7.2f ms"
+        % (
+            len(rows),
+            median_ms(
+                lambda: list(
+                    api.BOOKS.queryset(fields).order_by("title", "id")[
+                        : args.limit
+                    ]
+                ),
+                args.repeat,
+            ),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
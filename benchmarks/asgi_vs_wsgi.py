@@ -0,0 +1,165 @@
+"""
+Compare catalog pages served by sync views under WSGI with the async
+views under ASGI.
+
+Seeds ``--copies`` book copies when the benchmark database is empty, then
+starts each server in turn on the same database and drives it with a
+closed-loop load generator: ``--concurrency`` threads, each with its own
+keep-alive connection, request the catalog pages for ``--duration``
+seconds. Requests per second and latency percentiles are printed per
+server. The servers are not project dependencies; install them first:
+
+    pip install gunicorn uvicorn
+    python -m benchmarks.asgi_vs_wsgi
+    python -m benchmarks.asgi_vs_wsgi --concurrency 64 --workers 4
+    DATABASE_URL=postgres://... python -m benchmarks.asgi_vs_wsgi
+
+Both servers run with ``DEBUG=1`` (no HTTPS redirect and rate limiting),
+which also records executed SQL; the overhead is the same for both.
+"""
+
+import argparse
+import http.client
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import threading
+import time
+
+from benchmarks.common import BASE_DIR, seed, setup_django, timed
+
+SERVERS = {
+    "wsgi": (
+        "gunicorn --bind 127.0.0.1:{port} --workers {workers} "
+        "--threads {threads} locallibrary.wsgi"
+    ),
+    "asgi": (
+        "uvicorn --host 127.0.0.1 --port {port} --workers {workers} "
+        "--no-access-log locallibrary.asgi:application"
+    ),
+}
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port)
+            connection.request("GET", "/catalog/")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server on port %d did not start." % port)
+
+
+def load(port, paths, concurrency, duration):
+    """Return request latencies (seconds) and the number of errors."""
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+
+    def client(number):
+        rng = random.Random(number)
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        timings, failed = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request("GET", rng.choice(paths))
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                continue
+            timings.append(time.perf_counter() - started)
+        latencies.extend(timings)
+        errors.append(failed)
+
+    threads = [
+        threading.Thread(target=client, args=(number,))
+        for number in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("servers", nargs="*", default=list(SERVERS))
+    args = parser.parse_args()
+
+    setup_django()
+    from catalog.models import Author, Book
+
+    with timed("seed %d copies" % args.copies):
+        seed(copies=args.copies)
+    rng = random.Random(0)
+    book_ids = list(Book.objects.values_list("id", flat=True)[:1000])
+    author_ids = list(Author.objects.values_list("id", flat=True)[:1000])
+    paths = (
+        ["/catalog/", "/catalog/books/", "/catalog/authors/"]
+        + ["/catalog/book/%d" % pk for pk in rng.sample(book_ids, 20)]
+        + [
+            "/catalog/authors/%d" % pk
+            for pk in rng.sample(author_ids, min(len(author_ids), 20))
+        ]
+    )
+
+    environ = dict(os.environ, DEBUG="1")
+    for name in args.servers:
+        command = SERVERS[name].format(
+            port=args.port, workers=args.workers, threads=args.threads
+        )
+        program = command.split()[0]
+        if shutil.which(program) is None:
+            print("%s: %s is not installed, skipped" % (name, program))
+            continue
+        # Под WSGI - синхронные views, под ASGI - catalog.async_views.
+        environ["CATALOG_ASYNC_VIEWS"] = "1" if name == "asgi" else ""
+        server = subprocess.Popen(
+            command.split(),
+            cwd=BASE_DIR,
+            env=environ,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_up(args.port)
+            # Прогрев кэшей страниц и соединений с базой.
+            load(args.port, paths, args.concurrency, 2)
+            latencies, errors = load(
+                args.port, paths, args.concurrency, args.duration
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            "%s: %8.1f req/s  p50 %6.1f ms  p99 %6.1f ms  errors %d"
+            % (
+                name,
+                len(latencies) / args.duration,
+                quantiles[49] * 1000,
+                quantiles[98] * 1000,
+                errors,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Shared helpers for the benchmark scripts in this package.
+
+Benchmarks run against ``DATABASE_URL`` (PostgreSQL or SQLite) and default
+to a throwaway ``bench.sqlite3`` next to ``manage.py`` so that the
+development database is never touched.
+"""
+
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(migrate=True):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "locallibrary.settings")
+    os.environ.setdefault(
+        "DATABASE_URL", "sqlite:///%s" % (BASE_DIR / "bench.sqlite3")
+    )
+    os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    if migrate:
+        call_command("migrate", verbosity=0)
+
+
+def analyze():
+    """Refresh planner statistics after seeding."""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+@contextmanager
+def timed(label):
+    started = time.perf_counter()
+    yield
+    print("%-40s %8.3f s" % (label, time.perf_counter() - started))
+
+
+def rss_mb():
+    """Current resident set size (peak size where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # ru_maxrss: килобайты на Linux, байты на macOS.
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (2**20 if os.uname().sysname == "Darwin" else 2**10)
+
+
+def seed(copies, books=None, batch_size=10_000, seed=0):
+    """
+    Fill an empty catalog with ``copies`` book copies spread over
+    ``books`` titles (10 copies per title by default).
+    """
+    from catalog.models import Book
+    from catalog.seeding import seed_catalog
+
+    if Book.objects.exists():
+        return
+    books = books or max(copies // 10, 1)
+    seed_catalog(
+        books,
+        copies_per_book=max(copies // books, 1),
+        seed=seed,
+        batch_size=batch_size,
+    )
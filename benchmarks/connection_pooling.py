@@ -0,0 +1,152 @@
+"""
+Compare PostgreSQL connection handling: a new connection per request,
+persistent connections and the psycopg pool (``DATABASE_POOL=1``).
+
+First measures the cost of getting a connection and running one query
+in this process: ``psycopg.connect()`` against a ``ConnectionPool``
+checkout. Then seeds ``--copies`` book copies when the database is empty
+and starts the server once per mode, driving it with the load generator
+of ``benchmarks.asgi_vs_wsgi``. The server runs with the ``dummy://``
+cache, so that every page reaches the database instead of the page
+cache. Requests per second and latency percentiles are printed per
+server and mode. Needs PostgreSQL, ``psycopg[pool]`` and the servers:
+
+    pip install "psycopg[binary,pool]" gunicorn uvicorn
+    DATABASE_URL=postgres://... python -m benchmarks.connection_pooling
+    DATABASE_URL=postgres://... python -m benchmarks.connection_pooling \\
+        --server asgi --concurrency 64 new pool
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import time
+
+from benchmarks.asgi_vs_wsgi import SERVERS, load, wait_until_up
+from benchmarks.common import BASE_DIR, seed, setup_django, timed
+
+# Режим: переменные окружения сервера.
+MODES = {
+    "new": {"DATABASE_CONN_MAX_AGE": "0", "DATABASE_POOL": ""},
+    "persistent": {"DATABASE_CONN_MAX_AGE": "500", "DATABASE_POOL": ""},
+    "pool": {"DATABASE_POOL": "1"},
+}
+
+
+def connection_cost(rounds):
+    """Mean seconds to connect and query, without and with a pool."""
+    import psycopg
+    from django.db import connection
+    from psycopg_pool import ConnectionPool
+
+    params = connection.get_connection_params()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        with psycopg.connect(**params) as new:
+            new.execute("SELECT 1")
+    direct = (time.perf_counter() - started) / rounds
+
+    with ConnectionPool(kwargs=params, min_size=1, max_size=1) as pool:
+        pool.wait()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            with pool.connection() as pooled:
+                pooled.execute("SELECT 1")
+        pooled = (time.perf_counter() - started) / rounds
+    return direct, pooled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--server", choices=SERVERS, default="wsgi")
+    parser.add_argument("modes", nargs="*", default=list(MODES))
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    from catalog.models import Author, Book
+
+    if connection.vendor != "postgresql":
+        parser.error("set DATABASE_URL to a PostgreSQL database")
+
+    direct, pooled = connection_cost(args.rounds)
+    print(
+        "connect + SELECT 1: %.2f ms new, %.2f ms from pool"
+        % (direct * 1000, pooled * 1000)
+    )
+
+    with timed("seed %d copies" % args.copies):
+        seed(copies=args.copies)
+    rng = random.Random(0)
+    book_ids = list(Book.objects.values_list("id", flat=True)[:1000])
+    author_ids = list(Author.objects.values_list("id", flat=True)[:1000])
+    paths = (
+        ["/catalog/", "/catalog/books/", "/catalog/authors/"]
+        + ["/catalog/book/%d" % pk for pk in rng.sample(book_ids, 20)]
+        + [
+            "/catalog/authors/%d" % pk
+            for pk in rng.sample(author_ids, min(len(author_ids), 20))
+        ]
+        + ["/catalog/api/v1/books/%d/" % pk for pk in book_ids[:20]]
+    )
+    connection.close()
+
+    command = SERVERS[args.server].format(
+        port=args.port, workers=args.workers, threads=args.threads
+    )
+    if shutil.which(command.split()[0]) is None:
+        parser.error("%s is not installed" % command.split()[0])
+    for mode in args.modes:
+        environ = dict(
+            os.environ,
+            DEBUG="1",
+            CACHE_URL="dummy://",
+            CATALOG_ASYNC_VIEWS="1" if args.server == "asgi" else "",
+            **MODES[mode],
+        )
+        server = subprocess.Popen(
+            command.split(),
+            cwd=BASE_DIR,
+            env=environ,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_up(args.port)
+            # Прогрев: пул открывает min_size соединений при старте.
+            load(args.port, paths, args.concurrency, 2)
+            latencies, errors = load(
+                args.port, paths, args.concurrency, args.duration
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            "%s %-10s %8.1f req/s  p50 %6.1f ms  p99 %6.1f ms  errors %d"
+            % (
+                args.server,
+                mode,
+                len(latencies) / args.duration,
+                quantiles[49] * 1000,
+                quantiles[98] * 1000,
+                errors,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
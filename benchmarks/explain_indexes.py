@@ -0,0 +1,144 @@
+"""
+Show the query plans of the catalog's hot queries.
+
+Seeds a catalog with ``--copies`` book copies (one million by default)
+when the benchmark database is empty, then prints ``EXPLAIN`` output and
+timings for each query. List pages are explained with the keyset
+queries the views run, for a cursor in the middle of the table in both
+directions. With ``--compare`` the indexes added by the catalog index
+migration are dropped first and created again afterwards, so plans
+before and after the indexes can be compared. The migration state is
+not touched.
+
+    python -m benchmarks.explain_indexes
+    DATABASE_URL=postgres://... python -m benchmarks.explain_indexes
+"""
+
+import argparse
+from contextlib import contextmanager
+from datetime import date
+
+from benchmarks.common import analyze, seed, setup_django, timed
+
+INDEX_MIGRATION = "0006_catalog_indexes"
+
+
+def keyset_pages(label, queryset, ordering):
+    """
+    Next and previous pages around the middle row of ``queryset``, built
+    the way ``CursorPaginationMixin`` builds them.
+    """
+    from catalog.pagination import (
+        BACKWARD,
+        FORWARD,
+        _cursor_queryset,
+        encode_cursor,
+    )
+
+    rows = queryset.order_by(*ordering).values_list(*ordering)
+    middle = list(rows[rows.count() // 2])
+    pages = {}
+    for direction, name in ((FORWARD, "next"), (BACKWARD, "previous")):
+        page, _, _ = _cursor_queryset(
+            queryset, ordering, encode_cursor(direction, middle)
+        )
+        pages["%s, %s page from the middle" % (label, name)] = page[:11]
+    return pages
+
+
+def hot_queries():
+    from django.contrib.auth.models import User
+
+    from catalog.models import Author, Book, BookInstance
+
+    borrower = User.objects.order_by("id").first()
+    return {
+        "loans of one borrower": BookInstance.objects.filter(
+            borrower=borrower, status__exact="o"
+        ).order_by("due_back", "id")[:11],
+        "overdue loans": BookInstance.objects.filter(
+            status__exact="o", due_back__lt=date.today()
+        ).order_by("due_back", "id")[:100],
+        "available copies": BookInstance.objects.filter(
+            status__exact="a"
+        ).values("id"),
+        **keyset_pages(
+            "author list",
+            Author.objects.all(),
+            ("last_name", "first_name", "id"),
+        ),
+        **keyset_pages("book list", Book.objects.all(), ("title", "id")),
+    }
+
+
+def explain_all():
+    from django.db import connection
+
+    analyze()
+    print("== %s ==" % connection.vendor)
+    for label, queryset in hot_queries().items():
+        print("-- %s" % label)
+        print(queryset.explain())
+        with timed(label):
+            list(queryset)
+        print()
+
+
+def catalog_indexes():
+    """``(model, index)`` pairs added by ``INDEX_MIGRATION``."""
+    from django.apps import apps
+    from django.db import connection
+    from django.db.migrations.loader import MigrationLoader
+    from django.db.migrations.operations import AddIndex
+
+    migration = MigrationLoader(connection).get_migration(
+        "catalog", INDEX_MIGRATION
+    )
+    return [
+        (apps.get_model("catalog", operation.model_name), operation.index)
+        for operation in migration.operations
+        if isinstance(operation, AddIndex)
+    ]
+
+
+@contextmanager
+def without_catalog_indexes():
+    from django.db import connection
+
+    indexes = catalog_indexes()
+    with connection.schema_editor() as schema_editor:
+        for model, index in indexes:
+            schema_editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as schema_editor:
+            for model, index in indexes:
+                schema_editor.add_index(model, index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=1_000_000)
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Also show plans with the catalog indexes removed.",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+
+    with timed("seed %d copies" % args.copies):
+        seed(args.copies)
+
+    if args.compare:
+        with without_catalog_indexes():
+            print("#### without catalog indexes")
+            explain_all()
+        print("#### with catalog indexes")
+    explain_all()
+
+
+if __name__ == "__main__":
+    main()
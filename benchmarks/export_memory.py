@@ -0,0 +1,52 @@
+"""
+Show that the catalog export runs in constant memory.
+
+Seeds ``--copies`` book copies (two million by default) when the benchmark
+database is empty, then streams the whole export the way the
+``/catalog/export/`` view does, discarding the output. The resident set
+size is printed every tenth of the rows; it should stay flat after the
+first chunk instead of growing with the number of exported rows.
+
+    python -m benchmarks.export_memory
+    python -m benchmarks.export_memory --format jsonl --chunk-size 2000
+    DATABASE_URL=postgres://... python -m benchmarks.export_memory
+"""
+
+import argparse
+
+from benchmarks.common import rss_mb, seed, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=2_000_000)
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from catalog import export
+    from catalog.models import BookInstance
+
+    with timed("seed %d copies" % args.copies):
+        seed(copies=args.copies)
+    total = BookInstance.objects.count()
+
+    print("RSS before export: %.1f MB" % rss_mb())
+    with timed("export %d copies as %s" % (total, args.format)):
+        lines, _content_type = export.FORMATS[args.format]
+        size = 0
+        for number, line in enumerate(
+            lines(export.rows(args.chunk_size)), start=1
+        ):
+            size += len(line)
+            if number % max(total // 10, 1) == 0:
+                print(
+                    "%10d rows  %8.1f MB written  RSS %7.1f MB"
+                    % (number, size / 2**20, rss_mb())
+                )
+    print("RSS after export: %.1f MB" % rss_mb())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Measure ``import_catalog`` throughput.
+
+Writes ``--records`` synthetic CSV records (one copy each, ten copies per
+title, a few percent with an invalid ISBN) to a temporary file and
+imports them into the benchmark database, which should be empty.
+
+    python -m benchmarks.import_throughput
+    python -m benchmarks.import_throughput --records 500000 --batch-size 10000
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import setup_django
+from catalog.seeding import WORDS
+
+# Корректные ISBN-13 с разными контрольными цифрами.
+ISBNS = ["9780306406157", "9781861972712", "9780140449136", "9783161484100"]
+
+
+def write_records(file, records, seed=0):
+    rng = random.Random(seed)
+    writer = csv.writer(file)
+    writer.writerow(
+        ["book_id", "title", "isbn", "summary", "language"]
+        + ["author_first_name", "author_last_name", "genres"]
+        + ["imprint", "status", "due_back"]
+    )
+    for number in range(records):
+        book = number // 10
+        book_rng = random.Random(book)
+        author = book_rng.randrange(max(records // 200, 1))
+        writer.writerow(
+            [
+                book,
+                "%s %d" % (" ".join(book_rng.sample(WORDS, 3)), book),
+                "12345" if rng.random() < 0.02 else book_rng.choice(ISBNS),
+                " ".join(book_rng.choices(WORDS, k=30)),
+                book_rng.choice(["English", "French", "Russian"]),
+                "First%d" % author,
+                "Last%d" % author,
+                "; ".join(book_rng.sample(WORDS[:50], 2)),
+                "Imprint",
+                rng.choice("aaom"),
+                "",
+            ]
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "records.csv")
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            write_records(file, args.records)
+
+        started = time.perf_counter()
+        call_command(
+            "import_catalog",
+            path,
+            batch_size=args.batch_size,
+            verbosity=0,
+            stderr=io.StringIO(),
+        )
+        elapsed = time.perf_counter() - started
+    print(
+        "%d records in %.1f s: %d records/min"
+        % (args.records, elapsed, args.records / elapsed * 60)
+    )
+
+
+if __name__ == "__main__":
+    main()
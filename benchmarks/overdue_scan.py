@@ -0,0 +1,60 @@
+"""
+Time ``scan_overdue`` and show that its memory use stays flat.
+
+Seeds ``--copies`` book copies (three million by default, about a third
+of them on loan and half of those overdue) when the benchmark database is
+empty, gives every reader an email address and runs the scan with the
+dummy email backend, printing the resident set size before and after.
+
+    python -m benchmarks.overdue_scan
+    DATABASE_URL=postgres://... python -m benchmarks.overdue_scan
+"""
+
+import argparse
+import os
+import resource
+
+from benchmarks.common import analyze, rss_mb, seed, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=3_000_000)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ.setdefault(
+        "EMAIL_BACKEND", "django.core.mail.backends.dummy.EmailBackend"
+    )
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.db.models import Value
+    from django.db.models.functions import Concat
+
+    from catalog import overdue
+
+    with timed("seed %d copies" % args.copies):
+        seed(copies=args.copies)
+    User.objects.filter(email="").update(
+        email=Concat("username", Value("@example.com"))
+    )
+    analyze()
+
+    print("RSS before scan: %.1f MB" % rss_mb())
+    with timed("scan"):
+        counts = overdue.send_notices(chunk_size=args.chunk_size)
+    print(
+        "%(notices)d notices for %(loans)d overdue loans "
+        "(%(skipped)d skipped)" % counts
+    )
+    print(
+        "RSS after scan: %.1f MB (peak %.1f MB)"
+        % (
+            rss_mb(),
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Return copies at several desks at once and check hold allocation.
+
+Creates ``--books`` books, each with ``--copies`` copies on loan and
+``--holds`` waiting reservations, then starts ``--desks`` threads (one
+database connection each) that return the copies one by one through
+``circulation.circulate()``. Desks take copies round-robin, so they keep
+returning copies of the same books at the same time. Prints returns per
+second and then checks the result: no copy set aside twice, every book
+served the oldest holds first, and the per-book counters consistent.
+
+Throughput is only meaningful on PostgreSQL, where the allocator's
+``SKIP LOCKED`` row locks apply; SQLite serializes writers with a
+database lock (busy transactions are retried and counted), so there it
+checks correctness only.
+
+    python -m benchmarks.reservation_contention
+    DATABASE_URL=postgres://... python -m benchmarks.reservation_contention
+"""
+
+import argparse
+import threading
+import time
+
+from benchmarks.common import setup_django, timed
+
+TITLE = "Reservation benchmark %d"
+
+
+def create_queue(books, copies, holds):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+
+    from catalog.models import Book, BookInstance, CatalogStats, Reservation
+
+    old = Book.objects.filter(title__startswith="Reservation benchmark")
+    BookInstance.objects.filter(book__in=old).delete()
+    old.delete()
+    patrons = list(User.objects.filter(username__startswith="holder"))
+    patrons += User.objects.bulk_create(
+        User(username="holder%d" % number)
+        for number in range(len(patrons), holds)
+    )
+    books = Book.objects.bulk_create(
+        Book(title=TITLE % number, summary="Summary", isbn="9780000000000")
+        for number in range(books)
+    )
+    BookInstance.objects.bulk_create(
+        BookInstance(book=book, imprint="Imprint", status="o")
+        for book in books
+        for _ in range(copies)
+    )
+    now = timezone.now()
+    Reservation.objects.bulk_create(
+        Reservation(
+            book=book,
+            patron=patron,
+            created_at=now + timezone.timedelta(microseconds=number),
+        )
+        for book in books
+        for number, patron in enumerate(patrons[:holds])
+    )
+    Book.reconcile_copies([book.pk for book in books])
+    CatalogStats.rebuild()
+    return books
+
+
+def return_copies(copy_ids):
+    """Return ``copy_ids`` one by one; return the number of retries."""
+    from django.db import OperationalError, connection
+
+    from catalog import circulation
+
+    retries = 0
+    for copy_id in copy_ids:
+        while True:
+            try:
+                circulation.circulate([copy_id], circulation.RETURN)
+                break
+            except OperationalError:
+                # SQLite: "database is locked" при конкурентной записи.
+                retries += 1
+                time.sleep(0.001)
+    connection.close()
+    return retries
+
+
+def check(books, copies, holds):
+    from django.db.models import Count
+
+    from catalog.models import Book, BookInstance, Reservation
+
+    ready = Reservation.objects.filter(
+        book__in=books, status=Reservation.READY
+    )
+    problems = []
+    duplicates = (
+        ready.values("copy").annotate(n=Count("id")).filter(n__gt=1).count()
+    )
+    if duplicates:
+        problems.append("%d copies set aside twice" % duplicates)
+    set_aside = BookInstance.objects.filter(book__in=books, status="r")
+    if set_aside.count() != ready.count():
+        problems.append(
+            "%d copies set aside, %d holds ready"
+            % (set_aside.count(), ready.count())
+        )
+    expected = min(copies, holds)
+    for book in books:
+        statuses = list(
+            Reservation.objects.filter(book=book)
+            .order_by("created_at", "id")
+            .values_list("status", flat=True)
+        )
+        if statuses[:expected] != [Reservation.READY] * expected:
+            problems.append("%s: holds not served in order" % book)
+            break
+    if Book.reconcile_copies([book.pk for book in books]):
+        problems.append("copy counters drifted")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, default=50)
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--holds", type=int, default=15)
+    parser.add_argument("--desks", type=int, default=8)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    from catalog.models import BookInstance
+
+    with timed("create %d holds" % (args.books * args.holds)):
+        books = create_queue(args.books, args.copies, args.holds)
+    # Экземпляр за экземпляром по кругу книг: столы возвращают
+    # экземпляры одних и тех же книг одновременно.
+    by_book = {}
+    for pk, book_id in (
+        BookInstance.objects.filter(book__in=books)
+        .order_by("id")
+        .values_list("pk", "book_id")
+    ):
+        by_book.setdefault(book_id, []).append(pk)
+    order = [
+        pk for round_ in zip(*by_book.values(), strict=True) for pk in round_
+    ]
+    connection.close()
+
+    retries = []
+    threads = [
+        threading.Thread(
+            target=lambda part: retries.append(return_copies(part)),
+            args=(order[desk :: args.desks],),
+        )
+        for desk in range(args.desks)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(
+        "%d returns at %d desks: %.1f returns/s, %d retries (%s)"
+        % (
+            len(order),
+            args.desks,
+            len(order) / elapsed,
+            sum(retries),
+            connection.vendor,
+        )
+    )
+
+    problems = check(books, args.copies, args.holds)
+    print("OK: allocation consistent" if not problems else problems)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measure full-text search latency on a large catalog.
+
+Seeds ``--books`` titles (one million by default) when the benchmark
+database is empty, then times ranked searches the way ``BookSearchView``
+runs them: ranked ids from the index plus one page of books.
+
+    python -m benchmarks.search_latency
+    DATABASE_URL=postgres://... python -m benchmarks.search_latency
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.common import analyze, seed, setup_django, timed
+
+QUERIES = ["kara", "kara lodel", "shavi", "mortem 4242", "zzz"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from catalog import search
+    from catalog.models import Book
+
+    with timed("seed %d books" % args.books):
+        seed(copies=args.books, books=args.books)
+    analyze()
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            ids = search.search_books(query)
+            list(Book.objects.select_related("author").in_bulk(ids[:10]))
+            timings.append(time.perf_counter() - started)
+        print(
+            "%-12r %4d hits  median %7.2f ms  max %7.2f ms%s"
+            % (
+                query,
+                len(ids),
+                statistics.median(timings) * 1000,
+                max(timings) * 1000,
+                "  (truncated)" if ids.truncated else "",
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
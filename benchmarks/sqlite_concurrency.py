@@ -0,0 +1,174 @@
+"""
+Mixed read/write catalog traffic from several processes on one SQLite
+file, with SQLite defaults and with the profile of
+``locallibrary.databases`` (WAL, pragmas, ``BEGIN IMMEDIATE``).
+
+Seeds ``--copies`` book copies when the benchmark database is empty,
+then for each mode starts ``--processes`` worker processes (like
+gunicorn workers, one connection each) that run operations for
+``--duration`` seconds: a book page (the book with its author and
+copies) and the home page counters, or - with probability ``--writes``
+- a session save or a renewal through ``circulation.circulate()``. An
+operation that fails with "database is locked" is counted as an error,
+as its request would fail. Prints operations per second, p50 and p99
+latency of reads and writes and the number of errors per mode:
+
+    python -m benchmarks.sqlite_concurrency
+    python -m benchmarks.sqlite_concurrency --processes 8 --writes 0.3
+
+Works only with SQLite; the file stays in WAL mode after the ``tuned``
+run and is switched back to a rollback journal before ``default``.
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import random
+import statistics
+import time
+
+from benchmarks.common import seed, setup_django, timed
+
+# Режим: значение SQLITE_TUNING в воркерах.
+MODES = {"default": "", "tuned": "1"}
+
+
+def read(rng, book_ids):
+    from catalog.models import Book, CatalogStats
+
+    book = Book.objects.select_related("author").get(pk=rng.choice(book_ids))
+    list(book.bookinstance_set.all()[:20])
+    CatalogStats.load()
+
+
+def write(rng, copy_ids, session_store):
+    from catalog import circulation
+
+    if rng.random() < 0.5:
+        session = session_store()
+        session["num_visits"] = rng.randrange(100)
+        session.save()
+    else:
+        circulation.circulate(
+            [rng.choice(copy_ids)],
+            circulation.RENEW,
+            datetime.date.today()
+            + datetime.timedelta(days=rng.randrange(7, 28)),
+        )
+
+
+def worker(number, tuning, duration, writes, barrier, results):
+    os.environ["SQLITE_TUNING"] = tuning
+    setup_django(migrate=False)
+    from importlib import import_module
+
+    from django.conf import settings
+    from django.db import OperationalError
+
+    from catalog.models import Book, BookInstance
+
+    session_store = import_module(settings.SESSION_ENGINE).SessionStore
+    book_ids = list(Book.objects.values_list("pk", flat=True)[:10_000])
+    copy_ids = list(
+        BookInstance.objects.filter(status="o").values_list("pk", flat=True)[
+            :10_000
+        ]
+    )
+    rng = random.Random(number)
+    latencies = {"read": [], "write": []}
+    errors = 0
+
+    barrier.wait()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        kind = "write" if rng.random() < writes else "read"
+        started = time.perf_counter()
+        try:
+            if kind == "write":
+                write(rng, copy_ids, session_store)
+            else:
+                read(rng, book_ids)
+        except OperationalError:
+            # "database is locked": запрос завершился бы ошибкой 500.
+            errors += 1
+            continue
+        latencies[kind].append(time.perf_counter() - started)
+    results.put((latencies, errors))
+
+
+def percentiles(latencies):
+    if len(latencies) < 2:
+        return float("nan"), float("nan")
+    quantiles = statistics.quantiles(latencies, n=100)
+    return quantiles[49] * 1000, quantiles[98] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=100_000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--writes", type=float, default=0.2)
+    parser.add_argument("modes", nargs="*", default=list(MODES))
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    if connection.vendor != "sqlite":
+        parser.error("set DATABASE_URL to a SQLite database")
+    with timed("seed %d copies" % args.copies):
+        seed(copies=args.copies)
+
+    context = multiprocessing.get_context("spawn")
+    for mode in args.modes:
+        if not MODES[mode]:
+            # Режим WAL сохраняется в файле базы.
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode = DELETE")
+        connection.close()
+
+        barrier = context.Barrier(args.processes)
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=worker,
+                args=(
+                    number,
+                    MODES[mode],
+                    args.duration,
+                    args.writes,
+                    barrier,
+                    results,
+                ),
+            )
+            for number in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        latencies = {"read": [], "write": []}
+        errors = 0
+        for _ in processes:
+            worker_latencies, worker_errors = results.get()
+            for kind, values in worker_latencies.items():
+                latencies[kind] += values
+            errors += worker_errors
+        for process in processes:
+            process.join()
+
+        done = len(latencies["read"]) + len(latencies["write"])
+        print(
+            "%-8s %8.1f ops/s  read p50 %6.1f ms p99 %7.1f ms  "
+            "write p50 %6.1f ms p99 %7.1f ms  errors %d"
+            % (
+                (mode, done / args.duration)
+                + percentiles(latencies["read"])
+                + percentiles(latencies["write"])
+                + (errors,)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,78 @@
-from django.contrib import admin
+import datetime
 
-from .models import Author, Book, BookInstance, Genre, Language
+from django.contrib import admin, messages
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html
 
-admin.site.register(Genre)
-admin.site.register(Language)
+from . import circulation
+from .models import (
+    Author,
+    Book,
+    BookInstance,
+    Genre,
+    Language,
+    Reservation,
+)
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+
+
+@admin.register(Language)
+class LanguageAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+
+
+class LimitedInlineFormSet(BaseInlineFormSet):
+    """
+    Inline formset showing only the first ``max_shown`` related objects,
+    so that a book with thousands of copies still renders quickly.
+    """
+
+    max_shown = 20
+
+    def get_queryset(self):
+        if not hasattr(self, "_limited_queryset"):
+            self._limited_queryset = super().get_queryset()[: self.max_shown]
+        return self._limited_queryset
+
+
+def related_changelist_link(model, lookup, obj, count):
+    url = reverse(
+        "admin:%s_%s_changelist"
+        % (model._meta.app_label, model._meta.model_name)
+    )
+    return format_html(
+        '<a href="{}?{}={}">{} {}</a>',
+        url,
+        lookup,
+        obj.pk,
+        count,
+        model._meta.verbose_name_plural,
+    )
 
 
 class BooksInline(admin.TabularInline):
     model = Book
+    formset = LimitedInlineFormSet
+    fields = ("title", "isbn", "language")
+    readonly_fields = fields
+    ordering = ("title", "id")
+    extra = 0
+    can_delete = False
+    show_change_link = True
 
+    def has_add_permission(self, request, obj=None):
+        return False
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("language")
+
+
+@admin.register(Author)
 class AuthorAdmin(admin.ModelAdmin):
     list_display = (
         "last_name",
@@ -17,29 +80,122 @@ class AuthorAdmin(admin.ModelAdmin):
         "date_of_birth",
         "date_of_death",
     )
-    fields = ["first_name", "last_name", ("date_of_birth", "date_of_death")]
+    search_fields = ("last_name", "first_name")
+    fields = [
+        "first_name",
+        "last_name",
+        ("date_of_birth", "date_of_death"),
+        "all_books",
+    ]
+    readonly_fields = ("all_books",)
     inlines = [BooksInline]
 
-
-admin.site.register(Author, AuthorAdmin)
+    @admin.display(description="Books")
+    def all_books(self, obj):
+        if obj.pk is None:
+            return "-"
+        return related_changelist_link(
+            Book, "author__id__exact", obj, obj.book_set.count()
+        )
 
 
 class BooksInstanceInline(admin.TabularInline):
     model = BookInstance
+    formset = LimitedInlineFormSet
+    fields = ("imprint", "status", "due_back", "borrower")
+    # Виджет выбора (даже autocomplete) делает запрос на каждую строку;
+    # читателя меняют на странице самого экземпляра.
+    readonly_fields = ("borrower",)
+    ordering = ("due_back", "id")
+    extra = 0
+    show_change_link = True
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("book", "borrower")
 
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ("title", "author", "display_genre")
+    list_select_related = ("author",)
+    search_fields = ("title", "isbn", "author__last_name")
+    autocomplete_fields = ("author", "genre", "language")
+    readonly_fields = ("all_copies",)
     inlines = [BooksInstanceInline]
 
+    def get_queryset(self, request):
+        # display_genre берёт жанры из предзагрузки, без запроса на строку.
+        return super().get_queryset(request).prefetch_related("genre")
+
+    @admin.display(description="Copies")
+    def all_copies(self, obj):
+        if obj.pk is None:
+            return "-"
+        return related_changelist_link(
+            BookInstance, "book__id__exact", obj, obj.bookinstance_set.count()
+        )
+
 
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
     list_display = ("book", "status", "borrower", "due_back", "id")
     list_filter = ("status", "due_back")
+    list_select_related = ("book", "borrower")
+    search_fields = ("book__title", "borrower__username")
+    autocomplete_fields = ("book", "borrower")
 
     fieldsets = (
         (None, {"fields": ("book", "imprint", "id")}),
         ("Availability", {"fields": ("status", "due_back", "borrower")}),
     )
+    actions = ["renew_copies", "return_copies", "make_copies_available"]
+
+    def has_mark_returned_permission(self, request):
+        return request.user.has_perm("catalog.can_mark_returned")
+
+    def circulate(self, request, queryset, action, renewal_date=None):
+        copy_ids = list(queryset.values_list("pk", flat=True))
+        changed = circulation.circulate(copy_ids, action, renewal_date)
+        self.message_user(
+            request,
+            "%s: %d of %d selected copies."
+            % (dict(circulation.ACTIONS)[action], changed, len(copy_ids)),
+            messages.SUCCESS if changed else messages.WARNING,
+        )
+
+    @admin.action(
+        description="Renew selected copies for 3 weeks",
+        permissions=["mark_returned"],
+    )
+    def renew_copies(self, request, queryset):
+        self.circulate(
+            request,
+            queryset,
+            circulation.RENEW,
+            datetime.date.today() + datetime.timedelta(weeks=3),
+        )
+
+    @admin.action(
+        description="Mark selected copies returned",
+        permissions=["mark_returned"],
+    )
+    def return_copies(self, request, queryset):
+        self.circulate(request, queryset, circulation.RETURN)
+
+    @admin.action(
+        description="Mark selected copies available",
+        permissions=["mark_returned"],
+    )
+    def make_copies_available(self, request, queryset):
+        self.circulate(request, queryset, circulation.MAKE_AVAILABLE)
+
+
+@admin.register(Reservation)
+class ReservationAdmin(admin.ModelAdmin):
+    list_display = ("book", "patron", "status", "created_at", "copy")
+    list_filter = ("status",)
+    list_select_related = ("book", "patron", "copy__book")
+    search_fields = ("book__title", "patron__username")
+    autocomplete_fields = ("book", "patron")
+    # Экземпляр и статус назначает catalog.reservations.
+    readonly_fields = ("status", "copy", "created_at", "allocated_at")
@@ -0,0 +1,260 @@
+"""
+Read-only JSON API (``/catalog/api/v1/``) for kiosks and mobile clients.
+
+Rows are read with ``values()`` and serialized as plain dicts, without
+creating model instances. Only the requested ``?fields=`` are selected:
+a field that lives on a related table adds its join, a count adds a
+correlated subquery, and a to-many field (the genres of a book) costs
+one extra query for the whole page instead of one per row. Lists use the keyset
+cursors from ``catalog.pagination``.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from . import cache
+from .models import Author, Book
+from .pagination import paginate_by_cursor
+from .views import author_updated_at, book_updated_at, catalog_updated_at
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def count_of(queryset, field):
+    """
+    Correlated ``COUNT`` of ``queryset`` rows whose ``field`` is the
+    outer row. Unlike ``Count()`` over a join it needs no ``GROUP BY``,
+    so it is only evaluated for the rows of the page.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("*"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def book_genres(book_ids):
+    """Genre names per book id, one query for all ``book_ids``."""
+    genres = defaultdict(list)
+    for book_id, name in (
+        Book.genre.through.objects.filter(book_id__in=book_ids)
+        .order_by("genre__name")
+        .values_list("book_id", "genre__name")
+    ):
+        genres[book_id].append(name)
+    return genres
+
+
+class Resource:
+    """
+    Fields a resource exposes and how to read them.
+
+    ``columns`` maps a field to a ``values()`` lookup, ``annotations`` to
+    an aggregate and ``related`` to a function returning the values of
+    the field for a list of primary keys.
+    """
+
+    def __init__(
+        self,
+        model,
+        ordering,
+        default_fields,
+        columns,
+        annotations=None,
+        related=None,
+    ):
+        self.model = model
+        self.ordering = ordering
+        self.default_fields = default_fields
+        self.columns = columns
+        self.annotations = annotations or {}
+        self.related = related or {}
+
+    @property
+    def fields(self):
+        return [*self.columns, *self.annotations, *self.related]
+
+    def parse_fields(self, value):
+        """Requested field names; raise ``ValueError`` for unknown ones."""
+        if not value:
+            return list(self.default_fields)
+        fields = list(dict.fromkeys(value.split(",")))
+        unknown = [field for field in fields if field not in self.fields]
+        if unknown:
+            raise ValueError(
+                "Unknown fields: %s. Available: %s."
+                % (", ".join(unknown), ", ".join(self.fields))
+            )
+        return fields
+
+    def queryset(self, fields):
+        """``values()`` queryset with what ``fields`` and ordering need."""
+        lookups = [self.columns[f] for f in fields if f in self.columns]
+        queryset = self.model.objects.annotate(
+            **{f: self.annotations[f] for f in fields if f in self.annotations}
+        )
+        return queryset.values(
+            *dict.fromkeys(
+                [*lookups, *self.ordering, "pk"]
+                + [f for f in fields if f in self.annotations]
+            )
+        )
+
+    def serialize(self, rows, fields):
+        """List of dicts with exactly ``fields``, in that order."""
+        related = {
+            field: self.related[field]([row["pk"] for row in rows])
+            for field in fields
+            if field in self.related
+        }
+        keys = {field: self.columns.get(field, field) for field in fields}
+        return [
+            {
+                field: (
+                    related[field].get(row["pk"], [])
+                    if field in related
+                    else row[keys[field]]
+                )
+                for field in fields
+            }
+            for row in rows
+        ]
+
+
+BOOKS = Resource(
+    Book,
+    ordering=("title", "id"),
+    default_fields=("id", "title", "author", "isbn"),
+    columns={
+        "id": "id",
+        "title": "title",
+        "summary": "summary",
+        "isbn": "isbn",
+        "author": "author_id",
+        "author_first_name": "author__first_name",
+        "author_last_name": "author__last_name",
+        "language": "language__name",
+        "updated_at": "updated_at",
+        "copies": "copies_total",
+        "copies_available": "copies_available",
+    },
+    related={"genres": book_genres},
+)
+
+AUTHORS = Resource(
+    Author,
+    ordering=("last_name", "first_name", "id"),
+    default_fields=("id", "first_name", "last_name"),
+    columns={
+        "id": "id",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "date_of_birth": "date_of_birth",
+        "date_of_death": "date_of_death",
+        "updated_at": "updated_at",
+    },
+    annotations={"books": count_of(Book.objects.all(), "author")},
+)
+
+
+def error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query["cursor"] = cursor
+    return "%s?%s" % (request.path, query.urlencode())
+
+
+def resource_list(request, resource):
+    try:
+        fields = resource.parse_fields(request.GET.get("fields"))
+        limit = int(request.GET.get("limit", DEFAULT_LIMIT))
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError("limit must be between 1 and %d." % MAX_LIMIT)
+        page = paginate_by_cursor(
+            resource.queryset(fields),
+            resource.ordering,
+            limit,
+            request.GET.get("cursor"),
+        )
+    except ValueError as exc:
+        return error(str(exc))
+    return JsonResponse(
+        {
+            "results": resource.serialize(page.object_list, fields),
+            "next": page_url(request, page.next_cursor),
+            "previous": page_url(request, page.previous_cursor),
+        }
+    )
+
+
+def resource_detail(request, resource, pk):
+    try:
+        fields = resource.parse_fields(request.GET.get("fields"))
+    except ValueError as exc:
+        return error(str(exc))
+    rows = list(resource.queryset(fields).filter(pk=pk))
+    if not rows:
+        return error("Not found.", status=404)
+    return JsonResponse(resource.serialize(rows, fields)[0])
+
+
+@require_GET
+@cache.conditional_page(catalog_updated_at)
+def book_list(request):
+    return resource_list(request, BOOKS)
+
+
+@require_GET
+@cache.conditional_page(book_updated_at)
+def book_detail(request, pk):
+    return resource_detail(request, BOOKS, pk)
+
+
+@require_GET
+@cache.conditional_page(book_updated_at)
+def book_availability(request, pk):
+    availability = (
+        Book.objects.filter(pk=pk)
+        .annotate(
+            copies=Count("bookinstance"),
+            available=Count(
+                "bookinstance", filter=Q(bookinstance__status="a")
+            ),
+            on_loan=Count("bookinstance", filter=Q(bookinstance__status="o")),
+            next_due_back=Min(
+                "bookinstance__due_back", filter=Q(bookinstance__status="o")
+            ),
+        )
+        .values("id", "copies", "available", "on_loan", "next_due_back")
+        .first()
+    )
+    if availability is None:
+        return error("Not found.", status=404)
+    return JsonResponse(availability)
+
+
+@require_GET
+@cache.conditional_page(catalog_updated_at)
+def author_list(request):
+    return resource_list(request, AUTHORS)
+
+
+@require_GET
+@cache.conditional_page(author_updated_at)
+def author_detail(request, pk):
+    return resource_detail(request, AUTHORS, pk)
@@ -0,0 +1,212 @@
+"""
+Caching of catalog pages.
+
+Every book and author has a version token in the cache, and so does the
+catalog as a whole (``"catalog"``, used by list pages). Cached fragments
+and pages include the token in their key, and the handlers in
+``catalog.signals`` replace the token once a transaction that changed
+something shown on the page commits, so stale entries are never read
+and simply expire.
+
+The same handlers touch ``updated_at`` of the affected books, authors and
+``CatalogStats``; ``conditional_page`` turns it into HTTP validators.
+"""
+
+import functools
+import hashlib
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from locallibrary import metrics
+
+# Время жизни версий и закэшированных фрагментов/страниц, секунды.
+VERSION_TIMEOUT = 60 * 60 * 24
+PAGE_TIMEOUT = 60 * 10
+
+
+def _version_key(name, pk=None):
+    return "catalog:version:%s:%s" % (name, pk)
+
+
+def get_version(name, pk=None):
+    """Current version token of ``name`` (``"book"``, ``"author"`` ...)."""
+    key = _version_key(name, pk)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, VERSION_TIMEOUT):
+            version = cache.get(key, version)
+    return version
+
+
+async def aget_version(name, pk=None):
+    """Async ``get_version()``."""
+    key = _version_key(name, pk)
+    version = await cache.aget(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(key, version, VERSION_TIMEOUT):
+            version = await cache.aget(key, version)
+    return version
+
+
+def bump(name, pks=(None,)):
+    """Give ``name`` objects with ``pks`` new version tokens."""
+    cache.set_many(
+        {_version_key(name, pk): uuid.uuid4().hex for pk in pks},
+        VERSION_TIMEOUT,
+    )
+
+
+def _count_lookup(kind, hit):
+    metrics.inc(
+        "catalog_cache_requests_total",
+        cache=kind,
+        result="hit" if hit else "miss",
+    )
+
+
+def fragment_cached(fragment_name, *vary_on):
+    """Whether ``{% cache ... fragment_name *vary_on %}`` is cached."""
+    hit = (
+        cache.get(make_template_fragment_key(fragment_name, vary_on))
+        is not None
+    )
+    _count_lookup("fragment", hit)
+    return hit
+
+
+async def afragment_cached(fragment_name, *vary_on):
+    """Async ``fragment_cached()``."""
+    hit = (
+        await cache.aget(make_template_fragment_key(fragment_name, vary_on))
+        is not None
+    )
+    _count_lookup("fragment", hit)
+    return hit
+
+
+def _page_key(request, catalog_version):
+    return "catalog:page:%s:%s" % (
+        catalog_version,
+        hashlib.md5(request.get_full_path().encode()).hexdigest(),
+    )
+
+
+class CachedAnonymousPageMixin:
+    """
+    Cache whole responses of a view for anonymous GET requests.
+
+    The key includes the catalog version, so any catalog change makes
+    the next request render the page again.
+    """
+
+    page_cache_timeout = PAGE_TIMEOUT
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or (
+            request.user.is_authenticated
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = _page_key(request, get_version("catalog"))
+        cached = cache.get(key)
+        _count_lookup("page", cached is not None)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda response: cache.set(
+                    key,
+                    (response.content, response["Content-Type"]),
+                    self.page_cache_timeout,
+                )
+            )
+        return response
+
+
+def conditional_page(get_updated_at):
+    """
+    ``condition()`` with ETag and Last-Modified taken from one timestamp.
+
+    ``get_updated_at(**view_kwargs)`` returns when the page content last
+    changed (or ``None`` if unknown). Validators are only sent to
+    anonymous users: logged-in pages include per-user content.
+    """
+
+    def last_modified(request, *args, **kwargs):
+        if not hasattr(request, "_page_updated_at"):
+            request._page_updated_at = (
+                None
+                if request.user.is_authenticated
+                else get_updated_at(**kwargs)
+            )
+        return request._page_updated_at
+
+    def etag(request, *args, **kwargs):
+        updated_at = last_modified(request, *args, **kwargs)
+        if updated_at is None:
+            return None
+        # Last-Modified точен до секунды, ETag - до микросекунды.
+        return "%x" % int(updated_at.timestamp() * 1_000_000)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def acached_anonymous_page(view):
+    """``CachedAnonymousPageMixin`` for async view functions."""
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if request.method not in ("GET", "HEAD") or user.is_authenticated:
+            return await view(request, *args, **kwargs)
+
+        key = _page_key(request, await aget_version("catalog"))
+        cached = await cache.aget(key)
+        _count_lookup("page", cached is not None)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = await view(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(
+                key, (response.content, response["Content-Type"]), PAGE_TIMEOUT
+            )
+        return response
+
+    return wrapper
+
+
+def aconditional_page(get_updated_at):
+    """
+    ``conditional_page()`` for async view functions: the user and
+    ``get_updated_at`` are loaded before ``condition()``, which calls its
+    callbacks synchronously.
+    """
+
+    def decorator(view):
+        conditional_view = conditional_page(get_updated_at)(view)
+
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            request._page_updated_at = (
+                None
+                if user.is_authenticated
+                else await sync_to_async(get_updated_at)(**kwargs)
+            )
+            return await conditional_view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,80 @@
+"""
+Bulk circulation: renew, return or make available many copies at once.
+
+Each call is one transaction that locks the affected copies, changes them
+with a single ``UPDATE ... WHERE id IN (...)`` and then updates what the
+``post_save`` handlers would have (``QuerySet.update()`` sends no
+signals): the availability counters and the catalog page caches.
+Copies that become available are then allocated to waiting holds
+(``catalog.reservations``).
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import reservations
+
+RENEW = "renew"
+RETURN = "return"
+MAKE_AVAILABLE = "available"
+
+ACTIONS = (
+    (RENEW, "Renew"),
+    (RETURN, "Mark returned"),
+    (MAKE_AVAILABLE, "Mark available"),
+)
+
+# Статусы, к которым применимо действие: продлить и вернуть можно
+# только выданные экземпляры, сделать доступными - на обслуживании
+# или зарезервированные.
+APPLIES_TO = {
+    RENEW: ("o",),
+    RETURN: ("o",),
+    MAKE_AVAILABLE: ("m", "r"),
+}
+
+
+def circulate(copy_ids, action, renewal_date=None):
+    """
+    Apply ``action`` to the copies with ``copy_ids``; return the number
+    of changed copies. Copies the action does not apply to are skipped.
+    """
+    from .models import Book, BookInstance, CatalogStats
+    from .signals import books_changed
+
+    if action == RENEW:
+        if renewal_date is None:
+            raise ValueError("Renewal needs a renewal_date.")
+        changes = {"due_back": renewal_date}
+    else:
+        changes = {"status": "a", "due_back": None, "borrower": None}
+
+    with transaction.atomic():
+        copies = list(
+            BookInstance.objects.select_for_update()
+            .filter(pk__in=list(copy_ids), status__in=APPLIES_TO[action])
+            .values_list("pk", "book_id")
+        )
+        if not copies:
+            return 0
+        BookInstance.objects.filter(
+            pk__in=[pk for pk, _book_id in copies]
+        ).update(updated_at=timezone.now(), **changes)
+        if action != RENEW:
+            CatalogStats.adjust(num_instances_available=len(copies))
+            Book.adjust_copies(
+                {
+                    book_id: (0, count)
+                    for book_id, count in Counter(
+                        book_id for _pk, book_id in copies
+                    ).items()
+                }
+            )
+        books_changed({book_id for _pk, book_id in copies})
+        if action != RENEW:
+            # Вернувшиеся на полку экземпляры - первым в очереди броней.
+            reservations.release(pk for pk, _book_id in copies)
+            reservations.allocate({book_id for _pk, book_id in copies})
+    return len(copies)
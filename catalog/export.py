@@ -0,0 +1,123 @@
+"""
+Streaming export of the catalog inventory (CSV and JSON Lines).
+
+Every copy is exported as one row together with its book, author,
+language and genres; books without copies get a single row with empty
+copy columns. Books are read with ``QuerySet.iterator(chunk_size)`` (a
+server-side cursor on PostgreSQL) and their genres and copies are
+prefetched per chunk, so memory use depends on ``chunk_size`` and not on
+the size of the catalog.
+"""
+
+import csv
+import json
+
+from django.db.models import Prefetch
+
+COLUMNS = [
+    "book_id",
+    "title",
+    "isbn",
+    "summary",
+    "language",
+    "author_id",
+    "author_first_name",
+    "author_last_name",
+    "genres",
+    "copy_id",
+    "imprint",
+    "status",
+    "due_back",
+    "borrower",
+]
+
+# Строки склеиваются в блоки примерно такого размера, чтобы не
+# отдавать серверу по одной короткой строке на экземпляр.
+BLOCK_SIZE = 64 * 1024
+
+
+def rows(chunk_size=1000):
+    """Yield one dict with ``COLUMNS`` per copy, ordered by book."""
+    from .models import Book, BookInstance
+
+    copies = BookInstance.objects.select_related("borrower").order_by("id")
+    books = (
+        Book.objects.select_related("author", "language")
+        .prefetch_related(
+            "genre", Prefetch("bookinstance_set", queryset=copies)
+        )
+        .order_by("pk")
+        .iterator(chunk_size=chunk_size)
+    )
+    for book in books:
+        author = book.author
+        book_row = {
+            "book_id": book.pk,
+            "title": book.title,
+            "isbn": book.isbn,
+            "summary": book.summary,
+            "language": book.language.name if book.language else None,
+            "author_id": book.author_id,
+            "author_first_name": author.first_name if author else None,
+            "author_last_name": author.last_name if author else None,
+            "genres": sorted(genre.name for genre in book.genre.all()),
+        }
+        book_copies = book.bookinstance_set.all()
+        if not book_copies:
+            yield dict(book_row, **dict.fromkeys(COLUMNS[9:]))
+        for copy in book_copies:
+            yield dict(
+                book_row,
+                copy_id=copy.pk,
+                imprint=copy.imprint,
+                status=copy.status,
+                due_back=copy.due_back,
+                borrower=copy.borrower.username if copy.borrower else None,
+            )
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the written value."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        row["genres"] = "; ".join(row["genres"])
+        yield writer.writerow([row[column] for column in COLUMNS])
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, default=str, ensure_ascii=False) + "\n"
+
+
+# Формат: (генератор строк, Content-Type).
+FORMATS = {
+    "csv": (csv_lines, "text/csv; charset=utf-8"),
+    "jsonl": (jsonl_lines, "application/x-ndjson; charset=utf-8"),
+}
+
+
+def _blocks(lines, size=BLOCK_SIZE):
+    block = []
+    length = 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(block)
+            block = []
+            length = 0
+    if block:
+        yield "".join(block)
+
+
+def export(format, chunk_size=1000):
+    """Yield the catalog in ``format`` (a key of ``FORMATS``) as text."""
+    lines, _content_type = FORMATS[format]
+    return _blocks(lines(rows(chunk_size)))
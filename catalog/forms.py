@@ -1,9 +1,12 @@
 import datetime  # for checking renewal date range.
+import uuid
 
 from django import forms
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
+from . import circulation
+
 
 class RenewBookForm(forms.Form):
     renewal_date = forms.DateField(
@@ -25,3 +28,41 @@ class RenewBookForm(forms.Form):
 
         # Помните, что всегда надо возвращать "очищенные" данные.
         return data
+
+
+class CopyIdsField(forms.Field):
+    """List of ``BookInstance`` ids from repeated form values."""
+
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return [uuid.UUID(str(copy_id)) for copy_id in value or ()]
+        except ValueError:
+            raise ValidationError(_("Invalid copy id.")) from None
+
+
+class BulkCirculationForm(RenewBookForm):
+    """Renew, return or make available several copies at once."""
+
+    copies = CopyIdsField(error_messages={"required": _("Select copies.")})
+    action = forms.ChoiceField(choices=circulation.ACTIONS)
+    renewal_date = forms.DateField(
+        required=False,
+        help_text="Enter a date between now and 4 weeks (renewal only).",
+    )
+
+    def clean_renewal_date(self):
+        if self.cleaned_data["renewal_date"] is None:
+            return None
+        return super().clean_renewal_date()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if (
+            cleaned_data.get("action") == circulation.RENEW
+            and "renewal_date" in cleaned_data
+            and cleaned_data["renewal_date"] is None
+        ):
+            self.add_error("renewal_date", _("Enter a renewal date."))
+        return cleaned_data
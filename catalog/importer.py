@@ -0,0 +1,354 @@
+"""
+Bulk import of catalog records (CSV, JSON Lines and MARCXML).
+
+A record describes a book and, optionally, one copy of it; the columns
+are those of ``catalog.export``, so an export can be imported back.
+Records with the same ``book_id`` (or, without it, the same ISBN, title
+and author) become copies of one book. Authors, genres and languages are
+matched by name against in-memory maps loaded once from the database.
+
+Records are validated and written in batches: each batch is one
+transaction with one ``bulk_create`` per model. Signals do not fire for
+bulk inserts, so search documents and the copy counters of books are
+written with the batch, and the statistics and page caches are refreshed
+at the end of the import.
+"""
+
+import csv
+import json
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from isbn_field.validators import ISBNValidator
+
+from . import search
+
+# Поля записи, которые задают экземпляр книги.
+COPY_COLUMNS = ("imprint", "status", "due_back")
+
+MARC_NAMESPACE = "{http://www.loc.gov/MARC21/slim}"
+
+
+def read_csv(file):
+    """Yield ``(line number, record)`` from a CSV file with a header."""
+    reader = csv.DictReader(file)
+    for record in reader:
+        yield reader.line_num, record
+
+
+def read_jsonl(file):
+    for number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            record = ValidationError("Invalid JSON: %s" % error)
+        yield number, record
+
+
+def _subfields(record, tag, code):
+    return [
+        (subfield.text or "").strip()
+        for field in record.iterfind(
+            "%sdatafield[@tag='%s']" % (MARC_NAMESPACE, tag)
+        )
+        for subfield in field.iterfind(
+            "%ssubfield[@code='%s']" % (MARC_NAMESPACE, code)
+        )
+    ]
+
+
+def _first(values):
+    return values[0] if values else ""
+
+
+def read_marcxml(file):
+    """
+    Yield records from a MARC21 XML collection.
+
+    Uses 020$a (ISBN), 100$a (author, "Last, First"), 245$a$b (title),
+    520$a (summary), 650$a (genres), 041$a (language) and 260/264$b
+    (imprint). Each 852 holdings field becomes a copy.
+    """
+    number = 0
+    for _event, element in ET.iterparse(file):
+        if element.tag != MARC_NAMESPACE + "record":
+            continue
+        number += 1
+        last_name, _comma, first_name = _first(
+            _subfields(element, "100", "a")
+        ).partition(",")
+        record = {
+            "isbn": _first(_subfields(element, "020", "a")).split(" ")[0],
+            "title": " ".join(
+                _subfields(element, "245", "a")
+                + _subfields(element, "245", "b")
+            ).strip(" /:;"),
+            "summary": _first(_subfields(element, "520", "a")),
+            "author_first_name": first_name.strip(" ,."),
+            "author_last_name": last_name.strip(" ,."),
+            "genres": [
+                genre.rstrip(".") for genre in _subfields(element, "650", "a")
+            ],
+            "language": _first(_subfields(element, "041", "a")),
+        }
+        imprint = _first(
+            _subfields(element, "260", "b") or _subfields(element, "264", "b")
+        ).strip(" ,:;")
+        holdings = element.findall("%sdatafield[@tag='852']" % MARC_NAMESPACE)
+        if not holdings:
+            yield number, record
+        for _holding in holdings:
+            yield number, dict(record, imprint=imprint, status="a")
+        # Разобранные записи не нужны: держим в памяти только текущую.
+        element.clear()
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl, "marcxml": read_marcxml}
+
+
+def _text(record, column, max_length=None):
+    value = record.get(column)
+    value = "" if value is None else str(value).strip()
+    if max_length and len(value) > max_length:
+        raise ValidationError(
+            "%s is longer than %d characters." % (column, max_length)
+        )
+    return value
+
+
+def clean_isbn(value):
+    """Normalize ``value`` the way ``ISBNField`` saves it and validate."""
+    value = value.replace(" ", "").replace("-", "").upper()
+    ISBNValidator(value)
+    return value
+
+
+def clean_record(record):
+    """Validated record dict; raises ``ValidationError``."""
+    from .models import BookInstance
+
+    if isinstance(record, ValidationError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValidationError("Record is not an object.")
+    title = _text(record, "title", 200)
+    if not title:
+        raise ValidationError("title is required.")
+    genres = record.get("genres") or []
+    if isinstance(genres, str):
+        genres = genres.split(";")
+    cleaned = {
+        "book_id": _text(record, "book_id"),
+        "title": title,
+        "isbn": clean_isbn(_text(record, "isbn")),
+        "summary": _text(record, "summary", 1000),
+        "language": _text(record, "language", 200),
+        "author": (
+            _text(record, "author_first_name", 100),
+            _text(record, "author_last_name", 100),
+        ),
+        "genres": sorted(
+            {str(genre).strip() for genre in genres} - {""}, key=str.lower
+        ),
+        "copy": None,
+    }
+    if any(_text(record, column) for column in COPY_COLUMNS):
+        status = _text(record, "status") or "a"
+        if status not in dict(BookInstance.LOAN_STATUS):
+            raise ValidationError("Unknown status %r." % status)
+        due_back = _text(record, "due_back")
+        try:
+            due_back = date.fromisoformat(due_back) if due_back else None
+        except ValueError:
+            raise ValidationError("Invalid due_back %r." % due_back) from None
+        cleaned["copy"] = {
+            "imprint": _text(record, "imprint", 200),
+            "status": status,
+            "due_back": due_back,
+        }
+    return cleaned
+
+
+class CatalogImporter:
+    """
+    Import records in batches of ``batch_size``.
+
+    ``on_reject(line, message)`` is called for every rejected record and
+    ``on_progress(importer)`` after every batch.
+    """
+
+    def __init__(self, batch_size=5000, on_reject=None, on_progress=None):
+        from .models import Author, Genre, Language
+
+        self.batch_size = batch_size
+        self.on_reject = on_reject
+        self.on_progress = on_progress
+        self.authors = {
+            (first_name, last_name): pk
+            for pk, first_name, last_name in Author.objects.values_list(
+                "pk", "first_name", "last_name"
+            )
+        }
+        self.genres = dict(Genre.objects.values_list("name", "pk"))
+        self.languages = dict(Language.objects.values_list("name", "pk"))
+        self.existing_author_ids = set(self.authors.values())
+        self.touched_author_ids = set()
+        # Ключ книги в источнике -> id созданной книги.
+        self.books = {}
+        self.counts = dict.fromkeys(
+            ("records", "rejected", "books", "copies", "authors"), 0
+        )
+        self.started = time.perf_counter()
+
+    @property
+    def records_per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return self.counts["records"] / elapsed if elapsed else 0
+
+    def run(self, records):
+        """Import ``(line number, record)`` pairs; return ``counts``."""
+        batch = []
+        for line, record in records:
+            batch.append((line, record))
+            if len(batch) == self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        self.finish()
+        return self.counts
+
+    def _clean(self, batch):
+        for line, record in batch:
+            self.counts["records"] += 1
+            try:
+                yield clean_record(record)
+            except ValidationError as error:
+                self.counts["rejected"] += 1
+                if self.on_reject:
+                    self.on_reject(line, " ".join(error.messages))
+
+    def _create_missing(self, model, lookup, keys, make):
+        """Create objects for ``keys`` missing from ``lookup``."""
+        missing = sorted(set(keys) - set(lookup) - {"", ("", "")})
+        created = model.objects.bulk_create(make(key) for key in missing)
+        for key, obj in zip(missing, created, strict=True):
+            lookup[key] = obj.pk
+        return len(created)
+
+    def import_batch(self, batch):
+        from .models import Author, Book, BookInstance, Genre, Language
+
+        records = list(self._clean(batch))
+        with transaction.atomic():
+            self.counts["authors"] += self._create_missing(
+                Author,
+                self.authors,
+                (record["author"] for record in records),
+                lambda key: Author(first_name=key[0], last_name=key[1]),
+            )
+            self._create_missing(
+                Genre,
+                self.genres,
+                (genre for record in records for genre in record["genres"]),
+                lambda name: Genre(name=name),
+            )
+            self._create_missing(
+                Language,
+                self.languages,
+                (record["language"] for record in records),
+                lambda name: Language(name=name),
+            )
+
+            new_books = {}
+            # Ключ книги -> [экземпляров, доступных] в этой пачке.
+            copy_counts = defaultdict(lambda: [0, 0])
+            for record in records:
+                key = record["book_id"] or (
+                    record["isbn"],
+                    record["title"],
+                    record["author"],
+                )
+                record["key"] = key
+                if key not in self.books and key not in new_books:
+                    new_books[key] = record
+                if record["copy"]:
+                    copy_counts[key][0] += 1
+                    copy_counts[key][1] += record["copy"]["status"] == "a"
+            books = Book.objects.bulk_create(
+                Book(
+                    title=record["title"],
+                    summary=record["summary"],
+                    isbn=record["isbn"],
+                    author_id=self.authors.get(record["author"]),
+                    language_id=self.languages.get(record["language"]),
+                    copies_total=copy_counts[key][0],
+                    copies_available=copy_counts[key][1],
+                )
+                for key, record in new_books.items()
+            )
+            for key, book in zip(new_books, books, strict=True):
+                self.books[key] = book.pk
+            # Книги из прошлых пачек получают новые экземпляры через F().
+            Book.adjust_copies(
+                {
+                    self.books[key]: counts
+                    for key, counts in copy_counts.items()
+                    if key not in new_books
+                }
+            )
+            Book.genre.through.objects.bulk_create(
+                Book.genre.through(
+                    book_id=self.books[key], genre_id=self.genres[genre]
+                )
+                for key, record in new_books.items()
+                for genre in record["genres"]
+            )
+            copies = BookInstance.objects.bulk_create(
+                BookInstance(
+                    book_id=self.books[record["key"]], **record["copy"]
+                )
+                for record in records
+                if record["copy"]
+            )
+            with connection.cursor() as cursor:
+                search.write_documents(
+                    cursor,
+                    [
+                        (
+                            self.books[key],
+                            record["title"],
+                            record["summary"],
+                            " ".join(record["author"]).strip(),
+                            " ".join(record["genres"]),
+                        )
+                        for key, record in new_books.items()
+                    ],
+                    replace=False,
+                )
+            self.touched_author_ids.update(
+                self.authors.get(record["author"])
+                for record in new_books.values()
+            )
+
+        self.counts["books"] += len(books)
+        self.counts["copies"] += len(copies)
+        if self.on_progress:
+            self.on_progress(self)
+
+    def finish(self):
+        """Refresh what the skipped signals would have updated."""
+        from .models import CatalogStats
+        from .signals import pages_changed
+
+        CatalogStats.rebuild()
+        # Новые книги видны на страницах уже существовавших авторов.
+        pages_changed(
+            author_ids=self.touched_author_ids & self.existing_author_ids
+        )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from catalog import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Export every book copy with its book, author and genres "
+        "as CSV or JSON Lines."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=sorted(export.FORMATS), default="csv"
+        )
+        parser.add_argument(
+            "--output",
+            "-o",
+            help="File to write to (standard output by default).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of books read from the database per batch.",
+        )
+
+    def handle(self, *args, **options):
+        blocks = export.export(
+            options["format"], chunk_size=options["chunk_size"]
+        )
+        if options["output"]:
+            with open(
+                options["output"], "w", encoding="utf-8", newline=""
+            ) as output:
+                output.writelines(blocks)
+        else:
+            for block in blocks:
+                self.stdout.write(block, ending="")
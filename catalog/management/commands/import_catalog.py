@@ -0,0 +1,109 @@
+import sys
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from catalog import importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Import books and copies from CSV, JSON Lines or MARCXML "
+        "(the columns of export_catalog)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", help="File to import, or - for standard input."
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(importer.READERS),
+            help="Input format (guessed from the file extension by default).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of records written per transaction.",
+        )
+        parser.add_argument(
+            "--rejects",
+            help="File to write rejected records to (line and reason).",
+        )
+
+    def guess_format(self, path):
+        for format, extensions in (
+            ("csv", (".csv",)),
+            ("jsonl", (".jsonl", ".ndjson")),
+            ("marcxml", (".xml", ".marcxml")),
+        ):
+            if path.lower().endswith(extensions):
+                return format
+        raise CommandError(
+            "Cannot guess the format of %s, use --format." % path
+        )
+
+    def open_input(self, path, format, stack):
+        # MARCXML разбирается из байтов, остальные форматы - текст.
+        binary = format == "marcxml"
+        if path == "-":
+            return sys.stdin.buffer if binary else sys.stdin
+        try:
+            if binary:
+                return stack.enter_context(open(path, "rb"))
+            return stack.enter_context(
+                open(path, encoding="utf-8", newline="")
+            )
+        except OSError as error:
+            raise CommandError(error) from None
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError(
+                "The database does not return ids from bulk inserts."
+            )
+        path = options["path"]
+        format = options["format"] or self.guess_format(path)
+
+        with ExitStack() as stack:
+            file = self.open_input(path, format, stack)
+            rejects = None
+            if options["rejects"]:
+                rejects = stack.enter_context(
+                    open(options["rejects"], "w", encoding="utf-8")
+                )
+
+            def on_reject(line, message):
+                if rejects:
+                    rejects.write("%s: %s\n" % (line, message))
+                else:
+                    self.stderr.write("Line %s rejected: %s" % (line, message))
+
+            def on_progress(importer):
+                self.stdout.write(
+                    "%(records)d records, %(books)d books, "
+                    "%(copies)d copies, %(rejected)d rejected"
+                    % importer.counts
+                    + " (%d records/s)" % importer.records_per_second
+                )
+
+            catalog_importer = importer.CatalogImporter(
+                batch_size=options["batch_size"],
+                on_reject=on_reject,
+                on_progress=on_progress if options["verbosity"] else None,
+            )
+            counts = catalog_importer.run(importer.READERS[format](file))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Imported %(books)d books, %(copies)d copies and %(authors)d "
+                "new authors from %(records)d records" % counts
+                + " (%d records/s)." % catalog_importer.records_per_second
+            )
+        )
+        if counts["rejected"]:
+            self.stderr.write(
+                self.style.WARNING("%d records rejected." % counts["rejected"])
+            )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from catalog.models import CatalogStats
+
+
+class Command(BaseCommand):
+    help = "Recount the denormalized counters shown on the catalog home page."
+
+    def handle(self, *args, **options):
+        stats = CatalogStats.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Rebuilt catalog stats: %d books, %d copies "
+                "(%d available), %d authors, %d genres."
+                % (
+                    stats.num_books,
+                    stats.num_instances,
+                    stats.num_instances_available,
+                    stats.num_authors,
+                    stats.num_genres,
+                )
+            )
+        )
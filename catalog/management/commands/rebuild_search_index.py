@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from catalog import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents of every book."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of books loaded and written per batch.",
+        )
+
+    def handle(self, *args, **options):
+        total = search.rebuild_index(chunk_size=options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS("Indexed %d books for search." % total)
+        )
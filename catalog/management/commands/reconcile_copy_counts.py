@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from catalog.models import Book
+from catalog.signals import pages_changed
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the per-book copy counters (copies_total, "
+        "copies_available) and fix the books where they drifted."
+    )
+
+    def handle(self, *args, **options):
+        fixed = Book.reconcile_copies()
+        if fixed:
+            # Счётчики показываются на страницах списка книг.
+            pages_changed()
+        self.stdout.write(
+            self.style.SUCCESS("Fixed copy counters of %d books." % fixed)
+        )
@@ -0,0 +1,57 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from catalog import overdue
+
+
+class Command(BaseCommand):
+    help = (
+        "Email every borrower a single notice listing their overdue loans. "
+        "Meant to be run daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=datetime.date.fromisoformat,
+            help="Treat loans due before this date (YYYY-MM-DD) as overdue "
+            "instead of today.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of emails sent per batch.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of loans fetched from the database per chunk.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count the notices without sending them.",
+        )
+
+    def handle(self, *args, **options):
+        counts = overdue.send_notices(
+            today=options["date"],
+            batch_size=options["batch_size"],
+            chunk_size=options["chunk_size"],
+            dry_run=options["dry_run"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "%s %d notices for %d overdue loans "
+                "(%d borrowers without email)."
+                % (
+                    "Would send" if options["dry_run"] else "Sent",
+                    counts["notices"],
+                    counts["loans"],
+                    counts["skipped"],
+                )
+            )
+        )
@@ -0,0 +1,79 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import seeding
+from catalog.models import Book
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill an empty catalog with reproducible synthetic books, copies "
+        "and readers for benchmarks and load tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--books", type=int, default=1000, help="Number of books."
+        )
+        parser.add_argument(
+            "--copies-per-book",
+            type=int,
+            default=10,
+            help="Number of copies of every book.",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=1000,
+            help="Number of readers borrowing the copies.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed; the same seed gives the same catalog.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Number of rows written per INSERT.",
+        )
+
+    def handle(self, *args, **options):
+        if options["books"] < 1 or options["users"] < 1:
+            raise CommandError("--books and --users must be positive.")
+        if Book.objects.exists():
+            raise CommandError(
+                "The catalog is not empty; seed_catalog fills an empty "
+                "database only."
+            )
+        if User.objects.filter(username__regex=r"^reader[0-9]+$").exists():
+            raise CommandError(
+                "Users named reader<N> already exist; seed_catalog creates "
+                "its readers under these names."
+            )
+        started = time.perf_counter()
+        counts = seeding.seed_catalog(
+            books=options["books"],
+            copies_per_book=options["copies_per_book"],
+            users=options["users"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Created %d books by %d authors, %d copies (%d set aside "
+                "for holds) and %d readers in %.1f s."
+                % (
+                    counts["books"],
+                    counts["authors"],
+                    counts["copies"],
+                    counts["holds"],
+                    counts["users"],
+                    time.perf_counter() - started,
+                )
+            )
+        )
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+def populate_catalog_stats(apps, schema_editor):
+    Author = apps.get_model("catalog", "Author")
+    Book = apps.get_model("catalog", "Book")
+    BookInstance = apps.get_model("catalog", "BookInstance")
+    CatalogStats = apps.get_model("catalog", "CatalogStats")
+    Genre = apps.get_model("catalog", "Genre")
+
+    CatalogStats.objects.update_or_create(
+        pk=1,
+        defaults={
+            "num_books": Book.objects.count(),
+            "num_instances": BookInstance.objects.count(),
+            "num_instances_available": BookInstance.objects.filter(
+                status__exact="a"
+            ).count(),
+            "num_authors": Author.objects.count(),
+            "num_genres": Genre.objects.count(),
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_alter_bookinstance_options"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("num_books", models.PositiveIntegerField(default=0)),
+                ("num_instances", models.PositiveIntegerField(default=0)),
+                (
+                    "num_instances_available",
+                    models.PositiveIntegerField(default=0),
+                ),
+                ("num_authors", models.PositiveIntegerField(default=0)),
+                ("num_genres", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "catalog stats",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="author",
+            options={"ordering": ["last_name", "first_name"]},
+        ),
+        migrations.AlterField(
+            model_name="author",
+            name="date_of_death",
+            field=models.DateField(blank=True, null=True, verbose_name="died"),
+        ),
+        migrations.RunPython(
+            populate_catalog_stats, migrations.RunPython.noop
+        ),
+    ]
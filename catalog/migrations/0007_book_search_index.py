@@ -0,0 +1,27 @@
+from django.db import migrations
+
+from catalog import search
+
+
+def create_search_index(apps, schema_editor):
+    Book = apps.get_model("catalog", "Book")
+
+    search.create_index(schema_editor)
+    books = Book.objects.select_related("author").prefetch_related("genre")
+    with schema_editor.connection.cursor() as cursor:
+        search.write_documents(cursor, list(search.book_documents(books)))
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0006_catalog_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:58
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_copy_counters(apps, schema_editor):
+    Book = apps.get_model("catalog", "Book")
+    BookInstance = apps.get_model("catalog", "BookInstance")
+
+    copies = (
+        BookInstance.objects.filter(book=OuterRef("pk"))
+        .order_by()
+        .values("book")
+    )
+
+    def count(queryset):
+        return Coalesce(
+            Subquery(queryset.annotate(count=Count("*")).values("count")), 0
+        )
+
+    Book.objects.update(
+        copies_total=count(copies),
+        copies_available=count(copies.filter(status="a")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0008_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="copies_available",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="copies_total",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            populate_copy_counters, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0010_reservation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VisitCounter",
+            fields=[
+                (
+                    "visitor",
+                    models.CharField(
+                        max_length=32, primary_key=True, serialize=False
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,9 +1,14 @@
+import asyncio
 import uuid
+from collections import defaultdict
 from datetime import date
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.urls import reverse
+from django.utils import timezone
 from isbn_field import ISBNField
 
 
@@ -33,6 +38,92 @@ class Book(models.Model):
     language = models.ForeignKey(
         "Language", on_delete=models.SET_NULL, null=True
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Денормализованные счётчики экземпляров (см. catalog.signals).
+    copies_total = models.PositiveIntegerField(default=0, editable=False)
+    copies_available = models.PositiveIntegerField(default=0, editable=False)
+
+    COPY_COUNTERS = ("copies_total", "copies_available")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["title", "id"], name="book_title_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Прежний автор: при смене автора книга пропадает с его страницы.
+        instance._loaded_author_id = instance.__dict__.get("author_id")
+        return instance
+
+    def save(self, **kwargs):
+        # Счётчики меняются только прибавлением через F(); сохранение
+        # загруженной ранее книги не должно затирать их старыми значениями.
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COPY_COUNTERS
+            ]
+        super().save(**kwargs)
+
+    @classmethod
+    def adjust_copies(cls, deltas):
+        """
+        Atomically add ``deltas`` (book id -> ``(total, available)``) to
+        the copy counters; books with equal deltas share one query.
+        Counters that drifted are clamped at zero, like
+        ``CatalogStats.adjust()``.
+        """
+        book_ids_by_delta = defaultdict(list)
+        for book_id, delta in deltas.items():
+            if book_id is not None and any(delta):
+                book_ids_by_delta[tuple(delta)].append(book_id)
+        for (total, available), book_ids in book_ids_by_delta.items():
+            cls.objects.filter(pk__in=book_ids).update(
+                copies_total=Greatest(F("copies_total") + total, 0),
+                copies_available=Greatest(
+                    F("copies_available") + available, 0
+                ),
+            )
+
+    @classmethod
+    def reconcile_copies(cls, book_ids=None):
+        """
+        Recount the copy counters of ``book_ids`` (all books by default)
+        from ``BookInstance``; return the number of corrected books.
+        """
+        copies = (
+            BookInstance.objects.filter(book=OuterRef("pk"))
+            .order_by()
+            .values("book")
+        )
+        counted = {
+            name: Coalesce(
+                Subquery(queryset.annotate(count=Count("*")).values("count")),
+                0,
+            )
+            for name, queryset in (
+                ("copies_total", copies),
+                ("copies_available", copies.filter(status="a")),
+            )
+        }
+        books = cls.objects.all()
+        if book_ids is not None:
+            books = books.filter(pk__in=list(book_ids))
+        stale = books.annotate(
+            **{"counted_%s" % name: count for name, count in counted.items()}
+        ).filter(
+            ~Q(copies_total=F("counted_copies_total"))
+            | ~Q(copies_available=F("counted_copies_available"))
+        )
+        return stale.update(**counted)
 
     def __str__(self):
         return self.title
@@ -73,10 +164,42 @@ class BookInstance(models.Model):
         default="m",
         help_text="Book availability",
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["due_back"]
         permissions = (("can_mark_returned", "Set book as returned"),)
+        indexes = [
+            # "Мои книги": borrower + status, упорядочено по due_back.
+            models.Index(
+                fields=["borrower", "status", "due_back", "id"],
+                name="bookinst_borrower_loans_idx",
+            ),
+            # Фильтр по статусу (главная страница, list_filter админки)
+            # с сортировкой по умолчанию по due_back.
+            models.Index(
+                fields=["status", "due_back", "id"],
+                name="bookinst_status_due_idx",
+            ),
+            # Частичный индекс только по выданным экземплярам
+            # для поиска просроченных (due_back < today). SQLite
+            # не применяет его к параметризованным запросам, там
+            # работает bookinst_status_due_idx.
+            models.Index(
+                fields=["due_back", "id"],
+                name="bookinst_on_loan_due_idx",
+                condition=Q(status="o"),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженные статус и книгу, чтобы сигналы могли
+        # посчитать изменение счётчиков без повторного запроса.
+        instance._loaded_status = instance.__dict__.get("status")
+        instance._loaded_book_id = instance.__dict__.get("book_id")
+        return instance
 
     def __str__(self):
         return "%s (%s)" % (self.id, self.book.title)
@@ -93,9 +216,16 @@ class Author(models.Model):
     last_name = models.CharField(max_length=100)
     date_of_birth = models.DateField(null=True, blank=True)
     date_of_death = models.DateField("died", null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["last_name", "first_name"]
+        indexes = [
+            models.Index(
+                fields=["last_name", "first_name", "id"],
+                name="author_name_idx",
+            ),
+        ]
 
     def get_absolute_url(self):
         return reverse("author-detail", args=[str(self.id)])
@@ -104,6 +234,65 @@ class Author(models.Model):
         return "%s, %s" % (self.last_name, self.first_name)
 
 
+class Reservation(models.Model):
+    """
+    A patron's hold on a book. Waiting holds of a book are served in
+    ``created_at`` order by ``catalog.reservations.allocate()``.
+    """
+
+    WAITING = "w"
+    READY = "r"
+    FULFILLED = "f"
+    CANCELLED = "c"
+    STATUS = (
+        (WAITING, "Waiting"),
+        (READY, "Ready for pickup"),
+        (FULFILLED, "Fulfilled"),
+        (CANCELLED, "Cancelled"),
+    )
+    ACTIVE = (WAITING, READY)
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    patron = models.ForeignKey(User, on_delete=models.CASCADE)
+    status = models.CharField(max_length=1, choices=STATUS, default=WAITING)
+    # Экземпляр, отложенный для читателя (статус "r" у экземпляра).
+    copy = models.ForeignKey(
+        BookInstance, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    allocated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        indexes = [
+            # Очередь книги: ожидающие брони по времени создания.
+            models.Index(
+                fields=["book", "status", "created_at", "id"],
+                name="reservation_queue_idx",
+            ),
+        ]
+        constraints = [
+            # Экземпляр не может быть отложен для двух броней сразу.
+            models.UniqueConstraint(
+                fields=["copy"],
+                condition=Q(status="r"),
+                name="reservation_copy_once",
+            ),
+            models.UniqueConstraint(
+                fields=["book", "patron"],
+                condition=Q(status__in=["w", "r"]),
+                name="reservation_active_once",
+            ),
+        ]
+
+    def __str__(self):
+        return "%s: %s (%s)" % (
+            self.patron,
+            self.book,
+            self.get_status_display(),
+        )
+
+
 class Language(models.Model):
     name = models.CharField(
         max_length=200,
@@ -117,3 +306,118 @@ class Language(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class CatalogStats(models.Model):
+    """
+    Single-row table of denormalized catalog counters for the home page.
+
+    Kept current by the signal handlers in ``catalog.signals``; use
+    ``manage.py rebuild_catalog_stats`` after bulk changes that bypass
+    signals (``QuerySet.update()``, ``bulk_create()``, raw SQL).
+    """
+
+    num_books = models.PositiveIntegerField(default=0)
+    num_instances = models.PositiveIntegerField(default=0)
+    num_instances_available = models.PositiveIntegerField(default=0)
+    num_authors = models.PositiveIntegerField(default=0)
+    num_genres = models.PositiveIntegerField(default=0)
+    # Время последнего изменения каталога (для Last-Modified списков).
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "catalog stats"
+
+    def __str__(self):
+        return "Catalog stats"
+
+    @classmethod
+    def load(cls):
+        """Return the counters row, building it on first use."""
+        try:
+            return cls.objects.get(pk=1)
+        except cls.DoesNotExist:
+            return cls.rebuild()
+
+    @classmethod
+    async def aload(cls):
+        """Async ``load()``."""
+        try:
+            return await cls.objects.aget(pk=1)
+        except cls.DoesNotExist:
+            return await cls.arebuild()
+
+    @staticmethod
+    def _counted():
+        # Счётчик -> queryset, по которому он считается.
+        return {
+            "num_books": Book.objects.all(),
+            "num_instances": BookInstance.objects.all(),
+            "num_instances_available": BookInstance.objects.filter(
+                status__exact="a"
+            ),
+            "num_authors": Author.objects.all(),
+            "num_genres": Genre.objects.all(),
+        }
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every counter from the source tables."""
+        defaults = {
+            name: queryset.count() for name, queryset in cls._counted().items()
+        }
+        stats, _ = cls.objects.update_or_create(
+            pk=1, defaults=dict(defaults, updated_at=timezone.now())
+        )
+        return stats
+
+    @classmethod
+    async def arebuild(cls):
+        """Async ``rebuild()``: the counts are awaited together."""
+        counted = cls._counted()
+        counts = await asyncio.gather(
+            *(queryset.acount() for queryset in counted.values())
+        )
+        stats, _ = await cls.objects.aupdate_or_create(
+            pk=1,
+            defaults=dict(
+                zip(counted, counts, strict=True), updated_at=timezone.now()
+            ),
+        )
+        return stats
+
+    @classmethod
+    def adjust(cls, **deltas):
+        """
+        Atomically add ``deltas`` (field name -> int) to the counters.
+
+        Counters that drifted after bulk changes are clamped at zero
+        instead of failing the write that changed the catalog.
+        """
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(pk=1).update(
+            **{
+                name: Greatest(F(name) + delta, 0)
+                for name, delta in deltas.items()
+            }
+        )
+        if not updated:
+            cls.rebuild()
+
+
+class VisitCounter(models.Model):
+    """
+    Home page visits of one visitor (the ``visitor`` cookie).
+
+    The current count lives in the cache; ``catalog.visits`` copies it
+    here in batches, so rows may lag behind by a few seconds.
+    """
+
+    visitor = models.CharField(max_length=32, primary_key=True)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "%s: %d" % (self.visitor, self.count)
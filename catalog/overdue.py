@@ -0,0 +1,105 @@
+"""
+Overdue loan notices.
+
+Overdue loans are read with one query (``status = 'o' AND due_back <
+today``, see the ``bookinst_status_due_idx`` index) ordered by borrower
+and streamed with ``iterator()``, so only the loans of the current
+borrower are held in memory. Each borrower gets one email listing all of
+their overdue books; emails are sent in batches over one connection of
+the configured email backend.
+"""
+
+import itertools
+from datetime import date
+from operator import itemgetter
+
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+
+LOAN_FIELDS = (
+    "id",
+    "due_back",
+    "book__title",
+    "borrower_id",
+    "borrower__username",
+    "borrower__first_name",
+    "borrower__email",
+)
+
+
+def overdue_loans(today=None, chunk_size=2000):
+    """Overdue loans as dicts of ``LOAN_FIELDS``, grouped by borrower."""
+    from .models import BookInstance
+
+    return (
+        BookInstance.objects.filter(
+            status="o",
+            due_back__lt=today or date.today(),
+            borrower__isnull=False,
+        )
+        .order_by("borrower_id", "due_back", "id")
+        .values(*LOAN_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def loans_by_borrower(loans):
+    """Yield ``(first loan, list of loans)`` per borrower."""
+    for _borrower_id, group in itertools.groupby(
+        loans, key=itemgetter("borrower_id")
+    ):
+        group = list(group)
+        yield group[0], group
+
+
+def notice(loans, today=None):
+    """``EmailMessage`` listing ``loans`` of one borrower."""
+    borrower = loans[0]
+    return EmailMessage(
+        subject="Overdue library books (%d)" % len(loans),
+        body=render_to_string(
+            "catalog/email/overdue_notice.txt",
+            {
+                "name": borrower["borrower__first_name"]
+                or borrower["borrower__username"],
+                "loans": loans,
+                "today": today or date.today(),
+            },
+        ),
+        to=[borrower["borrower__email"]],
+    )
+
+
+def send_notices(today=None, batch_size=100, chunk_size=2000, dry_run=False):
+    """
+    Email every borrower with overdue loans.
+
+    Returns counts of ``loans``, ``notices`` (sent, or that would be sent
+    with ``dry_run``) and ``skipped`` borrowers without an email address.
+    """
+    counts = dict.fromkeys(("loans", "notices", "skipped"), 0)
+    connection = None if dry_run else get_connection()
+    batch = []
+
+    def flush():
+        if batch and connection is not None:
+            connection.send_messages(batch)
+        batch.clear()
+
+    try:
+        for borrower, loans in loans_by_borrower(
+            overdue_loans(today, chunk_size)
+        ):
+            counts["loans"] += len(loans)
+            if not borrower["borrower__email"]:
+                counts["skipped"] += 1
+                continue
+            counts["notices"] += 1
+            batch.append(notice(loans, today))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    finally:
+        if connection is not None:
+            connection.close()
+    return counts
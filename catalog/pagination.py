@@ -0,0 +1,222 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with ``WHERE (ordering columns) > (last seen row)``
+instead of ``OFFSET``, so every page costs the same index range scan no
+matter how deep it is. The ordering must end with a unique column (the
+primary key) so that the position of every row is unambiguous. Fields
+with ``null=True`` sort NULL last and need ``IS NULL`` branches, which
+keep the database from seeking the index; keep them out of the leading
+position of hot orderings.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.http import Http404
+
+FORWARD = "n"
+BACKWARD = "p"
+
+
+class CursorPage:
+    """Page of results with opaque cursors to its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(direction, values):
+    data = json.dumps([direction, values], default=str).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _field(model, name):
+    return model._meta.pk if name == "pk" else model._meta.get_field(name)
+
+
+def decode_cursor(cursor, ordering, model=None):
+    """
+    Return ``(direction, values)``; raise ``ValueError`` if invalid.
+
+    With ``model`` the values are converted by the ordering fields'
+    ``to_python()``, so an edited cursor cannot reach the query with
+    values of the wrong type.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, values = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor: %r" % cursor) from None
+    if direction not in (FORWARD, BACKWARD) or not (
+        isinstance(values, list) and len(values) == len(ordering)
+    ):
+        raise ValueError("Invalid cursor: %r" % cursor)
+    if model is not None:
+        try:
+            values = [
+                _field(model, name).to_python(value)
+                for name, value in zip(ordering, values, strict=True)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise ValueError("Invalid cursor: %r" % cursor) from None
+    return direction, values
+
+
+def _position(row, ordering):
+    if isinstance(row, dict):
+        return [row[field] for field in ordering]
+    return [getattr(row, field) for field in ordering]
+
+
+def _beyond(field, value, forward, null=False):
+    if not null:
+        lookup = "gt" if forward else "lt"
+        return Q(**{f"{field}__{lookup}": value})
+    # NULL сортируется последним в обоих направлениях обхода.
+    if value is None:
+        return Q(pk__in=[]) if forward else Q(**{f"{field}__isnull": False})
+    if forward:
+        return Q(**{f"{field}__gt": value}) | Q(**{f"{field}__isnull": True})
+    return Q(**{f"{field}__lt": value})
+
+
+def _equal(field, value):
+    if value is None:
+        return Q(**{f"{field}__isnull": True})
+    return Q(**{field: value})
+
+
+def keyset_filter(ordering, values, forward=True, nullable=()):
+    """
+    Rows strictly after (or before) ``values`` in ``ordering``.
+
+    Only the fields in ``nullable`` get ``IS NULL`` conditions; with a
+    NOT NULL first field the condition starts with a range on it, so the
+    database can seek the index to the cursor instead of scanning it from
+    the start.
+    """
+    condition = Q(pk__in=[])
+    for index, field in enumerate(ordering):
+        prefix = Q()
+        for prefix_field, prefix_value in zip(
+            ordering[:index], values[:index], strict=True
+        ):
+            prefix &= _equal(prefix_field, prefix_value)
+        condition |= prefix & _beyond(
+            field, values[index], forward, field in nullable
+        )
+    if ordering[0] not in nullable:
+        lookup = "gte" if forward else "lte"
+        condition = Q(**{f"{ordering[0]}__{lookup}": values[0]}) & condition
+    return condition
+
+
+def _order_by(field, forward, null):
+    if forward:
+        return F(field).asc(nulls_last=True) if null else F(field).asc()
+    return F(field).desc(nulls_first=True) if null else F(field).desc()
+
+
+def _cursor_queryset(queryset, ordering, cursor):
+    direction, values = FORWARD, None
+    if cursor:
+        direction, values = decode_cursor(cursor, ordering, queryset.model)
+    forward = direction == FORWARD
+
+    # NULLS LAST и IS NULL только для полей с null=True: для остальных
+    # они мешают использовать индекс.
+    nullable = {
+        field for field in ordering if _field(queryset.model, field).null
+    }
+    queryset = queryset.order_by(
+        *(_order_by(field, forward, field in nullable) for field in ordering)
+    )
+    if values is not None:
+        queryset = queryset.filter(
+            keyset_filter(ordering, values, forward, nullable)
+        )
+    return queryset, forward, values
+
+
+def _cursor_page(rows, ordering, page_size, forward, values):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if not forward:
+        rows.reverse()
+    if not rows:
+        return CursorPage(rows)
+
+    first = encode_cursor(BACKWARD, _position(rows[0], ordering))
+    last = encode_cursor(FORWARD, _position(rows[-1], ordering))
+    if forward:
+        return CursorPage(
+            rows,
+            next_cursor=last if has_more else None,
+            previous_cursor=first if values is not None else None,
+        )
+    return CursorPage(
+        rows, next_cursor=last, previous_cursor=first if has_more else None
+    )
+
+
+def paginate_by_cursor(queryset, ordering, page_size, cursor=None):
+    """
+    Return a ``CursorPage`` of ``queryset`` ordered by ``ordering``.
+
+    ``ordering`` is a sequence of ascending field names ending with a
+    unique field. Raises ``ValueError`` for a malformed ``cursor``.
+    """
+    queryset, forward, values = _cursor_queryset(queryset, ordering, cursor)
+    rows = list(queryset[: page_size + 1])
+    return _cursor_page(rows, ordering, page_size, forward, values)
+
+
+async def apaginate_by_cursor(queryset, ordering, page_size, cursor=None):
+    """Async ``paginate_by_cursor()``."""
+    queryset, forward, values = _cursor_queryset(queryset, ordering, cursor)
+    rows = [row async for row in queryset[: page_size + 1]]
+    return _cursor_page(rows, ordering, page_size, forward, values)
+
+
+class CursorPaginationMixin:
+    """
+    ``ListView`` mixin replacing OFFSET pagination with keyset cursors.
+
+    ``cursor_ordering`` lists the ascending fields pages are keyed on and
+    must end with a unique field.
+    """
+
+    cursor_ordering = ("pk",)
+    cursor_query_param = "cursor"
+    paginate_by = 10
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get(self.cursor_query_param)
+        try:
+            page = paginate_by_cursor(
+                queryset, self.cursor_ordering, page_size, cursor
+            )
+        except ValueError:
+            raise Http404("Invalid cursor.") from None
+        return (None, page, page.object_list, page.has_other_pages())
@@ -0,0 +1,161 @@
+"""
+Hold queue: patrons reserve a book and get its copies in request order.
+
+``allocate()`` pairs available copies of books with their waiting
+reservations, oldest first, and sets those copies aside (status ``"r"``).
+Copies and reservations are locked with ``SELECT ... FOR UPDATE SKIP
+LOCKED``: desks returning copies of the same book at the same time lock
+different rows instead of waiting for each other, and no copy or hold is
+handed out twice. SQLite has no row locks and ignores the clause; there
+writes are serialized by the database lock, and the conditional
+``UPDATE``s below plus the unique constraints on ``Reservation`` keep a
+copy or a hold from being allocated twice.
+"""
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+
+def place(book, patron):
+    """
+    Queue a hold of ``patron`` on ``book`` unless one is active already;
+    return ``(reservation, created)``. A free copy is allocated at once.
+    """
+    from .models import Reservation
+
+    active = Reservation.objects.filter(
+        book=book, patron=patron, status__in=Reservation.ACTIVE
+    )
+    reservation = active.first()
+    if reservation is not None:
+        return reservation, False
+    try:
+        with transaction.atomic():
+            reservation = Reservation.objects.create(book=book, patron=patron)
+    except IntegrityError:
+        # Параллельный запрос того же читателя успел первым.
+        return active.get(), False
+    allocate([book.pk])
+    reservation.refresh_from_db()
+    return reservation, True
+
+
+def queue_position(reservation):
+    """1-based place of a waiting ``reservation`` in its book's queue."""
+    from .models import Reservation
+
+    return (
+        Reservation.objects.filter(
+            book_id=reservation.book_id,
+            status=Reservation.WAITING,
+            created_at__lte=reservation.created_at,
+        )
+        .exclude(created_at=reservation.created_at, id__gt=reservation.pk)
+        .count()
+    )
+
+
+def allocate(book_ids):
+    """
+    Set available copies of ``book_ids`` aside for the oldest waiting
+    reservations; return the number of allocated copies.
+    """
+    from .models import Book, BookInstance, CatalogStats, Reservation
+    from .signals import books_changed
+
+    allocated = {}
+    now = timezone.now()
+    with transaction.atomic():
+        queued = (
+            Reservation.objects.filter(
+                book_id__in=list(book_ids), status=Reservation.WAITING
+            )
+            .order_by("book_id")
+            .values_list("book_id", flat=True)
+            .distinct()
+        )
+        for book_id in queued:
+            # Свободных экземпляров у книги с очередью обычно мало.
+            copy_ids = list(
+                BookInstance.objects.select_for_update(skip_locked=True)
+                .filter(book_id=book_id, status="a")
+                .order_by("id")
+                .values_list("pk", flat=True)
+            )
+            if not copy_ids:
+                continue
+            waiting = list(
+                Reservation.objects.select_for_update(skip_locked=True)
+                .filter(book_id=book_id, status=Reservation.WAITING)
+                .order_by("created_at", "id")
+                .values_list("pk", flat=True)[: len(copy_ids)]
+            )
+            count = 0
+            for reservation_id, copy_id in zip(
+                waiting, copy_ids, strict=False
+            ):
+                # Условные UPDATE: без блокировок строк (SQLite) проверяют,
+                # что экземпляр и бронь всё ещё свободны.
+                if not BookInstance.objects.filter(
+                    pk=copy_id, status="a"
+                ).update(
+                    status="r", due_back=None, borrower=None, updated_at=now
+                ):
+                    continue
+                if not Reservation.objects.filter(
+                    pk=reservation_id, status=Reservation.WAITING
+                ).update(
+                    status=Reservation.READY, copy_id=copy_id, allocated_at=now
+                ):
+                    # Бронь уже обслужена: экземпляр возвращается на полку.
+                    BookInstance.objects.filter(pk=copy_id).update(status="a")
+                    continue
+                count += 1
+            if count:
+                allocated[book_id] = count
+
+        if allocated:
+            Book.adjust_copies(
+                {book_id: (0, -count) for book_id, count in allocated.items()}
+            )
+            CatalogStats.adjust(
+                num_instances_available=-sum(allocated.values())
+            )
+            books_changed(allocated)
+    return sum(allocated.values())
+
+
+def release(copy_ids):
+    """Cancel ready holds on ``copy_ids`` (not picked up in time)."""
+    from .models import Reservation
+
+    return Reservation.objects.filter(
+        copy_id__in=list(copy_ids), status=Reservation.READY
+    ).update(status=Reservation.CANCELLED)
+
+
+def cancel(reservation):
+    """
+    Cancel an active ``reservation``; a copy set aside for it goes to the
+    next hold in the queue or back to the shelf.
+    """
+    from .models import Book, BookInstance, CatalogStats, Reservation
+    from .signals import books_changed
+
+    with transaction.atomic():
+        active = Reservation.objects.select_for_update().filter(
+            pk=reservation.pk, status__in=Reservation.ACTIVE
+        )
+        # copy_id читается под блокировкой: бронь могла быть обслужена
+        # после загрузки ``reservation``.
+        copy_id = active.values_list("copy_id", flat=True).first()
+        if not active.update(status=Reservation.CANCELLED):
+            return False
+        if copy_id is not None and BookInstance.objects.filter(
+            pk=copy_id, status="r"
+        ).update(status="a", updated_at=timezone.now()):
+            Book.adjust_copies({reservation.book_id: (0, 1)})
+            CatalogStats.adjust(num_instances_available=1)
+            books_changed([reservation.book_id])
+            allocate([reservation.book_id])
+    return True
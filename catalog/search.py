@@ -0,0 +1,242 @@
+"""
+Full-text book search.
+
+Each book has one document in the ``catalog_booksearch`` table built from
+its title, summary, author name and genre names. On SQLite the table is an
+FTS5 virtual table ranked with ``bm25`` over every match; on PostgreSQL it
+holds a weighted ``tsvector`` with a GIN index ranked with ``ts_rank``
+over the first ``CANDIDATES`` matches. Other databases fall back to
+``icontains`` lookups without ranking.
+
+The documents are kept in sync by the handlers in ``catalog.signals``;
+``manage.py rebuild_search_index`` rebuilds them from scratch.
+"""
+
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+TABLE = "catalog_booksearch"
+
+# Максимум результатов поиска, которые можно пролистать.
+MAX_RESULTS = 200
+
+# Сколько совпадений ранжируется на PostgreSQL: ts_rank читает tsvector
+# каждой строки, и для частых слов сортировка всех совпадений заняла бы
+# секунды. FTS5 ранжирует все совпадения сам (на 300 000 книг ~40 мс
+# для слова с 24 000 совпадений), поэтому на SQLite предела нет.
+CANDIDATES = 5000
+
+
+class SearchResults(list):
+    """Ranked book ids; ``truncated`` if only some matches were ranked."""
+
+    truncated = False
+
+
+def _documents_table_sql(vendor):
+    if vendor == "sqlite":
+        return [
+            "CREATE VIRTUAL TABLE %s USING fts5("
+            "title, summary, authors, genres, "
+            "tokenize = 'unicode61 remove_diacritics 2')" % TABLE
+        ]
+    if vendor == "postgresql":
+        return [
+            "CREATE TABLE %s ("
+            "book_id bigint PRIMARY KEY "
+            "REFERENCES catalog_book (id) ON DELETE CASCADE "
+            "DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)" % TABLE,
+            "CREATE INDEX %s_document_idx ON %s USING GIN (document)"
+            % (TABLE, TABLE),
+        ]
+    return []
+
+
+def create_index(schema_editor):
+    for sql in _documents_table_sql(schema_editor.connection.vendor):
+        schema_editor.execute(sql)
+
+
+def drop_index(schema_editor):
+    if _documents_table_sql(schema_editor.connection.vendor):
+        schema_editor.execute("DROP TABLE IF EXISTS %s" % TABLE)
+
+
+def write_documents(cursor, documents, replace=True):
+    """
+    Store ``documents``: ``(book_id, title, summary, authors, genres)``.
+
+    ``replace=False`` skips removing previous documents of the same books
+    and is only safe on an empty index.
+    """
+    vendor = cursor.db.vendor
+    if vendor == "sqlite":
+        if replace:
+            cursor.executemany(
+                "DELETE FROM %s WHERE rowid = %%s" % TABLE,
+                [(document[0],) for document in documents],
+            )
+        cursor.executemany(
+            "INSERT INTO %s (rowid, title, summary, authors, genres) "
+            "VALUES (%%s, %%s, %%s, %%s, %%s)" % TABLE,
+            documents,
+        )
+    elif vendor == "postgresql":
+        cursor.executemany(
+            "INSERT INTO %s (book_id, document) VALUES (%%s, "
+            "setweight(to_tsvector('simple', %%s), 'A') || "
+            "setweight(to_tsvector('simple', %%s), 'D') || "
+            "setweight(to_tsvector('simple', %%s), 'B') || "
+            "setweight(to_tsvector('simple', %%s), 'C')) "
+            "ON CONFLICT (book_id) DO UPDATE "
+            "SET document = EXCLUDED.document" % TABLE,
+            documents,
+        )
+
+
+def _delete_documents(cursor, book_ids):
+    vendor = cursor.db.vendor
+    if vendor == "sqlite":
+        column = "rowid"
+    elif vendor == "postgresql":
+        column = "book_id"
+    else:
+        return
+    cursor.executemany(
+        "DELETE FROM %s WHERE %s = %%s" % (TABLE, column),
+        [(book_id,) for book_id in book_ids],
+    )
+
+
+def book_documents(books):
+    """Search documents for ``books`` (with author and genres loaded)."""
+    for book in books:
+        yield (
+            book.pk,
+            book.title,
+            book.summary,
+            (
+                "%s %s" % (book.author.first_name, book.author.last_name)
+                if book.author
+                else ""
+            ),
+            " ".join(genre.name for genre in book.genre.all()),
+        )
+
+
+def index_books(book_ids):
+    """Refresh the documents of ``book_ids``, dropping deleted books."""
+    from .models import Book
+
+    book_ids = set(book_ids)
+    if not book_ids:
+        return
+    books = (
+        Book.objects.filter(pk__in=book_ids)
+        .select_related("author")
+        .prefetch_related("genre")
+    )
+    documents = list(book_documents(books))
+    with connection.cursor() as cursor:
+        _delete_documents(
+            cursor, book_ids - {document[0] for document in documents}
+        )
+        write_documents(cursor, documents)
+
+
+def remove_books(book_ids):
+    with connection.cursor() as cursor:
+        _delete_documents(cursor, book_ids)
+
+
+def rebuild_index(chunk_size=2000):
+    """Rebuild every document; returns the number of indexed books."""
+    from .models import Book
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor in ("sqlite", "postgresql"):
+            cursor.execute("DELETE FROM %s" % TABLE)
+        books = (
+            Book.objects.select_related("author")
+            .prefetch_related("genre")
+            .order_by("pk")
+            .iterator(chunk_size=chunk_size)
+        )
+        batch = []
+        total = 0
+        for document in book_documents(books):
+            batch.append(document)
+            if len(batch) == chunk_size:
+                write_documents(cursor, batch, replace=False)
+                total += len(batch)
+                batch = []
+        write_documents(cursor, batch, replace=False)
+    return total + len(batch)
+
+
+def _terms(query):
+    return re.findall(r"\w+", query)
+
+
+def search_books(query, limit=MAX_RESULTS):
+    """
+    Ids of books matching ``query``, best match first.
+
+    Returns ``SearchResults``; on PostgreSQL its ``truncated`` is set when
+    the query has more than ``CANDIDATES`` matches and the best ones may
+    be among those left unranked.
+    """
+    from .models import Book
+
+    terms = _terms(query)
+    if not terms:
+        return SearchResults()
+    if connection.vendor == "sqlite":
+        # Каждое слово в кавычках (без синтаксиса FTS5) и с поиском
+        # по префиксу; bm25: заголовок важнее автора и жанра. Ранжируются
+        # все совпадения, второй столбец (0) - как у PostgreSQL.
+        match = " ".join('"%s"*' % term for term in terms)
+        sql = (
+            "SELECT rowid, 0 FROM {table} WHERE {table} MATCH %s "
+            "ORDER BY bm25({table}, 10.0, 1.0, 5.0, 3.0), rowid LIMIT %s"
+        ).format(table=TABLE)
+        params = [match, limit]
+    elif connection.vendor == "postgresql":
+        # Второй столбец - число кандидатов; кандидатов на один больше
+        # CANDIDATES, чтобы отличить ровно CANDIDATES совпадений от
+        # большего числа.
+        sql = (
+            "SELECT book_id, matches FROM (SELECT book_id, document, "
+            "count(*) OVER () AS matches "
+            "FROM (SELECT book_id, document FROM {table} "
+            "WHERE document @@ to_tsquery('simple', %s) LIMIT %s) "
+            "limited) candidates "
+            "ORDER BY ts_rank(document, to_tsquery('simple', %s)) DESC, "
+            "book_id LIMIT %s"
+        ).format(table=TABLE)
+        tsquery = " & ".join("%s:*" % term for term in terms)
+        params = [tsquery, CANDIDATES + 1, tsquery, limit]
+    else:
+        books = Book.objects.all()
+        for term in terms:
+            books = books.filter(
+                Q(title__icontains=term)
+                | Q(summary__icontains=term)
+                | Q(author__first_name__icontains=term)
+                | Q(author__last_name__icontains=term)
+                | Q(genre__name__icontains=term)
+            )
+        return SearchResults(
+            books.distinct()
+            .order_by("title", "pk")
+            .values_list("pk", flat=True)[:limit]
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    results = SearchResults(row[0] for row in rows)
+    results.truncated = bool(rows) and rows[0][1] > CANDIDATES
+    return results
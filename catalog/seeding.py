@@ -0,0 +1,270 @@
+"""
+Synthetic catalog for benchmarks and load tests.
+
+``seed_catalog()`` fills an empty database with readers, authors, genres,
+languages, books with valid ISBN-13s and their copies: on the shelf, on
+loan (some overdue), in maintenance or set aside for a hold. All values
+come from one ``random.Random(seed)``, so the same arguments give the same
+catalog, copy UUIDs included; due dates are counted from today.
+
+Rows are written with ``bulk_create`` in batches, which skips the
+signals, so the copy counters, ``CatalogStats`` and the search index are
+rebuilt at the end.
+"""
+
+import itertools
+import random
+import uuid
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+# 400 синтетических слов: частота каждого слова в заголовках
+# близка к реальному каталогу (доли процента).
+WORDS = [
+    first + second
+    for first in "ka lo mi ner sha tor vel wyn zar qui".split()
+    + "bre dor fen gal hul jor kes lum mor pri".split()
+    for second in "ra del vin mor tas len sil bor gan fel".split()
+    + "dar nis pel rok sul tem var wen xil yor".split()
+]
+
+FIRST_NAMES = (
+    "Anna Boris Clara David Elena Fyodor Grace Henry Irina James Karl "
+    "Lydia Mikhail Nina Oscar Pavel Rosa Sergei Tatiana Victor"
+).split()
+
+LAST_NAMES = (
+    "Adams Bell Chekhov Dumas Eliot Fowles Gorky Hardy Ivanov Joyce "
+    "Kuprin Lermontov Mann Nabokov Orwell Pushkin Roth Shelley Tolstoy "
+    "Wells"
+).split()
+
+GENRES = (
+    "Fantasy",
+    "Science Fiction",
+    "Mystery",
+    "Romance",
+    "History",
+    "Poetry",
+    "Biography",
+    "Children",
+    "Horror",
+    "Philosophy",
+    "Travel",
+    "Science",
+)
+
+# Язык и его доля в фонде.
+LANGUAGES = {
+    "English": 60,
+    "Russian": 15,
+    "German": 8,
+    "French": 8,
+    "Spanish": 6,
+    "Japanese": 3,
+}
+
+PUBLISHERS = (
+    "Penguin",
+    "Vintage",
+    "Eksmo",
+    "AST",
+    "HarperCollins",
+    "Gallimard",
+    "Suhrkamp",
+)
+
+# Доли статусов экземпляров: на полке, выдан, на обслуживании, отложен.
+STATUSES = {"a": 50, "o": 35, "m": 10, "r": 5}
+
+# Доля просроченных среди выданных экземпляров.
+OVERDUE = 0.1
+
+# Кэш страниц SQLite на время заполнения, КБ.
+SQLITE_CACHE_KB = 512 * 1024
+
+
+def bulk_create(model, objects, batch_size):
+    """``bulk_create`` a generator without materializing it all at once."""
+    objects = iter(objects)
+    while batch := list(itertools.islice(objects, batch_size)):
+        model.objects.bulk_create(batch)
+
+
+def isbn13(rng):
+    """Random ISBN-13 with the 978 prefix and a valid check digit."""
+    digits = [9, 7, 8] + [rng.randrange(10) for _ in range(9)]
+    check = -sum(
+        digit * (3 if position % 2 else 1)
+        for position, digit in enumerate(digits)
+    )
+    return "".join(map(str, digits + [check % 10]))
+
+
+def skewed(rng, items):
+    """Pick from ``items``, the first ones much more often than the last."""
+    # Квадрат равномерной величины: первая десятая часть списка
+    # выбирается примерно в трети случаев.
+    return items[int(len(items) * rng.random() ** 2)]
+
+
+def seed_catalog(
+    books, copies_per_book=10, users=1000, seed=0, batch_size=10_000
+):
+    """
+    Fill an empty catalog with ``books`` books of ``copies_per_book``
+    copies each, lent to ``users`` readers; return the row counts.
+    """
+    from . import search
+    from .models import Book, CatalogStats
+
+    rng = random.Random(seed)
+    if connection.vendor == "sqlite":
+        # Случайные UUID экземпляров попадают в разные страницы индекса
+        # первичного ключа; с кэшем SQLite по умолчанию (2 МБ) каждая
+        # вставка заново читает их с диска.
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA cache_size = -%d" % SQLITE_CACHE_KB)
+    with transaction.atomic():
+        counts = _seed(rng, books, copies_per_book, users, batch_size)
+        Book.reconcile_copies()
+        CatalogStats.rebuild()
+        search.rebuild_index(chunk_size=batch_size)
+    return counts
+
+
+def _seed(rng, books, copies_per_book, users, batch_size):
+    from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+    from django.contrib.auth.models import User
+
+    from .models import (
+        Author,
+        Book,
+        BookInstance,
+        Genre,
+        Language,
+        Reservation,
+    )
+
+    readers = User.objects.bulk_create(
+        User(
+            username="reader%d" % number,
+            email="reader%d@example.com" % number,
+            password=UNUSABLE_PASSWORD_PREFIX,
+        )
+        for number in range(users)
+    )
+    genres = Genre.objects.bulk_create(Genre(name=name) for name in GENRES)
+    languages = Language.objects.bulk_create(
+        Language(name=name) for name in LANGUAGES
+    )
+
+    def author():
+        born = date(1800, 1, 1) + timedelta(days=rng.randrange(190 * 365))
+        died = None
+        if born.year < 1950 and rng.random() < 0.6:
+            died = born + timedelta(days=rng.randrange(40 * 365, 90 * 365))
+        return Author(
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            date_of_birth=born,
+            date_of_death=died,
+        )
+
+    authors = Author.objects.bulk_create(
+        author() for _ in range(max(books // 20, 1))
+    )
+    bulk_create(
+        Book,
+        (
+            Book(
+                title="%s %d" % (" ".join(rng.sample(WORDS, 3)), number),
+                summary=" ".join(rng.choices(WORDS, k=30)),
+                isbn=isbn13(rng),
+                author=skewed(rng, authors),
+                language=rng.choices(
+                    languages, weights=list(LANGUAGES.values())
+                )[0],
+            )
+            for number in range(books)
+        ),
+        batch_size,
+    )
+    book_ids = list(Book.objects.order_by("id").values_list("id", flat=True))
+    bulk_create(
+        Book.genre.through,
+        (
+            Book.genre.through(book_id=book_id, genre=genre)
+            for book_id in book_ids
+            for genre in rng.sample(genres, rng.randint(1, 3))
+        ),
+        batch_size,
+    )
+
+    reader_ids = [reader.pk for reader in readers]
+    # Выбор статуса и выходных данных - на каждый из миллиона экземпляров.
+    statuses = list(STATUSES)
+    status_weights = list(itertools.accumulate(STATUSES.values()))
+    today = date.today()
+    imprints = [
+        "%s, %d" % (publisher, year)
+        for publisher in PUBLISHERS
+        for year in range(1950, today.year + 1)
+    ]
+    now = timezone.now()
+    holds = []
+
+    def copies(number, book_id):
+        for position in range(copies_per_book):
+            status = rng.choices(statuses, cum_weights=status_weights)[0]
+            if status == "r" and position >= len(reader_ids):
+                # Читатели кончились: у одного читателя одна бронь книги.
+                status = "a"
+            copy = BookInstance(
+                id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                book_id=book_id,
+                imprint=rng.choice(imprints),
+                status=status,
+            )
+            if status == "o":
+                copy.borrower_id = skewed(rng, reader_ids)
+                copy.due_back = today + timedelta(
+                    days=(
+                        -rng.randint(1, 60)
+                        if rng.random() < OVERDUE
+                        else rng.randint(0, 21)
+                    )
+                )
+            elif status == "r":
+                # Отложен для брони; у одной книги брони разных читателей.
+                holds.append(
+                    Reservation(
+                        book_id=book_id,
+                        patron_id=reader_ids[
+                            (number + position) % len(reader_ids)
+                        ],
+                        status=Reservation.READY,
+                        copy_id=copy.id,
+                        created_at=now,
+                        allocated_at=now,
+                    )
+                )
+            yield copy
+
+    bulk_create(
+        BookInstance,
+        itertools.chain.from_iterable(
+            copies(number, book_id) for number, book_id in enumerate(book_ids)
+        ),
+        batch_size,
+    )
+    bulk_create(Reservation, holds, batch_size)
+    return {
+        "users": len(readers),
+        "authors": len(authors),
+        "books": len(book_ids),
+        "copies": len(book_ids) * copies_per_book,
+        "holds": len(holds),
+    }
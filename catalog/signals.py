@@ -0,0 +1,283 @@
+from django.core.signals import request_finished
+from django.db import connection, transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cache, reservations, search, visits
+from .models import (
+    Author,
+    Book,
+    BookInstance,
+    CatalogStats,
+    Genre,
+    Language,
+    Reservation,
+)
+
+# Счётчик CatalogStats, который меняется при создании/удалении модели.
+COUNTER_FIELDS = {
+    Book: "num_books",
+    Author: "num_authors",
+    Genre: "num_genres",
+}
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Genre)
+def count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        CatalogStats.adjust(**{COUNTER_FIELDS[sender]: 1})
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def count_deleted(sender, instance, **kwargs):
+    CatalogStats.adjust(**{COUNTER_FIELDS[sender]: -1})
+
+
+@receiver(post_save, sender=BookInstance)
+def close_reservation(sender, instance, created, raw=False, **kwargs):
+    # Отложенный экземпляр выдан читателю или снят с брони вручную.
+    # Обработчик должен идти до count_bookinstance_saved, который
+    # обновляет _loaded_status.
+    if raw or created or getattr(instance, "_loaded_status", None) != "r":
+        return
+    if instance.status != "r":
+        Reservation.objects.filter(
+            copy=instance, status=Reservation.READY
+        ).update(
+            status=(
+                Reservation.FULFILLED
+                if instance.status == "o"
+                else Reservation.CANCELLED
+            )
+        )
+
+
+@receiver(post_save, sender=BookInstance)
+def count_bookinstance_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    is_available = int(instance.status == "a")
+    if is_available and (
+        created or getattr(instance, "_loaded_status", None) != "a"
+    ):
+        # Экземпляр вернули по одному (админка, save()) - он достаётся
+        # первой брони в очереди. circulate() шлёт не сигналы, а
+        # распределяет сам.
+        book_id = instance.book_id
+        transaction.on_commit(lambda: reservations.allocate([book_id]))
+    if created:
+        CatalogStats.adjust(
+            num_instances=1, num_instances_available=is_available
+        )
+        Book.adjust_copies({instance.book_id: (1, is_available)})
+    elif not hasattr(instance, "_loaded_status"):
+        # Объект сохранён "вслепую" (без загрузки из БД):
+        # прежний статус неизвестен, поэтому пересчитываем.
+        CatalogStats.rebuild()
+        Book.reconcile_copies([instance.book_id])
+    else:
+        was_available = int(instance._loaded_status == "a")
+        CatalogStats.adjust(
+            num_instances_available=is_available - was_available
+        )
+        if instance._loaded_book_id == instance.book_id:
+            Book.adjust_copies(
+                {instance.book_id: (0, is_available - was_available)}
+            )
+        else:
+            # Экземпляр перенесён к другой книге.
+            Book.adjust_copies(
+                {
+                    instance._loaded_book_id: (-1, -was_available),
+                    instance.book_id: (1, is_available),
+                }
+            )
+    instance._loaded_status = instance.status
+    instance._loaded_book_id = instance.book_id
+
+
+@receiver(post_delete, sender=BookInstance)
+def count_bookinstance_deleted(sender, instance, **kwargs):
+    is_available = int(instance.status == "a")
+    CatalogStats.adjust(
+        num_instances=-1, num_instances_available=-is_available
+    )
+    Book.adjust_copies({instance.book_id: (-1, -is_available)})
+
+
+# Поисковый индекс (catalog.search): документ книги включает
+# имя автора и названия жанров, поэтому их изменения тоже
+# переиндексируют связанные книги.
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_books([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, **kwargs):
+    search.remove_books([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def index_book_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._related_book_ids = list(
+            instance.book_set.values_list("pk", flat=True)
+        )
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if not reverse:
+            search.index_books([instance.pk])
+        elif action == "post_clear":
+            search.index_books(instance._related_book_ids)
+        else:
+            search.index_books(pk_set)
+
+
+@receiver(post_save, sender=Author)
+def index_author_books(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.index_books(instance.book_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Genre)
+def index_genre_books(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.index_books(instance.book_set.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Language)
+def remember_related_books(sender, instance, **kwargs):
+    # После удаления связь с книгами уже разорвана (SET_NULL / M2M).
+    instance._related_book_ids = list(
+        instance.book_set.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def reindex_remembered_books(sender, instance, **kwargs):
+    search.index_books(getattr(instance, "_related_book_ids", ()))
+
+
+# Изменения, видимые на страницах каталога: у всех страниц, где
+# виден изменённый объект, и у каталога в целом (страницы списков)
+# меняются версия кэша (catalog.cache) и updated_at, по которому
+# считаются ETag/Last-Modified.
+
+
+def bump_page_versions(book_ids, author_ids):
+    if book_ids:
+        cache.bump("book", book_ids)
+    if author_ids:
+        cache.bump("author", author_ids)
+    cache.bump("catalog")
+
+
+def pages_changed(book_ids=(), author_ids=()):
+    now = timezone.now()
+    book_ids = set(book_ids) - {None}
+    author_ids = set(author_ids) - {None}
+    if book_ids:
+        Book.objects.filter(pk__in=book_ids).update(updated_at=now)
+    if author_ids:
+        Author.objects.filter(pk__in=author_ids).update(updated_at=now)
+    CatalogStats.objects.filter(pk=1).update(updated_at=now)
+    # Версии меняются после фиксации: иначе параллельный запрос успел бы
+    # закэшировать старые данные под новой версией.
+    transaction.on_commit(lambda: bump_page_versions(book_ids, author_ids))
+
+
+def books_changed(book_ids):
+    book_ids = list(book_ids)
+    pages_changed(
+        book_ids,
+        Book.objects.filter(pk__in=book_ids).values_list(
+            "author_id", flat=True
+        ),
+    )
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pages_changed(
+        [instance.pk],
+        [instance.author_id, getattr(instance, "_loaded_author_id", None)],
+    )
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(post_save, sender=BookInstance)
+@receiver(post_delete, sender=BookInstance)
+def copy_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        books_changed([instance.book_id])
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def author_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pages_changed(
+        getattr(instance, "_related_book_ids", None)
+        or instance.book_set.values_list("pk", flat=True),
+        [instance.pk],
+    )
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Language)
+def books_of_changed(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        books_changed(instance.book_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Language)
+def remembered_books_changed(sender, instance, **kwargs):
+    books_changed(getattr(instance, "_related_book_ids", ()))
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        if not reverse:
+            books_changed([instance.pk])
+        elif action == "post_clear":
+            books_changed(instance._related_book_ids)
+        else:
+            books_changed(pk_set)
+
+
+@receiver(request_finished)
+def flush_visits(sender, **kwargs):
+    # Счётчики посещений копируются в БД после отправки ответа, не чаще
+    # раза в visits.FLUSH_INTERVAL. Соединения запроса Django уже закрыл
+    # (close_old_connections): открытое здесь закрываем сразу, иначе оно
+    # (и место в пуле) занято до следующего запроса потока.
+    opened = connection.connection is None
+    visits.flush(force=False)
+    if (
+        opened
+        and connection.connection is not None
+        and not connection.in_atomic_block
+    ):
+        connection.close()
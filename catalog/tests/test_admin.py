@@ -0,0 +1,195 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+User = get_user_model()
+
+
+class CatalogAdminQueryCountTest(TestCase):
+    """
+    The number of queries of admin pages must not grow with the number
+    of rows (changelists) or related objects (change forms).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username="admin", password="1X<ISRUkw+tuK"
+        )
+        cls.genres = [
+            Genre.objects.create(name="Genre %d" % number)
+            for number in range(5)
+        ]
+        cls.language = Language.objects.create(name="English")
+        cls.small_author = cls.create_author("Small", books=1, copies=1)
+        cls.large_author = cls.create_author("Large", books=30, copies=30)
+
+    @classmethod
+    def create_author(cls, name, books, copies):
+        author = Author.objects.create(first_name=name, last_name=name)
+        for number in range(books):
+            book = Book.objects.create(
+                title="%s book %d" % (name, number),
+                summary="Summary",
+                isbn="ABCDEFG",
+                author=author,
+                language=cls.language,
+            )
+            book.genre.set(cls.genres)
+        BookInstance.objects.bulk_create(
+            BookInstance(
+                book=book,
+                imprint="Imprint",
+                status="o",
+                borrower=User.objects.create_user(
+                    username="%s reader %d" % (name, number)
+                ),
+            )
+            for number in range(copies)
+        )
+        return author
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, small_url, large_url):
+        # Прогрев кэшей (ContentType и т.п.) первым запросом.
+        self.client.get(small_url)
+        self.assertEqual(
+            self.count_queries(small_url), self.count_queries(large_url)
+        )
+
+    def changelist(self, model, query=""):
+        return reverse(
+            "admin:catalog_%s_changelist" % model._meta.model_name
+        ) + ("?q=%s" % query if query else "")
+
+    def change(self, obj):
+        return reverse(
+            "admin:catalog_%s_change" % obj._meta.model_name, args=[obj.pk]
+        )
+
+    def test_book_changelist(self):
+        self.assertConstantQueries(
+            self.changelist(Book, "Small"), self.changelist(Book, "Large")
+        )
+
+    def test_bookinstance_changelist(self):
+        self.assertConstantQueries(
+            self.changelist(BookInstance, "Small"),
+            self.changelist(BookInstance, "Large"),
+        )
+
+    def test_book_change_form(self):
+        self.assertConstantQueries(
+            self.change(self.small_author.book_set.get()),
+            self.change(self.large_author.book_set.last()),
+        )
+
+    def test_author_change_form(self):
+        self.assertConstantQueries(
+            self.change(self.small_author), self.change(self.large_author)
+        )
+
+    def test_inlines_are_limited(self):
+        book = self.large_author.book_set.last()
+        response = self.client.get(self.change(book))
+        formset = response.context["inline_admin_formsets"][0].formset
+        self.assertEqual(len(formset.forms), 20)
+        self.assertContains(
+            response,
+            "?book__id__exact=%d" % book.pk,
+        )
+        self.assertContains(response, "30 book instances")
+
+    def test_autocomplete_widgets(self):
+        response = self.client.get(reverse("admin:catalog_book_add"))
+        for field in ("author", "genre", "language"):
+            self.assertContains(response, 'data-field-name="%s"' % field)
+        self.assertNotContains(response, "Genre 4")
+
+    def test_save_book_with_limited_inline(self):
+        book = self.large_author.book_set.last()
+        Book.objects.filter(pk=book.pk).update(isbn="9780306406157")
+        copies = list(book.bookinstance_set.order_by("due_back", "id")[:20])
+        data = {
+            "title": "Renamed",
+            "author": self.large_author.pk,
+            "summary": "Summary",
+            "isbn": "9780306406157",
+            "genre": [self.genres[0].pk],
+            "language": self.language.pk,
+            "bookinstance_set-TOTAL_FORMS": 20,
+            "bookinstance_set-INITIAL_FORMS": 20,
+        }
+        for number, copy in enumerate(copies):
+            prefix = "bookinstance_set-%d-" % number
+            data.update(
+                {
+                    prefix + "id": copy.pk,
+                    prefix + "book": book.pk,
+                    prefix + "imprint": "New imprint",
+                    prefix + "status": copy.status,
+                }
+            )
+        response = self.client.post(self.change(book), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            book.bookinstance_set.filter(imprint="New imprint").count(), 20
+        )
+        self.assertEqual(book.bookinstance_set.count(), 30)
+
+
+class BookInstanceAdminActionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username="admin", password="1X<ISRUkw+tuK"
+        )
+        book = Book.objects.create(
+            title="Book", summary="Summary", isbn="ABCDEFG"
+        )
+        cls.copies = BookInstance.objects.bulk_create(
+            BookInstance(
+                book=book, imprint="Imprint", status="o", borrower=cls.admin
+            )
+            for _ in range(3)
+        )
+
+    def run_action(self, action):
+        return self.client.post(
+            reverse("admin:catalog_bookinstance_changelist"),
+            {
+                "action": action,
+                "_selected_action": [copy.pk for copy in self.copies[:2]],
+            },
+            follow=True,
+        )
+
+    def test_return_copies(self):
+        self.client.force_login(self.admin)
+        response = self.run_action("return_copies")
+        self.assertContains(response, "Mark returned: 2 of 2 selected")
+        self.assertEqual(BookInstance.objects.filter(status="a").count(), 2)
+
+    def test_actions_need_permission(self):
+        staff = User.objects.create_user(username="staff", is_staff=True)
+        staff.user_permissions.add(
+            Permission.objects.get(codename="view_bookinstance")
+        )
+        self.client.force_login(staff)
+        response = self.client.get(
+            reverse("admin:catalog_bookinstance_changelist")
+        )
+        self.assertNotContains(response, "return_copies")
@@ -0,0 +1,174 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import circulation
+from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog.pagination import encode_cursor
+
+
+class CatalogApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(
+            first_name="John", last_name="Smith"
+        )
+        cls.language = Language.objects.create(name="English")
+        cls.genres = [
+            Genre.objects.create(name=name) for name in ("Fantasy", "Poetry")
+        ]
+        cls.books = [
+            Book.objects.create(
+                title="Book %02d" % number,
+                summary="Summary",
+                isbn="9780306406157",
+                author=cls.author,
+                language=cls.language,
+            )
+            for number in range(12)
+        ]
+        for book in cls.books:
+            book.genre.set(cls.genres)
+        cls.due_back = datetime.date(2030, 1, 15)
+        BookInstance.objects.create(book=cls.books[0], status="a")
+        BookInstance.objects.create(
+            book=cls.books[0], status="o", due_back=cls.due_back
+        )
+        BookInstance.objects.create(
+            book=cls.books[0],
+            status="o",
+            due_back=cls.due_back.replace(day=20),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_book_list_default_fields(self):
+        response = self.client.get(reverse("api-books"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        data = response.json()
+        self.assertEqual(len(data["results"]), 12)
+        self.assertEqual(
+            data["results"][0],
+            {
+                "id": self.books[0].pk,
+                "title": "Book 00",
+                "author": self.author.pk,
+                "isbn": "9780306406157",
+            },
+        )
+        self.assertIsNone(data["next"])
+
+    def test_sparse_fields_in_requested_order(self):
+        response = self.client.get(
+            reverse("api-books"),
+            {"fields": "genres,copies_available,title,language,copies"},
+        )
+        self.assertEqual(
+            response.json()["results"][0],
+            {
+                "genres": ["Fantasy", "Poetry"],
+                "copies_available": 1,
+                "title": "Book 00",
+                "language": "English",
+                "copies": 3,
+            },
+        )
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        url = reverse("api-books")
+        fields = "title,author_last_name,genres,copies"
+        for limit in (2, 12):
+            # updated_at для ETag, страница книг и жанры страницы.
+            with self.assertNumQueries(3):
+                response = self.client.get(
+                    url, {"fields": fields, "limit": limit}
+                )
+            self.assertEqual(len(response.json()["results"]), limit)
+
+    def test_cursor_pagination(self):
+        url = reverse("api-books")
+        first = self.client.get(url, {"fields": "title", "limit": 5}).json()
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        self.assertIn("fields=title", first["next"])
+        self.assertEqual(
+            [book["title"] for book in second["results"]],
+            ["Book %02d" % number for number in range(5, 10)],
+        )
+        previous = self.client.get(second["previous"]).json()
+        self.assertEqual(previous["results"], first["results"])
+
+    def test_invalid_requests(self):
+        url = reverse("api-books")
+        for query in (
+            {"fields": "title,borrower"},
+            {"limit": "0"},
+            {"limit": "many"},
+            {"cursor": "!"},
+            {"cursor": encode_cursor("n", ["t", [1]])},
+            {"cursor": encode_cursor("n", [{"a": 1}, "x"])},
+        ):
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn("error", response.json())
+        self.assertEqual(self.client.post(url).status_code, 405)
+
+    def test_book_detail(self):
+        response = self.client.get(
+            reverse("api-book", args=[self.books[0].pk]),
+            {"fields": "title,author_first_name,genres"},
+        )
+        self.assertEqual(
+            response.json(),
+            {
+                "title": "Book 00",
+                "author_first_name": "John",
+                "genres": ["Fantasy", "Poetry"],
+            },
+        )
+        response = self.client.get(reverse("api-book", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_book_availability(self):
+        url = reverse("api-book-availability", args=[self.books[0].pk])
+        response = self.client.get(url)
+        self.assertEqual(
+            response.json(),
+            {
+                "id": self.books[0].pk,
+                "copies": 3,
+                "available": 1,
+                "on_loan": 2,
+                "next_due_back": "2030-01-15",
+            },
+        )
+        etag = response["ETag"]
+        circulation.circulate(
+            BookInstance.objects.filter(status="o").values_list(
+                "pk", flat=True
+            ),
+            circulation.RETURN,
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()["available"], 3)
+        response = self.client.get(reverse("api-book-availability", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_authors(self):
+        response = self.client.get(
+            reverse("api-authors"), {"fields": "last_name,books"}
+        )
+        self.assertEqual(
+            response.json()["results"], [{"last_name": "Smith", "books": 12}]
+        )
+        response = self.client.get(
+            reverse("api-author", args=[self.author.pk])
+        )
+        self.assertEqual(
+            response.json(),
+            {"id": self.author.pk, "first_name": "John", "last_name": "Smith"},
+        )
@@ -0,0 +1,139 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from catalog import visits
+from catalog.models import Author, Book, BookInstance, CatalogStats, Genre
+from catalog.urls import page_patterns
+
+User = get_user_model()
+
+# Страницы каталога на async views, остальное - как в проекте.
+urlpatterns = [
+    path("catalog/", include(page_patterns(True))),
+    path("", include("locallibrary.urls")),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncCatalogViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(
+            first_name="John", last_name="Smith"
+        )
+        Genre.objects.create(name="Fantasy")
+        cls.books = [
+            Book.objects.create(
+                title="Book %02d" % number,
+                summary="My book summary",
+                isbn="ABCDEFG",
+                author=cls.author,
+            )
+            for number in range(13)
+        ]
+        BookInstance.objects.create(book=cls.books[0], status="a")
+        CatalogStats.rebuild()
+        cls.reader = User.objects.create_user(username="reader")
+
+    def setUp(self):
+        cache.clear()
+        # Тестовый клиент закрывает async-ответ в другом потоке, и запись
+        # счётчиков посещений из него упирается в блокировку тестовой БД.
+        patcher = mock.patch.object(visits, "buffer", visits.Buffer())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_index(self):
+        response = await self.async_client.get(reverse("index"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["num_books"], 13)
+        self.assertEqual(response.context["num_instances_available"], 1)
+        self.assertEqual(response.context["num_genre"], 1)
+        self.assertEqual(response.context["num_visits"], 0)
+        response = await self.async_client.get(reverse("index"))
+        self.assertEqual(response.context["num_visits"], 1)
+
+    async def test_index_rebuilds_missing_stats(self):
+        await CatalogStats.objects.all().adelete()
+        response = await self.async_client.get(reverse("index"))
+        self.assertEqual(response.context["num_books"], 13)
+        self.assertEqual(response.context["num_instances"], 1)
+        self.assertEqual(response.context["num_authors"], 1)
+
+    async def test_book_list_cursor(self):
+        response = await self.async_client.get(reverse("books"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["is_paginated"])
+        self.assertEqual(len(response.context["book_list"]), 10)
+        next_cursor = response.context["page_obj"].next_cursor
+
+        response = await self.async_client.get(
+            reverse("books"), {"cursor": next_cursor}
+        )
+        self.assertEqual(
+            [book.title for book in response.context["book_list"]],
+            ["Book 10", "Book 11", "Book 12"],
+        )
+
+    async def test_invalid_cursor(self):
+        response = await self.async_client.get(
+            reverse("authors"), {"cursor": "!"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_list_page_cached_and_not_modified(self):
+        url = reverse("authors")
+        first = await self.async_client.get(url)
+        self.assertContains(first, "John, Smith")
+        second = await self.async_client.get(url)
+        self.assertEqual(second.content, first.content)
+        response = await self.async_client.get(
+            url, headers={"if-none-match": first["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_detail_pages(self):
+        book = self.books[0]
+        response = await self.async_client.get(book.get_absolute_url())
+        self.assertContains(response, "Book 00")
+        self.assertContains(response, "Available")
+        response = await self.async_client.get(book.get_absolute_url())
+        self.assertContains(response, "Available")
+
+        response = await self.async_client.get(self.author.get_absolute_url())
+        self.assertContains(response, "1 of 1 available")
+        response = await self.async_client.get(
+            reverse("author-detail", args=[0])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_loans_need_login(self):
+        response = await self.async_client.get(reverse("my-borrowed"))
+        self.assertRedirects(
+            response,
+            "/accounts/login/?next=/catalog/mybooks/",
+            fetch_redirect_response=False,
+        )
+
+    async def test_loans_of_current_user(self):
+        due_back = timezone.localdate() + datetime.timedelta(days=7)
+        await BookInstance.objects.acreate(
+            book=self.books[1],
+            status="o",
+            borrower=self.reader,
+            due_back=due_back,
+        )
+        await self.async_client.aforce_login(self.reader)
+        response = await self.async_client.get(reverse("my-borrowed"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [copy.book_id for copy in response.context["bookinstance_list"]],
+            [self.books[1].pk],
+        )
+        self.assertNotIn("ETag", response)
@@ -0,0 +1,56 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from locallibrary.databases import database_config, pool_options, tune_sqlite
+
+URL = "postgres://library:secret@db:5432/library"
+
+
+class DatabaseConfigTest(SimpleTestCase):
+    def test_persistent_connections_by_default(self):
+        config = database_config(URL)
+        self.assertEqual(config["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(config["CONN_MAX_AGE"], 500)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+        self.assertNotIn("pool", config.get("OPTIONS", {}))
+
+    def test_pool(self):
+        config = database_config(
+            URL, pool=pool_options({"DATABASE_POOL_MAX_SIZE": "4"})
+        )
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+        self.assertEqual(
+            config["OPTIONS"]["pool"],
+            {
+                "min_size": 2,
+                "max_size": 4,
+                "timeout": 10.0,
+                "max_idle": 300.0,
+                "max_lifetime": 3600.0,
+            },
+        )
+
+    def test_pool_needs_postgresql(self):
+        with self.assertRaises(ImproperlyConfigured):
+            database_config("sqlite:///library.sqlite3", pool=pool_options({}))
+
+
+class SqliteTuningTest(TestCase):
+    def test_options(self):
+        config = tune_sqlite(database_config("sqlite:///library.sqlite3"))
+        self.assertEqual(config["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertIn(
+            "PRAGMA journal_mode = WAL", config["OPTIONS"]["init_command"]
+        )
+        self.assertNotIn("OPTIONS", tune_sqlite(database_config(URL)))
+
+    def test_pragmas_applied(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA synchronous")
+            # 1 - NORMAL.
+            self.assertEqual(cursor.fetchone()[0], 1)
@@ -0,0 +1,118 @@
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import export
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+User = get_user_model()
+
+
+class CatalogExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username="librarian", password="1X<ISRUkw+tuK", is_staff=True
+        )
+        cls.reader = User.objects.create_user(
+            username="reader", password="2HJ1vRV0Z&3iD"
+        )
+        author = Author.objects.create(first_name="John", last_name="Smith")
+        cls.book = Book.objects.create(
+            title="Book, with comma",
+            summary='Summary with "quotes"\nand a newline',
+            isbn="ABCDEFG",
+            author=author,
+            language=Language.objects.create(name="English"),
+        )
+        cls.book.genre.set(
+            [
+                Genre.objects.create(name="Poetry"),
+                Genre.objects.create(name="Fantasy"),
+            ]
+        )
+        cls.copy = BookInstance.objects.create(
+            book=cls.book,
+            imprint="Imprint",
+            status="o",
+            due_back=datetime.date(2024, 1, 2),
+            borrower=cls.reader,
+        )
+        BookInstance.objects.create(book=cls.book, imprint="Imprint")
+        cls.bare_book = Book.objects.create(
+            title="No copies", summary="Summary", isbn="ABCDEFG"
+        )
+
+    def export(self, format):
+        self.client.login(username="librarian", password="1X<ISRUkw+tuK")
+        response = self.client.get(reverse("export"), {"format": format})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_staff_only(self):
+        response = self.client.get(reverse("export"))
+        self.assertEqual(response.status_code, 302)
+        self.client.login(username="reader", password="2HJ1vRV0Z&3iD")
+        response = self.client.get(reverse("export"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_unknown_format(self):
+        self.client.login(username="librarian", password="1X<ISRUkw+tuK")
+        response = self.client.get(reverse("export"), {"format": "xml"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_csv(self):
+        response, content = self.export("csv")
+        self.assertTrue(response["Content-Type"].startswith("text/csv"))
+        self.assertIn(".csv", response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 3)
+        loaned = next(
+            row for row in rows if row["copy_id"] == str(self.copy.pk)
+        )
+        self.assertEqual(loaned["title"], "Book, with comma")
+        self.assertEqual(loaned["summary"], self.book.summary)
+        self.assertEqual(loaned["genres"], "Fantasy; Poetry")
+        self.assertEqual(loaned["language"], "English")
+        self.assertEqual(loaned["due_back"], "2024-01-02")
+        self.assertEqual(loaned["borrower"], "reader")
+        self.assertEqual(rows[-1]["title"], "No copies")
+        self.assertEqual(rows[-1]["copy_id"], "")
+
+    def test_jsonl(self):
+        response, content = self.export("jsonl")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(list(rows[0]), export.COLUMNS)
+        self.assertEqual(rows[0]["genres"], ["Fantasy", "Poetry"])
+        self.assertIsNone(rows[-1]["copy_id"])
+
+    def test_query_count_does_not_depend_on_number_of_copies(self):
+        BookInstance.objects.bulk_create(
+            BookInstance(book=self.bare_book, imprint="Imprint")
+            for _ in range(50)
+        )
+        # Книги, затем жанры и экземпляры всей порции книг.
+        with self.assertNumQueries(3):
+            rows = list(export.rows())
+        self.assertEqual(len(rows), 52)
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command("export_catalog", "--format=jsonl", stdout=output)
+        self.assertEqual(len(output.getvalue().splitlines()), 3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "catalog.csv")
+            call_command("export_catalog", "--output", path)
+            with open(path, encoding="utf-8", newline="") as file:
+                self.assertEqual(len(list(csv.DictReader(file))), 3)
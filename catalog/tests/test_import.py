@@ -0,0 +1,177 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from catalog import search
+from catalog.models import (
+    Author,
+    Book,
+    BookInstance,
+    CatalogStats,
+    Genre,
+    Language,
+)
+
+CSV = """\
+title,isbn,summary,language,author_first_name,author_last_name,genres,imprint,status,due_back
+Dune,978-0-306-40615-7,Sand,English,Frank,Herbert,SF; Classic,Ace,a,
+Dune,9780306406157,Sand,English,Frank,Herbert,SF; Classic,Ace,o,2030-01-02
+Emma,0306406152,Match-making,English,Jane,Austen,Classic,,,
+Bad ISBN,12345,Summary,,Jane,Austen,,,,
+,0306406152,No title,,,,,,,
+Bad status,0306406152,Summary,,,,,Ace,x,
+"""
+
+MARCXML = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<collection xmlns="http://www.loc.gov/MARC21/slim">
+  <record>
+    <datafield tag="020" ind1=" " ind2=" ">
+      <subfield code="a">9780306406157 (pbk.)</subfield>
+    </datafield>
+    <datafield tag="041" ind1=" " ind2=" ">
+      <subfield code="a">eng</subfield>
+    </datafield>
+    <datafield tag="100" ind1="1" ind2=" ">
+      <subfield code="a">Herbert, Frank.</subfield>
+    </datafield>
+    <datafield tag="245" ind1="1" ind2="0">
+      <subfield code="a">Dune :</subfield>
+      <subfield code="b">a novel /</subfield>
+    </datafield>
+    <datafield tag="260" ind1=" " ind2=" ">
+      <subfield code="b">Ace Books,</subfield>
+    </datafield>
+    <datafield tag="650" ind1=" " ind2="0">
+      <subfield code="a">Science fiction.</subfield>
+    </datafield>
+    <datafield tag="852" ind1=" " ind2=" ">
+      <subfield code="b">Main</subfield>
+    </datafield>
+    <datafield tag="852" ind1=" " ind2=" ">
+      <subfield code="b">Branch</subfield>
+    </datafield>
+  </record>
+</collection>
+"""
+
+
+class ImportCatalogCommandTest(TestCase):
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def call(self, *args, **kwargs):
+        stderr = io.StringIO()
+        call_command(
+            "import_catalog",
+            *args,
+            verbosity=0,
+            stdout=io.StringIO(),
+            stderr=stderr,
+            **kwargs,
+        )
+        return stderr.getvalue()
+
+    def test_csv(self):
+        Author.objects.create(first_name="Jane", last_name="Austen")
+        Genre.objects.create(name="Classic")
+        stderr = self.call(self.write("books.csv", CSV), batch_size=2)
+
+        self.assertEqual(Book.objects.count(), 2)
+        dune = Book.objects.get(title="Dune")
+        self.assertEqual(dune.isbn, "9780306406157")
+        self.assertEqual(dune.author.last_name, "Herbert")
+        self.assertEqual(dune.language.name, "English")
+        self.assertEqual(
+            sorted(genre.name for genre in dune.genre.all()),
+            ["Classic", "SF"],
+        )
+        self.assertEqual(
+            sorted(dune.bookinstance_set.values_list("status", flat=True)),
+            ["a", "o"],
+        )
+        self.assertEqual((dune.copies_total, dune.copies_available), (2, 1))
+        emma = Book.objects.get(title="Emma")
+        self.assertFalse(emma.bookinstance_set.exists())
+        # Существующие автор и жанр переиспользуются.
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Genre.objects.count(), 2)
+        self.assertEqual(Language.objects.count(), 1)
+
+        self.assertIn("Line 5 rejected: Invalid ISBN", stderr)
+        self.assertIn("Line 6 rejected: title is required.", stderr)
+        self.assertIn("Line 7 rejected: Unknown status", stderr)
+        self.assertIn("3 records rejected.", stderr)
+
+    def test_statistics_and_search_updated(self):
+        self.call(self.write("books.csv", CSV))
+        stats = CatalogStats.load()
+        self.assertEqual(stats.num_books, 2)
+        self.assertEqual(stats.num_instances, 2)
+        self.assertEqual(stats.num_instances_available, 1)
+        self.assertEqual(
+            search.search_books("herbert"), [Book.objects.get(title="Dune").pk]
+        )
+
+    def test_rejects_file(self):
+        path = os.path.join(self.directory, "rejects.txt")
+        self.call(self.write("books.csv", CSV), rejects=path)
+        with open(path, encoding="utf-8") as file:
+            self.assertEqual(len(file.readlines()), 3)
+
+    def test_jsonl(self):
+        records = [
+            {
+                "book_id": 7,
+                "title": "Emma",
+                "isbn": "0306406152",
+                "genres": ["Classic"],
+                "copy_id": None,
+            },
+            {"book_id": 7, "title": "Emma", "isbn": "0306406152"},
+            "not an object",
+        ]
+        content = "\n".join(json.dumps(record) for record in records)
+        stderr = self.call(self.write("books.jsonl", content + "\n{"))
+        self.assertEqual(Book.objects.count(), 1)
+        self.assertIn("Line 3 rejected: Record is not an object.", stderr)
+        self.assertIn("Line 4 rejected: Invalid JSON", stderr)
+
+    def test_marcxml(self):
+        self.call(self.write("books.xml", MARCXML))
+        book = Book.objects.get()
+        self.assertEqual(book.title, "Dune : a novel")
+        self.assertEqual(book.isbn, "9780306406157")
+        self.assertEqual(str(book.author), "Herbert, Frank")
+        self.assertEqual(book.language.name, "eng")
+        self.assertEqual(book.display_genre(), "Science fiction")
+        self.assertEqual(
+            list(book.bookinstance_set.values_list("imprint", flat=True)),
+            ["Ace Books", "Ace Books"],
+        )
+
+    def test_export_round_trip(self):
+        self.call(self.write("books.csv", CSV))
+        exported = os.path.join(self.directory, "export.jsonl")
+        call_command("export_catalog", "--format=jsonl", "--output", exported)
+        Book.objects.all().delete()
+        BookInstance.objects.all().delete()
+
+        self.call(exported)
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(BookInstance.objects.count(), 2)
+        self.assertEqual(Author.objects.count(), 2)
+
+    def test_unknown_extension(self):
+        with self.assertRaises(CommandError):
+            self.call(self.write("books.txt", CSV))
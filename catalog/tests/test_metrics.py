@@ -0,0 +1,115 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from catalog.models import CatalogStats
+from locallibrary import metrics
+
+
+class ExpositionTest(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Registry()
+        for value in (0.003, 0.02, 0.02, 30):
+            registry.observe("http_request_duration_seconds", value, view="x")
+        with mock.patch.object(metrics, "registry", registry):
+            text = metrics.exposition(*metrics.collect())
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+        for line in (
+            'http_request_duration_seconds_bucket{view="x",le="0.005"} 1',
+            'http_request_duration_seconds_bucket{view="x",le="0.025"} 3',
+            'http_request_duration_seconds_bucket{view="x",le="10.0"} 3',
+            'http_request_duration_seconds_bucket{view="x",le="+Inf"} 4',
+            'http_request_duration_seconds_count{view="x"} 4',
+        ):
+            self.assertIn(line + "\n", text)
+
+    def test_workers_are_added_up(self):
+        registry = metrics.Registry()
+        registry.inc("session_writes_total", view="index")
+        with tempfile.TemporaryDirectory() as directory:
+            # Файл другого воркера.
+            other = metrics.Registry()
+            other.inc("session_writes_total", 2, view="index")
+            other.inc("session_writes_total", view="books")
+            Path(directory, "1.json").write_text(json.dumps(other.dump()))
+            with mock.patch.object(metrics, "registry", registry):
+                counters, _ = metrics.collect(directory)
+        self.assertEqual(
+            counters,
+            {
+                ("session_writes_total", (("view", "index"),)): 3,
+                ("session_writes_total", (("view", "books"),)): 1,
+            },
+        )
+
+    def test_label_values_escaped(self):
+        self.assertEqual(
+            metrics._format_labels((("view", 'a"b\\c'),)),
+            '{view="a\\"b\\\\c"}',
+        )
+
+
+@override_settings(METRICS=True, METRICS_DIR="", METRICS_TOKEN="")
+class MetricsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CatalogStats.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(metrics, "registry", metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape(self, **headers):
+        response = self.client.get("/metrics", **headers)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_request_metrics(self):
+        for _ in range(2):
+            self.client.get(reverse("books"))
+        self.client.get(reverse("index"))
+        text = self.scrape()
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",status="200",'
+            'view="books"} 2\n',
+            text,
+        )
+        self.assertIn(
+            'catalog_cache_requests_total{cache="page",result="miss"} 1\n',
+            text,
+        )
+        self.assertIn(
+            'catalog_cache_requests_total{cache="page",result="hit"} 1\n', text
+        )
+        self.assertNotIn("session_writes_total{", text)
+        self.assertRegex(
+            text, r'http_request_queries_total\{view="index"\} \d'
+        )
+
+    @override_settings(RATELIMIT_ENABLE=True, RATELIMIT_GLOBAL="2/m")
+    def test_ratelimit_rejections(self):
+        statuses = [
+            self.client.get("/no-such-page/").status_code for _ in range(3)
+        ]
+        self.assertEqual(statuses, [404, 404, 403])
+        self.assertIn(
+            'ratelimit_rejections_total{view="unmatched"} 1\n', self.scrape()
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertIn(
+            "# TYPE", self.scrape(HTTP_AUTHORIZATION="Bearer secret")
+        )
+
+    @override_settings(METRICS=False)
+    def test_off_by_default(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
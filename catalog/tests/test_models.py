@@ -1,6 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from catalog.models import Author
+from catalog.models import Author, Book, BookInstance, CatalogStats, Genre
 
 
 class AuthorModelTest(TestCase):
@@ -33,3 +36,129 @@ class AuthorModelTest(TestCase):
         author = Author.objects.get(id=1)
         # This will also fail if the urlconf is not defined.
         self.assertEqual(author.get_absolute_url(), "/catalog/authors/1")
+
+
+class CatalogStatsModelTest(TestCase):
+    def setUp(self):
+        CatalogStats.rebuild()
+        self.author = Author.objects.create(first_name="Big", last_name="Bob")
+        self.book = Book.objects.create(
+            title="Book Title",
+            summary="My book summary",
+            isbn="ABCDEFG",
+            author=self.author,
+        )
+
+    def test_counters_follow_creates_and_deletes(self):
+        Genre.objects.create(name="Fantasy")
+        copy = BookInstance.objects.create(book=self.book, status="a")
+        BookInstance.objects.create(book=self.book, status="o")
+
+        stats = CatalogStats.load()
+        self.assertEqual(stats.num_books, 1)
+        self.assertEqual(stats.num_authors, 1)
+        self.assertEqual(stats.num_genres, 1)
+        self.assertEqual(stats.num_instances, 2)
+        self.assertEqual(stats.num_instances_available, 1)
+
+        copy.delete()
+        self.book.delete()
+        stats = CatalogStats.load()
+        self.assertEqual(stats.num_books, 0)
+        self.assertEqual(stats.num_instances, 1)
+        self.assertEqual(stats.num_instances_available, 0)
+
+    def test_available_counter_follows_status_changes(self):
+        copy = BookInstance.objects.create(book=self.book, status="o")
+        self.assertEqual(CatalogStats.load().num_instances_available, 0)
+
+        copy = BookInstance.objects.get(pk=copy.pk)
+        copy.status = "a"
+        copy.save()
+        self.assertEqual(CatalogStats.load().num_instances_available, 1)
+
+        copy.status = "m"
+        copy.save()
+        self.assertEqual(CatalogStats.load().num_instances_available, 0)
+
+    def test_rebuild_command_fixes_drift(self):
+        BookInstance.objects.bulk_create(
+            [BookInstance(book=self.book, status="a") for _ in range(3)]
+        )
+        self.assertEqual(CatalogStats.load().num_instances, 0)
+
+        call_command("rebuild_catalog_stats", stdout=StringIO())
+        stats = CatalogStats.load()
+        self.assertEqual(stats.num_instances, 3)
+        self.assertEqual(stats.num_instances_available, 3)
+
+    def test_delete_with_drifted_counters(self):
+        # Счётчики отстали: удаление не должно падать на CHECK >= 0.
+        BookInstance.objects.bulk_create([BookInstance(status="a")])
+        BookInstance.objects.get().delete()
+        stats = CatalogStats.load()
+        self.assertEqual(stats.num_instances, 0)
+        self.assertEqual(stats.num_instances_available, 0)
+
+
+class BookCopyCountersTest(TestCase):
+    def setUp(self):
+        self.book = Book.objects.create(
+            title="Book Title", summary="My book summary", isbn="ABCDEFG"
+        )
+        self.other_book = Book.objects.create(
+            title="Other", summary="My book summary", isbn="ABCDEFG"
+        )
+
+    def assertCopies(self, book, total, available):
+        book.refresh_from_db()
+        self.assertEqual(
+            (book.copies_total, book.copies_available), (total, available)
+        )
+
+    def test_counters_follow_copies(self):
+        copy = BookInstance.objects.create(book=self.book, status="a")
+        BookInstance.objects.create(book=self.book, status="o")
+        self.assertCopies(self.book, 2, 1)
+
+        copy = BookInstance.objects.get(pk=copy.pk)
+        copy.status = "o"
+        copy.save()
+        self.assertCopies(self.book, 2, 0)
+
+        copy.status = "a"
+        copy.book = self.other_book
+        copy.save()
+        self.assertCopies(self.book, 1, 0)
+        self.assertCopies(self.other_book, 1, 1)
+
+        copy.delete()
+        self.assertCopies(self.other_book, 0, 0)
+
+    def test_saving_stale_book_keeps_counters(self):
+        stale = Book.objects.get(pk=self.book.pk)
+        BookInstance.objects.create(book=self.book, status="a")
+        stale.title = "Renamed"
+        stale.save()
+        self.assertCopies(self.book, 1, 1)
+        self.assertEqual(self.book.title, "Renamed")
+
+    def test_reconcile_command_fixes_drift(self):
+        BookInstance.objects.bulk_create(
+            [BookInstance(book=self.book, status="a") for _ in range(3)]
+        )
+        BookInstance.objects.create(book=self.other_book, status="o")
+        self.assertCopies(self.book, 0, 0)
+
+        out = StringIO()
+        call_command("reconcile_copy_counts", stdout=out)
+        self.assertIn("Fixed copy counters of 1 books.", out.getvalue())
+        self.assertCopies(self.book, 3, 3)
+        self.assertCopies(self.other_book, 1, 0)
+
+    def test_delete_with_drifted_counters(self):
+        BookInstance.objects.bulk_create(
+            [BookInstance(book=self.book, status="a")]
+        )
+        BookInstance.objects.get().delete()
+        self.assertCopies(self.book, 0, 0)
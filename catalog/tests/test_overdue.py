@@ -0,0 +1,76 @@
+import datetime
+import io
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalog import overdue
+from catalog.models import Book, BookInstance
+
+User = get_user_model()
+
+
+class ScanOverdueTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = datetime.date.today()
+        cls.alice = User.objects.create_user(
+            username="alice", first_name="Alice", email="alice@example.com"
+        )
+        cls.bob = User.objects.create_user(
+            username="bob", email="bob@example.com"
+        )
+        cls.no_email = User.objects.create_user(username="carol")
+        for title, borrower, status, days in (
+            ("Late one", cls.alice, "o", -3),
+            ("Late two", cls.alice, "o", -1),
+            ("Due today", cls.alice, "o", 0),
+            ("Late three", cls.bob, "o", -10),
+            ("Returned", cls.bob, "a", -10),
+            ("Unreachable", cls.no_email, "o", -5),
+        ):
+            BookInstance.objects.create(
+                book=Book.objects.create(
+                    title=title, summary="Summary", isbn="ABCDEFG"
+                ),
+                imprint="Imprint",
+                status=status,
+                borrower=borrower,
+                due_back=today + datetime.timedelta(days=days),
+            )
+
+    def test_one_notice_per_borrower(self):
+        counts = overdue.send_notices()
+        self.assertEqual(counts, {"loans": 4, "notices": 2, "skipped": 1})
+        self.assertEqual(len(mail.outbox), 2)
+        alice, bob = sorted(mail.outbox, key=lambda message: message.to)
+        self.assertEqual(alice.to, ["alice@example.com"])
+        self.assertEqual(alice.subject, "Overdue library books (2)")
+        self.assertIn("Hello Alice,", alice.body)
+        self.assertIn("Late one", alice.body)
+        self.assertIn("Late two", alice.body)
+        self.assertNotIn("Due today", alice.body)
+        self.assertIn("Hello bob,", bob.body)
+        self.assertNotIn("Returned", bob.body)
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            overdue.send_notices(batch_size=1, chunk_size=1)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command("scan_overdue", "--dry-run", stdout=output)
+        self.assertEqual(mail.outbox, [])
+        self.assertIn(
+            "Would send 2 notices for 4 overdue loans", output.getvalue()
+        )
+
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        call_command(
+            "scan_overdue", "--date", tomorrow.isoformat(), stdout=output
+        )
+        self.assertIn("Sent 2 notices for 5 overdue loans", output.getvalue())
+        self.assertEqual(len(mail.outbox), 2)
@@ -0,0 +1,93 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from catalog.models import Author, Book
+from locallibrary import profiling
+
+User = get_user_model()
+
+
+class RequestProfileTest(SimpleTestCase):
+    def profile(self, *statements):
+        profile = profiling.RequestProfile()
+        for sql in statements:
+            profile(lambda *args: None, sql, (), False, {})
+        return profile
+
+    def test_duplicates_and_header(self):
+        profile = self.profile("SELECT 1", "SELECT 2 %s", "SELECT 2 %s")
+        self.assertEqual(profile.duplicates(), {"SELECT 2 %s": 1})
+        self.assertIn(
+            'desc="3 queries, 1 duplicates"', profile.server_timing(0.01)
+        )
+        self.assertTrue(profile.server_timing(0.01).startswith("total;dur=10"))
+
+    def test_report_aggregates_views(self):
+        report = profiling.Report()
+        report.record("books", 0.02, self.profile("SELECT 1"))
+        report.record("books", 0.04, self.profile("SELECT 1"))
+        report.record(
+            "authors", 0.01, self.profile("SELECT a", "SELECT a", "SELECT a")
+        )
+        books, authors = report.slowest_views()
+        self.assertEqual(books["name"], "books")
+        self.assertEqual(books["requests"], 2)
+        self.assertAlmostEqual(books["mean_total_ms"], 30)
+        self.assertAlmostEqual(books["max_ms"], 40)
+        self.assertEqual(authors["duplicates"], 2)
+        self.assertEqual(
+            report.duplicated_sql(), [("SELECT a", 2, ["authors"])]
+        )
+
+
+@override_settings(REQUEST_PROFILING=True)
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name="John", last_name="Smith")
+        Book.objects.create(
+            title="Book Title",
+            summary="Summary",
+            isbn="ABCDEFG",
+            author=author,
+        )
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        profiling.report.reset()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("books"))
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'sql;dur=[\d.]+;desc="\d+ queries')
+        template_time = re.search(r"template;dur=([\d.]+)", timing).group(1)
+        self.assertGreater(float(template_time), 0)
+
+    def test_staff_report(self):
+        self.client.get(reverse("books"))
+        url = reverse("profiling-report")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertContains(response, "<td>books</td>", html=True)
+
+        # После сброса в отчёте только сам запрос сброса.
+        self.client.post(url)
+        self.assertEqual(
+            [view["name"] for view in profiling.report.slowest_views()],
+            ["profiling-report"],
+        )
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_off_by_default(self):
+        response = self.client.get(reverse("books"))
+        self.assertNotIn("Server-Timing", response)
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("profiling-report"))
+        self.assertEqual(response.status_code, 404)
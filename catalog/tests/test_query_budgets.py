@@ -0,0 +1,204 @@
+"""
+Query budgets for every named catalog URL.
+
+Each URL in ``catalog/urls.py`` is requested against a small and a large
+catalog (``SIZES`` related rows: books of one author, copies of one book,
+loans and holds of one reader). The test fails when a URL runs more
+queries on the large catalog than on the small one, which is an N+1 or an
+unpaginated list, or more than its budget in ``query_budgets.json``.
+
+Budget entries name the user (``reader`` or ``librarian``), the object
+the URL points at, the method and the query string. ``batched`` marks
+views that read the whole catalog in fixed-size batches: their query
+count grows with the number of batches, so only the budget is checked.
+
+Pages are measured cold: the page and fragment caches are cleared before
+each request. Set ``QUERY_BUDGET_REPORT=1`` to print query counts and
+wall-clock times.
+"""
+
+import datetime
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import search, urls
+from catalog.models import (
+    Author,
+    Book,
+    BookInstance,
+    CatalogStats,
+    Genre,
+    Language,
+    Reservation,
+)
+
+User = get_user_model()
+
+BUDGETS = json.loads(
+    Path(__file__).with_name("query_budgets.json").read_text()
+)
+
+SIZES = (3, 1000)
+
+
+def create_catalog(size):
+    """Catalog with ``size`` rows behind every list; return named objects."""
+    reader = User.objects.create_user(username="reader")
+    librarian = User.objects.create_superuser(username="librarian")
+    language = Language.objects.create(name="English")
+    genres = Genre.objects.bulk_create(
+        Genre(name=name) for name in ("Fantasy", "Poetry", "History")
+    )
+    authors = Author.objects.bulk_create(
+        Author(first_name="First%d" % number, last_name="Last%d" % number)
+        for number in range(size)
+    )
+    books = Book.objects.bulk_create(
+        Book(
+            title="Book %04d" % number,
+            summary="Summary of book %d" % number,
+            isbn="9780306406157",
+            author=authors[0],
+            language=language,
+        )
+        for number in range(size)
+    )
+    Book.genre.through.objects.bulk_create(
+        Book.genre.through(book=book, genre=genre)
+        for book in books
+        for genre in genres[:2]
+    )
+    due_back = datetime.date.today() + datetime.timedelta(weeks=2)
+    loans = BookInstance.objects.bulk_create(
+        BookInstance(
+            book=book,
+            imprint="Imprint",
+            status="o",
+            due_back=due_back,
+            borrower=reader,
+        )
+        for book in books
+    )
+    BookInstance.objects.bulk_create(
+        BookInstance(book=books[0], imprint="Imprint", status="a")
+        for _ in range(size)
+    )
+    holds = Reservation.objects.bulk_create(
+        Reservation(book=book, patron=reader) for book in books[1:]
+    )
+    Book.reconcile_copies()
+    CatalogStats.rebuild()
+    search.rebuild_index()
+    return {
+        "users": {"reader": reader, "librarian": librarian},
+        "objects": {
+            "author": authors[0],
+            "book": books[0],
+            "loan": loans[0],
+            "reservation": holds[0],
+        },
+    }
+
+
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = {size: cls.measure(size) for size in SIZES}
+
+    @classmethod
+    def measure(cls, size):
+        """``{url name: (queries, seconds)}`` on a catalog of ``size``."""
+        results = {}
+        client = Client()
+        with transaction.atomic():
+            catalog = create_catalog(size)
+            for name, spec in BUDGETS.items():
+                user = catalog["users"].get(spec.get("user"))
+                if user is None:
+                    client.logout()
+                else:
+                    client.force_login(user)
+                kwargs = {}
+                if "object" in spec:
+                    kwargs["pk"] = catalog["objects"][spec["object"]].pk
+                url = reverse(name, kwargs=kwargs)
+                method = getattr(client, spec.get("method", "get"))
+                data = spec.get("query", {})
+                if spec.get("method", "get") == "get":
+                    # Прогрев: сессия, права, ContentType.
+                    method(url, data)
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = method(url, data)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                    elapsed = time.perf_counter() - started
+                    count = len(queries)
+                assert response.status_code < 400, (name, response)
+                results[name] = (count, elapsed)
+            transaction.set_rollback(True)
+        return results
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.environ.get("QUERY_BUDGET_REPORT"):
+            for name in BUDGETS:
+                print(
+                    "%-24s" % name
+                    + "".join(
+                        "%6d queries %8.1f ms"
+                        % (
+                            cls.results[size][name][0],
+                            cls.results[size][name][1] * 1000,
+                        )
+                        for size in SIZES
+                    ),
+                    file=sys.stderr,
+                )
+        super().tearDownClass()
+
+    def test_every_url_has_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns if pattern.name}
+        self.assertEqual(names - set(BUDGETS), set())
+
+    def test_queries_do_not_grow_with_catalog(self):
+        small, large = (self.results[size] for size in SIZES)
+        for name, spec in BUDGETS.items():
+            if spec.get("batched"):
+                continue
+            with self.subTest(name):
+                self.assertEqual(
+                    large[name][0],
+                    small[name][0],
+                    "%s: %d queries for %d rows, %d for %d rows"
+                    % (
+                        name,
+                        small[name][0],
+                        SIZES[0],
+                        large[name][0],
+                        SIZES[1],
+                    ),
+                )
+
+    def test_queries_within_budget(self):
+        for name, spec in BUDGETS.items():
+            with self.subTest(name):
+                count, elapsed = self.results[SIZES[-1]][name]
+                self.assertLessEqual(
+                    count,
+                    spec["queries"],
+                    "%s: %d queries (budget %d), %.1f ms"
+                    % (name, count, spec["queries"], elapsed * 1000),
+                )
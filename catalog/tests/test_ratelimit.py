@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+import tempfile
+from unittest import skipUnless
+
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    override_settings,
+)
+
+from locallibrary.caches import cache_config
+from locallibrary.middleware import client_ip
+
+
+def run_worker(number_of_requests, results):
+    """One "gunicorn worker": a separate process sending requests."""
+    client = Client()
+    results.put(
+        [
+            # Несуществующий адрес: лимит проверяется до разрешения URL,
+            # а 404 не обращается к базе данных.
+            client.get("/no-such-page/", REMOTE_ADDR="10.0.0.1").status_code
+            for _ in range(number_of_requests)
+        ]
+    )
+
+
+def run_workers(number_of_workers, requests_per_worker, concurrently=False):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [
+        context.Process(target=run_worker, args=(requests_per_worker, results))
+        for _ in range(number_of_workers)
+    ]
+    statuses = []
+    if concurrently:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            statuses += results.get(timeout=30)
+            worker.join()
+    else:
+        for worker in workers:
+            worker.start()
+            statuses += results.get(timeout=30)
+            worker.join()
+    return statuses
+
+
+class ClientIpTest(SimpleTestCase):
+    def ip(self, forwarded_for=None):
+        headers = {"REMOTE_ADDR": "10.0.0.1"}
+        if forwarded_for is not None:
+            headers["HTTP_X_FORWARDED_FOR"] = forwarded_for
+        return client_ip(RequestFactory().get("/", **headers))
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_forged_entries_ignored(self):
+        self.assertEqual(self.ip("203.0.113.7"), "203.0.113.7")
+        # Клиент дописал свои адреса перед тем, что добавил прокси.
+        self.assertEqual(self.ip("1.2.3.4, 203.0.113.7"), "203.0.113.7")
+        self.assertEqual(
+            self.ip("5.6.7.8,1.2.3.4 , 203.0.113.7"), "203.0.113.7"
+        )
+
+    @override_settings(TRUSTED_PROXY_COUNT=2)
+    def test_several_proxies(self):
+        self.assertEqual(
+            self.ip("1.2.3.4, 203.0.113.7, 10.1.1.1"), "203.0.113.7"
+        )
+        # Запрос прошёл не через все прокси.
+        self.assertEqual(self.ip("203.0.113.7"), "10.0.0.1")
+
+    @override_settings(TRUSTED_PROXY_COUNT=0)
+    def test_no_proxy(self):
+        self.assertEqual(self.ip("1.2.3.4"), "10.0.0.1")
+        self.assertEqual(self.ip(), "10.0.0.1")
+
+
+class CacheConfigTest(SimpleTestCase):
+    def test_default_is_locmem(self):
+        self.assertEqual(
+            cache_config("")["BACKEND"],
+            "django.core.cache.backends.locmem.LocMemCache",
+        )
+
+    def test_file_url(self):
+        config = cache_config("file:///var/tmp/library-cache")
+        self.assertEqual(
+            config["BACKEND"],
+            "django.core.cache.backends.filebased.FileBasedCache",
+        )
+        self.assertEqual(config["LOCATION"], "/var/tmp/library-cache")
+
+    def test_redis_url(self):
+        config = cache_config("redis://localhost:6379/1", key_prefix="lib")
+        self.assertEqual(
+            config["BACKEND"], "django.core.cache.backends.redis.RedisCache"
+        )
+        self.assertEqual(config["LOCATION"], "redis://localhost:6379/1")
+        self.assertEqual(config["KEY_PREFIX"], "lib")
+
+    def test_unknown_scheme(self):
+        with self.assertRaises(ValueError):
+            cache_config("memcached://localhost")
+
+
+@override_settings(RATELIMIT_ENABLE=True, RATELIMIT_GLOBAL="5/h")
+class GlobalRatelimitAcrossWorkersTest(SimpleTestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.file_cache = {
+            "default": cache_config("file://%s" % cache_dir.name)
+        }
+
+    def test_limit_holds_across_processes_with_shared_cache(self):
+        with override_settings(CACHES=self.file_cache):
+            statuses = run_workers(number_of_workers=3, requests_per_worker=3)
+        self.assertEqual(statuses.count(404), 5)
+        self.assertEqual(statuses.count(403), 4)
+
+    def test_locmem_cache_counts_per_process(self):
+        # Причина перехода на общий кэш: у каждого воркера свой счётчик,
+        # и фактический лимит умножается на число воркеров.
+        with override_settings(CACHES={"default": cache_config("")}):
+            statuses = run_workers(number_of_workers=3, requests_per_worker=3)
+        self.assertEqual(statuses.count(404), 9)
+
+    @skipUnless(
+        os.environ.get("TEST_REDIS_URL"),
+        "Set TEST_REDIS_URL to run against a Redis-compatible server.",
+    )
+    def test_limit_holds_for_concurrent_workers_with_redis(self):
+        redis_cache = {
+            "default": cache_config(
+                os.environ["TEST_REDIS_URL"], key_prefix=self.id()
+            )
+        }
+        with override_settings(CACHES=redis_cache):
+            statuses = run_workers(
+                number_of_workers=4, requests_per_worker=5, concurrently=True
+            )
+        self.assertEqual(statuses.count(404), 5)
+        self.assertEqual(statuses.count(403), 15)
@@ -0,0 +1,208 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import circulation, reservations
+from catalog.models import Book, BookInstance, CatalogStats, Reservation
+
+User = get_user_model()
+
+
+class ReservationQueueTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = Book.objects.create(
+            title="Book Title", summary="My book summary", isbn="ABCDEFG"
+        )
+        cls.patrons = [
+            User.objects.create_user(username="patron%d" % number)
+            for number in range(3)
+        ]
+        cls.loans = [
+            BookInstance.objects.create(
+                book=cls.book, status="o", borrower=cls.patrons[0]
+            )
+            for _ in range(2)
+        ]
+
+    def hold(self, patron):
+        reservation, created = reservations.place(self.book, patron)
+        self.assertTrue(created)
+        return reservation
+
+    def assertAvailable(self, count):
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, count)
+        self.assertEqual(CatalogStats.load().num_instances_available, count)
+
+    def test_returned_copies_go_to_oldest_holds(self):
+        holds = [self.hold(patron) for patron in self.patrons]
+        self.assertEqual(
+            [reservations.queue_position(hold) for hold in holds], [1, 2, 3]
+        )
+
+        circulation.circulate([self.loans[0].pk], circulation.RETURN)
+        first = Reservation.objects.get(pk=holds[0].pk)
+        self.assertEqual(first.status, Reservation.READY)
+        self.assertEqual(first.copy_id, self.loans[0].pk)
+        self.assertEqual(
+            BookInstance.objects.get(pk=self.loans[0].pk).status, "r"
+        )
+        self.assertEqual(reservations.queue_position(holds[1]), 1)
+        self.assertAvailable(0)
+
+        circulation.circulate([self.loans[1].pk], circulation.RETURN)
+        self.assertEqual(
+            list(
+                Reservation.objects.values_list("status", flat=True).order_by(
+                    "created_at", "id"
+                )
+            ),
+            [Reservation.READY, Reservation.READY, Reservation.WAITING],
+        )
+        # Повторный запуск ничего не назначает второй раз.
+        self.assertEqual(reservations.allocate([self.book.pk]), 0)
+
+    def test_free_copy_allocated_at_once(self):
+        copy = BookInstance.objects.create(book=self.book, status="a")
+        hold = self.hold(self.patrons[1])
+        self.assertEqual(hold.status, Reservation.READY)
+        self.assertEqual(hold.copy_id, copy.pk)
+        self.assertAvailable(0)
+
+        again, created = reservations.place(self.book, self.patrons[1])
+        self.assertFalse(created)
+        self.assertEqual(again, hold)
+
+    def test_cancel_passes_copy_to_next_hold(self):
+        first, second = self.hold(self.patrons[1]), self.hold(self.patrons[2])
+        circulation.circulate([self.loans[0].pk], circulation.RETURN)
+        first.refresh_from_db()
+
+        self.assertTrue(reservations.cancel(first))
+        second.refresh_from_db()
+        self.assertEqual(second.status, Reservation.READY)
+        self.assertEqual(second.copy_id, self.loans[0].pk)
+
+        self.assertTrue(reservations.cancel(second))
+        self.assertEqual(
+            BookInstance.objects.get(pk=self.loans[0].pk).status, "a"
+        )
+        self.assertAvailable(1)
+        self.assertFalse(reservations.cancel(second))
+
+    def test_expired_hold_released(self):
+        first, second = self.hold(self.patrons[1]), self.hold(self.patrons[2])
+        circulation.circulate([self.loans[0].pk], circulation.RETURN)
+        # Не забрали вовремя: библиотекарь снимает экземпляр с брони.
+        circulation.circulate([self.loans[0].pk], circulation.MAKE_AVAILABLE)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, Reservation.CANCELLED)
+        self.assertEqual(second.status, Reservation.READY)
+        self.assertEqual(second.copy_id, self.loans[0].pk)
+
+    def test_lending_ready_copy_fulfils_hold(self):
+        hold = self.hold(self.patrons[1])
+        circulation.circulate([self.loans[0].pk], circulation.RETURN)
+        copy = BookInstance.objects.get(pk=self.loans[0].pk)
+        copy.status = "o"
+        copy.borrower = self.patrons[1]
+        copy.save()
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, Reservation.FULFILLED)
+
+
+class SavedReturnTest(TestCase):
+    """A copy returned with ``save()`` (admin change form) goes to a hold."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = Book.objects.create(
+            title="Book Title", summary="My book summary", isbn="ABCDEFG"
+        )
+        cls.patron = User.objects.create_user(username="patron")
+        cls.copy = BookInstance.objects.create(
+            book=cls.book, imprint="Imprint", status="o", borrower=cls.patron
+        )
+        cls.admin = User.objects.create_superuser(username="admin")
+
+    def setUp(self):
+        self.hold, _ = reservations.place(self.book, self.patron)
+        self.assertEqual(self.hold.status, Reservation.WAITING)
+
+    def assertSetAside(self):
+        self.hold.refresh_from_db()
+        self.assertEqual(self.hold.status, Reservation.READY)
+        self.assertEqual(self.hold.copy_id, self.copy.pk)
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).status, "r")
+
+    def test_save(self):
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        copy.status = "a"
+        copy.borrower = None
+        with self.captureOnCommitCallbacks(execute=True):
+            copy.save()
+        self.assertSetAside()
+
+    def test_admin_change_form(self):
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse(
+                    "admin:catalog_bookinstance_change", args=[self.copy.pk]
+                ),
+                {
+                    "book": self.book.pk,
+                    "imprint": "Imprint",
+                    "id": self.copy.pk,
+                    "status": "a",
+                    "due_back": "",
+                    "borrower": "",
+                },
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertSetAside()
+
+
+class ReservationViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = Book.objects.create(
+            title="Book Title", summary="My book summary", isbn="ABCDEFG"
+        )
+        cls.patron = User.objects.create_user(
+            username="patron", password="1X<ISRUkw+tuK"
+        )
+        BookInstance.objects.create(book=cls.book, status="o")
+
+    def test_login_and_post_required(self):
+        url = reverse("reserve-book", args=[self.book.pk])
+        response = self.client.post(url)
+        self.assertRedirects(response, "/accounts/login/?next=%s" % url)
+        self.client.force_login(self.patron)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def test_reserve_and_cancel(self):
+        self.client.force_login(self.patron)
+        response = self.client.post(
+            reverse("reserve-book", args=[self.book.pk]), follow=True
+        )
+        self.assertContains(response, "You are number 1 in the queue")
+        self.assertContains(response, "Waiting")
+        reservation = response.context["reservation_list"][0]
+
+        response = self.client.post(
+            reverse("cancel-reservation", args=[reservation.pk]), follow=True
+        )
+        self.assertContains(response, "Hold on Book Title cancelled.")
+        self.assertFalse(response.context["reservation_list"])
+
+    def test_cannot_cancel_others_hold(self):
+        other = User.objects.create_user(username="other")
+        reservation, _ = reservations.place(self.book, other)
+        self.client.force_login(self.patron)
+        response = self.client.post(
+            reverse("cancel-reservation", args=[reservation.pk])
+        )
+        self.assertEqual(response.status_code, 404)
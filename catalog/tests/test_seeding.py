@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import TestCase
+
+from catalog.importer import clean_isbn
+from catalog.models import Book, BookInstance, CatalogStats, Reservation
+
+
+def snapshot():
+    return (
+        list(Book.objects.order_by("id").values_list("title", "isbn")),
+        list(
+            BookInstance.objects.order_by("id").values_list(
+                "id", "status", "due_back", "borrower__username"
+            )
+        ),
+    )
+
+
+class SeedCatalogCommandTest(TestCase):
+    def seed(self, **options):
+        out = StringIO()
+        call_command(
+            "seed_catalog",
+            stdout=out,
+            **{"books": 40, "copies_per_book": 5, "users": 20, **options},
+        )
+        return out.getvalue()
+
+    def test_seeds_consistent_catalog(self):
+        output = self.seed()
+        self.assertIn("Created 40 books by 2 authors, 200 copies", output)
+        self.assertEqual(BookInstance.objects.count(), 200)
+        # ISBN проходят ту же проверку, что и при импорте.
+        for isbn in Book.objects.values_list("isbn", flat=True):
+            self.assertEqual(clean_isbn(isbn), isbn)
+        self.assertEqual(Book.reconcile_copies(), 0)
+        stats = CatalogStats.load()
+        self.assertEqual(stats.num_instances, 200)
+        self.assertEqual(
+            stats.num_instances_available,
+            BookInstance.objects.filter(status="a").count(),
+        )
+        self.assertFalse(
+            BookInstance.objects.filter(
+                status="o", borrower__isnull=True
+            ).exists()
+        )
+        self.assertEqual(
+            Reservation.objects.filter(status=Reservation.READY).count(),
+            BookInstance.objects.filter(status="r").count(),
+        )
+
+    def test_same_seed_same_catalog(self):
+        with transaction.atomic():
+            self.seed(seed=7)
+            first = snapshot()
+            transaction.set_rollback(True)
+        self.seed(seed=7)
+        self.assertEqual(snapshot(), first)
+
+    def test_refuses_non_empty_catalog(self):
+        self.seed()
+        with self.assertRaisesMessage(CommandError, "not empty"):
+            self.seed()
+
+    def test_more_copies_than_readers(self):
+        self.seed(copies_per_book=30, users=2)
+        # Не больше одной брони книги на читателя.
+        self.assertLessEqual(Reservation.objects.count(), 40 * 2)
+        self.assertEqual(
+            Reservation.objects.count(),
+            BookInstance.objects.filter(status="r").count(),
+        )
+
+    def test_refuses_existing_readers(self):
+        User.objects.create_user(username="admin")
+        User.objects.create_user(username="reader3")
+        with self.assertRaisesMessage(CommandError, "reader<N>"):
+            self.seed()
@@ -1,16 +1,60 @@
 import datetime
 import uuid
+from unittest import mock
 
 # Get user model from settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import (
     Permission,
 )  # Required to grant the permission needed to set a book as returned.
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
-from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog import cache as catalog_cache
+from catalog import search
+from catalog.models import (
+    Author,
+    Book,
+    BookInstance,
+    CatalogStats,
+    Genre,
+    Language,
+)
+from catalog.pagination import encode_cursor, paginate_by_cursor
+
+
+class IndexViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CatalogStats.rebuild()
+        author = Author.objects.create(first_name="John", last_name="Smith")
+        Genre.objects.create(name="Fantasy")
+        book = Book.objects.create(
+            title="Book Title",
+            summary="My book summary",
+            isbn="ABCDEFG",
+            author=author,
+        )
+        BookInstance.objects.create(book=book, status="a")
+        BookInstance.objects.create(book=book, status="o")
+
+    def test_view_shows_catalog_counters(self):
+        response = self.client.get(reverse("index"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["num_books"], 1)
+        self.assertEqual(response.context["num_instances"], 2)
+        self.assertEqual(response.context["num_instances_available"], 1)
+        self.assertEqual(response.context["num_authors"], 1)
+        self.assertEqual(response.context["num_genre"], 1)
+
+    def test_view_runs_no_aggregate_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("index"))
+        self.assertFalse([q for q in queries if "COUNT(" in q["sql"].upper()])
 
 
 class AuthorListViewTest(TestCase):
@@ -25,6 +69,9 @@ class AuthorListViewTest(TestCase):
                 last_name=f"Surname {author_id}",
             )
 
+    def setUp(self):
+        cache.clear()
+
     def test_view_url_exists_at_desired_location(self):
         response = self.client.get("/catalog/authors/")
         self.assertEqual(response.status_code, 200)
@@ -38,6 +85,465 @@ class AuthorListViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "catalog/author_list.html")
 
+    def test_pagination_is_ten(self):
+        response = self.client.get(reverse("authors"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["is_paginated"])
+        self.assertEqual(len(response.context["author_list"]), 10)
+        self.assertFalse(response.context["page_obj"].has_previous())
+
+    def test_next_cursor_lists_remaining_authors(self):
+        response = self.client.get(reverse("authors"))
+        next_cursor = response.context["page_obj"].next_cursor
+        self.assertContains(response, f"?cursor={next_cursor}")
+
+        response = self.client.get(reverse("authors"), {"cursor": next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["author_list"]), 3)
+        self.assertFalse(response.context["page_obj"].has_next())
+
+    def test_previous_cursor_returns_to_first_page(self):
+        first_page = self.client.get(reverse("authors"))
+        second_page = self.client.get(
+            reverse("authors"),
+            {"cursor": first_page.context["page_obj"].next_cursor},
+        )
+        response = self.client.get(
+            reverse("authors"),
+            {"cursor": second_page.context["page_obj"].previous_cursor},
+        )
+        self.assertEqual(
+            list(response.context["author_list"]),
+            list(first_page.context["author_list"]),
+        )
+        self.assertFalse(response.context["page_obj"].has_previous())
+
+    def test_pages_follow_author_ordering(self):
+        authors = []
+        cursor = None
+        while True:
+            params = {"cursor": cursor} if cursor else {}
+            response = self.client.get(reverse("authors"), params)
+            authors += response.context["author_list"]
+            cursor = response.context["page_obj"].next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(authors, list(Author.objects.all()))
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse("authors"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_edited_cursor_returns_404(self):
+        # Курсор расшифровывается, но значения не того типа.
+        for values in (["Smith", "John", {"a": 1}], ["Smith", "John", "x"]):
+            response = self.client.get(
+                reverse("authors"), {"cursor": encode_cursor("n", values)}
+            )
+            self.assertEqual(response.status_code, 404, values)
+
+    def test_cursor_from_middle_seeks_index(self):
+        # Поля NOT NULL: без IS NULL и NULLS LAST, чтобы индекс
+        # author_name_idx читался с позиции курсора, без сортировки.
+        ordering = ("last_name", "first_name", "id")
+        author = Author.objects.order_by(*ordering)[6]
+        values = [author.last_name, author.first_name, author.pk]
+        for direction in ("n", "p"):
+            with CaptureQueriesContext(connection) as queries:
+                page = paginate_by_cursor(
+                    Author.objects.all(),
+                    ordering,
+                    10,
+                    encode_cursor(direction, values),
+                )
+            self.assertEqual(len(page), 6)
+            sql = queries[0]["sql"]
+            self.assertNotIn("IS NULL", sql)
+            self.assertNotIn("NULLS", sql)
+            if connection.vendor == "sqlite":
+                with connection.cursor() as cursor:
+                    cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                    plan = " ".join(row[-1] for row in cursor.fetchall())
+                self.assertIn("SEARCH catalog_author USING INDEX", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+
+class AuthorDetailViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.prolific_author = Author.objects.create(
+            first_name="Prolific", last_name="Writer"
+        )
+        cls.new_author = Author.objects.create(
+            first_name="New", last_name="Writer"
+        )
+        for author, number_of_books in (
+            (cls.prolific_author, 20),
+            (cls.new_author, 1),
+        ):
+            for book_id in range(number_of_books):
+                book = Book.objects.create(
+                    title=f"Book {book_id}",
+                    summary="My book summary",
+                    isbn="ABCDEFG",
+                    author=author,
+                )
+                BookInstance.objects.create(book=book, status="a")
+                BookInstance.objects.create(book=book, status="o")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_view_shows_copy_counts(self):
+        response = self.client.get(self.new_author.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        book = response.context["book_list"][0]
+        self.assertEqual(book.num_copies, 2)
+        self.assertEqual(book.num_copies_available, 1)
+        self.assertContains(response, "1 of 2 available")
+
+    def test_query_count_does_not_depend_on_number_of_books(self):
+        # updated_at для ETag, автор, книги с числом экземпляров.
+        for author in (self.new_author, self.prolific_author):
+            with self.assertNumQueries(3):
+                response = self.client.get(author.get_absolute_url())
+            self.assertEqual(response.status_code, 200)
+
+
+class BookDetailViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name="John", last_name="Smith")
+        language = Language.objects.create(name="English")
+        genres = [
+            Genre.objects.create(name="Fantasy"),
+            Genre.objects.create(name="Poetry"),
+        ]
+        cls.books = {}
+        for number_of_copies in (1, 50):
+            book = Book.objects.create(
+                title=f"Book with {number_of_copies} copies",
+                summary="My book summary",
+                isbn="ABCDEFG",
+                author=author,
+                language=language,
+            )
+            book.genre.set(genres)
+            for copy_id in range(number_of_copies):
+                BookInstance.objects.create(
+                    book=book,
+                    imprint="Unlikely Imprint, 2016",
+                    due_back=datetime.date.today()
+                    + datetime.timedelta(days=copy_id),
+                    status="a" if copy_id % 3 else "o",
+                )
+            cls.books[number_of_copies] = book
+
+    def setUp(self):
+        cache.clear()
+
+    def test_available_copies_listed_first(self):
+        response = self.client.get(self.books[50].get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        copies = list(response.context["book"].bookinstance_set.all())
+        self.assertEqual(len(copies), 50)
+        statuses = [copy.status for copy in copies]
+        self.assertEqual(statuses, sorted(statuses))
+        self.assertTrue(copies[0].is_available)
+
+    def test_query_count_does_not_depend_on_number_of_copies(self):
+        # updated_at для ETag, книга с автором и языком, жанры, экземпляры.
+        for book in self.books.values():
+            with self.assertNumQueries(4):
+                response = self.client.get(book.get_absolute_url())
+            self.assertEqual(response.status_code, 200)
+
+    def test_copy_str_uses_prefetched_book(self):
+        response = self.client.get(self.books[50].get_absolute_url())
+        copies = response.context["book"].bookinstance_set.all()
+        with self.assertNumQueries(0):
+            [str(copy) for copy in copies]
+
+
+class CatalogPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(
+            first_name="John", last_name="Smith"
+        )
+        cls.genre = Genre.objects.create(name="Fantasy")
+        cls.book = Book.objects.create(
+            title="Book Title",
+            summary="My book summary",
+            isbn="ABCDEFG",
+            author=cls.author,
+        )
+        cls.book.genre.add(cls.genre)
+        BookInstance.objects.create(book=cls.book, status="a")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_book_list_shows_availability(self):
+        BookInstance.objects.create(book=self.book, status="o")
+        # updated_at для ETag и страница книг с авторами; счётчики
+        # экземпляров уже в строке книги.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("books"))
+        self.assertContains(response, "1 of 2 copies available")
+
+    def test_anonymous_list_pages_cached(self):
+        for url in (reverse("books"), reverse("authors")):
+            first = self.client.get(url)
+            # Только CatalogStats.updated_at для ETag.
+            with self.assertNumQueries(1):
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(second.content, first.content)
+
+    def test_list_page_refreshed_after_change(self):
+        self.client.get(reverse("books"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(
+                title="Another Book",
+                summary="Summary",
+                isbn="ABCDEFG",
+                author=self.author,
+            )
+        self.assertContains(self.client.get(reverse("books")), "Another Book")
+
+    def test_versions_change_after_commit(self):
+        # До фиксации параллельный запрос видит старые строки и должен
+        # видеть и старую версию.
+        versions = {
+            (name, pk): catalog_cache.get_version(name, pk)
+            for name, pk in (
+                ("book", self.book.pk),
+                ("author", self.author.pk),
+                ("catalog", None),
+            )
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            BookInstance.objects.create(book=self.book, status="o")
+            for (name, pk), version in versions.items():
+                self.assertEqual(catalog_cache.get_version(name, pk), version)
+        for (name, pk), version in versions.items():
+            self.assertNotEqual(catalog_cache.get_version(name, pk), version)
+
+    def test_logged_in_list_pages_not_cached(self):
+        User.objects.create_user(username="reader", password="1X<ISRUkw+tuK")
+        self.client.login(username="reader", password="1X<ISRUkw+tuK")
+        self.client.get(reverse("books"))
+        response = self.client.get(reverse("books"))
+        self.assertEqual(str(response.context["user"]), "reader")
+
+    def test_detail_fragments_skip_related_queries(self):
+        for url in (
+            self.book.get_absolute_url(),
+            self.author.get_absolute_url(),
+        ):
+            first = self.client.get(url)
+            # updated_at для ETag и выборка объекта по первичному ключу.
+            with self.assertNumQueries(2):
+                second = self.client.get(url)
+            self.assertEqual(second.content, first.content)
+
+    def test_detail_fragments_refreshed_after_related_changes(self):
+        self.client.get(self.book.get_absolute_url())
+        self.client.get(self.author.get_absolute_url())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookInstance.objects.create(book=self.book, status="o")
+        self.assertContains(
+            self.client.get(self.author.get_absolute_url()),
+            "1 of 2 available",
+        )
+        self.assertContains(
+            self.client.get(self.book.get_absolute_url()), "On loan"
+        )
+
+        self.genre.name = "Science Fiction"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.genre.save()
+        self.assertContains(
+            self.client.get(self.book.get_absolute_url()), "Science Fiction"
+        )
+
+        self.author.last_name = "Jones"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        self.assertContains(
+            self.client.get(self.book.get_absolute_url()), "Jones, John"
+        )
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(
+            first_name="John", last_name="Smith"
+        )
+        cls.book = Book.objects.create(
+            title="Book Title",
+            summary="My book summary",
+            isbn="ABCDEFG",
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def urls(self):
+        return [
+            reverse("books"),
+            reverse("authors"),
+            self.book.get_absolute_url(),
+            self.author.get_absolute_url(),
+        ]
+
+    def test_pages_send_validators(self):
+        for url in self.urls():
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("ETag", response)
+            self.assertIn("Last-Modified", response)
+
+    def test_not_modified_without_rendering(self):
+        for url in self.urls():
+            etag = self.client.get(url)["ETag"]
+            # Только чтение одного updated_at, без шаблонов и связей.
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.templates, [])
+
+    def test_not_modified_since(self):
+        response = self.client.get(self.book.get_absolute_url())
+        response = self.client.get(
+            self.book.get_absolute_url(),
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_copy_change_modifies_book_author_and_lists(self):
+        etags = {url: self.client.get(url)["ETag"] for url in self.urls()}
+        BookInstance.objects.create(book=self.book, status="a")
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_deleting_a_book_modifies_lists(self):
+        url = reverse("books")
+        etag = self.client.get(url)["ETag"]
+        Book.objects.create(title="Other", summary="Summary", isbn="ABCDEFG")
+        etag = self.client.get(url)["ETag"]
+        Book.objects.get(title="Other").delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "Other")
+
+    def test_no_validators_for_logged_in_users(self):
+        User.objects.create_user(username="reader", password="1X<ISRUkw+tuK")
+        self.client.login(username="reader", password="1X<ISRUkw+tuK")
+        response = self.client.get(self.book.get_absolute_url())
+        self.assertNotIn("ETag", response)
+
+
+class BookSearchViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(
+            first_name="Ursula", last_name="Le Guin"
+        )
+        cls.genre = Genre.objects.create(name="Fantasy")
+        cls.wizard = Book.objects.create(
+            title="A Wizard of Earthsea",
+            summary="A boy with a gift for magic.",
+            isbn="ABCDEFG",
+            author=cls.author,
+        )
+        cls.wizard.genre.add(cls.genre)
+        cls.dispossessed = Book.objects.create(
+            title="The Dispossessed",
+            summary="A physicist travels between worlds. Wizard-free.",
+            isbn="ABCDEFG",
+            author=cls.author,
+        )
+        for book_id in range(12):
+            Book.objects.create(
+                title=f"Cookbook {book_id}",
+                summary="Recipes",
+                isbn="ABCDEFG",
+            )
+
+    def search(self, query, **params):
+        response = self.client.get(reverse("search"), {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_view_uses_correct_template(self):
+        response = self.search("")
+        self.assertTemplateUsed(response, "catalog/book_search.html")
+        self.assertEqual(response.context["book_list"], [])
+
+    def test_title_match_ranks_first(self):
+        response = self.search("wizard")
+        self.assertEqual(
+            response.context["book_list"], [self.wizard, self.dispossessed]
+        )
+
+    def test_search_by_prefix_author_and_genre(self):
+        self.assertEqual(
+            self.search("earth").context["book_list"], [self.wizard]
+        )
+        self.assertEqual(len(self.search("ursula").context["book_list"]), 2)
+        self.assertEqual(
+            self.search("fantasy").context["book_list"], [self.wizard]
+        )
+
+    def test_index_follows_author_and_genre_changes(self):
+        self.author.last_name = "LeGuin"
+        self.author.save()
+        self.assertEqual(len(self.search("leguin").context["book_list"]), 2)
+
+        self.genre.delete()
+        self.assertEqual(self.search("fantasy").context["book_list"], [])
+
+        self.wizard.delete()
+        self.assertEqual(
+            self.search("wizard").context["book_list"], [self.dispossessed]
+        )
+
+    def test_pagination_keeps_query(self):
+        response = self.search("cookbook")
+        self.assertTrue(response.context["is_paginated"])
+        self.assertEqual(len(response.context["book_list"]), 10)
+        self.assertContains(response, "?q=cookbook&amp;page=2")
+
+        response = self.search("cookbook", page=2)
+        self.assertEqual(len(response.context["book_list"]), 2)
+
+    def test_every_match_ranked(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite ranks every match")
+        with mock.patch.object(search, "CANDIDATES", 1):
+            response = self.search("wizard")
+        self.assertEqual(
+            response.context["book_list"], [self.wizard, self.dispossessed]
+        )
+        self.assertFalse(response.context["truncated"])
+        self.assertNotContains(response, "More than")
+
+    def test_truncated_results_noted(self):
+        results = search.SearchResults([self.wizard.pk])
+        results.truncated = True
+        with mock.patch.object(search, "search_books", return_value=results):
+            response = self.search("wizard")
+        self.assertEqual(response.context["book_list"], [self.wizard])
+        self.assertContains(
+            response, "More than %d books match" % search.CANDIDATES
+        )
+
 
 User = get_user_model()
 
@@ -98,6 +604,43 @@ class LoanedBookInstancesByUserListViewTest(TestCase):
             response, "/accounts/login/?next=/catalog/mybooks/"
         )
 
+    def test_only_borrowed_books_in_list(self):
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+        response = self.client.get(reverse("my-borrowed"))
+        # Check that initially we don't have any books in list (none on loan)
+        self.assertEqual(len(response.context["bookinstance_list"]), 0)
+
+        # Now change all books to be on loan
+        BookInstance.objects.update(status="o")
+
+        loans = []
+        cursor = None
+        while True:
+            params = {"cursor": cursor} if cursor else {}
+            response = self.client.get(reverse("my-borrowed"), params)
+            page = response.context["bookinstance_list"]
+            self.assertLessEqual(len(page), 10)
+            loans += page
+            cursor = response.context["page_obj"].next_cursor
+            if cursor is None:
+                break
+
+        # Only testuser1's copies, ordered by due date.
+        self.assertEqual(len(loans), 15)
+        self.assertTrue(
+            all(loan.borrower.username == "testuser1" for loan in loans)
+        )
+        due_dates = [loan.due_back for loan in loans]
+        self.assertEqual(due_dates, sorted(due_dates))
+
+    def test_edited_cursor_returns_404(self):
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+        response = self.client.get(
+            reverse("my-borrowed"),
+            {"cursor": encode_cursor("n", ["garbage", "x"])},
+        )
+        self.assertEqual(response.status_code, 404)
+
     def test_logged_in_uses_correct_template(self):
         self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
         response = self.client.get(reverse("my-borrowed"))
@@ -295,3 +838,145 @@ class RenewBookInstancesViewTest(TestCase):
             "renewal_date",
             "Invalid date - renewal more than 4 weeks ahead",
         )
+
+    def test_redirects_to_all_borrowed_book_list_on_success(self):
+        self.client.login(username="testuser2", password="2HJ1vRV0Z&3iD")
+        valid_date_in_future = datetime.date.today() + datetime.timedelta(
+            weeks=2
+        )
+        response = self.client.post(
+            reverse(
+                "renew-book-librarian",
+                kwargs={"pk": self.test_bookinstance1.pk},
+            ),
+            {"renewal_date": valid_date_in_future},
+        )
+        self.assertRedirects(response, reverse("all-borrowed"))
+        self.test_bookinstance1.refresh_from_db()
+        self.assertEqual(
+            self.test_bookinstance1.due_back, valid_date_in_future
+        )
+
+
+class LoanedBooksAllListViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username="reader", password="1X<ISRUkw+tuK"
+        )
+        cls.librarian = User.objects.create_user(
+            username="librarian", password="2HJ1vRV0Z&3iD"
+        )
+        cls.librarian.user_permissions.add(
+            Permission.objects.get(codename="can_mark_returned")
+        )
+        cls.book = Book.objects.create(
+            title="Book Title",
+            summary="My book summary",
+            isbn="ABCDEFG",
+            author=Author.objects.create(first_name="John", last_name="Smith"),
+        )
+        cls.loans = [
+            BookInstance.objects.create(
+                book=cls.book,
+                imprint="Imprint",
+                due_back=datetime.date.today() + datetime.timedelta(days=1),
+                borrower=cls.reader,
+                status="o",
+            )
+            for _ in range(3)
+        ]
+        cls.maintenance = BookInstance.objects.create(
+            book=cls.book, imprint="Imprint", status="m"
+        )
+
+    def setUp(self):
+        self.client.login(username="librarian", password="2HJ1vRV0Z&3iD")
+
+    def post(self, copies, action, **data):
+        return self.client.post(
+            reverse("all-borrowed"),
+            dict(data, copies=[copy.pk for copy in copies], action=action),
+        )
+
+    def test_permission_required(self):
+        self.client.login(username="reader", password="1X<ISRUkw+tuK")
+        response = self.client.get(reverse("all-borrowed"))
+        self.assertEqual(response.status_code, 302)
+        response = self.post(self.loans, "return")
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(BookInstance.objects.filter(status="a").exists())
+
+    def test_lists_all_loans(self):
+        response = self.client.get(reverse("all-borrowed"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(
+            response, "catalog/bookinstance_list_borrowed_all.html"
+        )
+        self.assertEqual(len(response.context["bookinstance_list"]), 3)
+
+    def test_bulk_renew_in_one_update(self):
+        renewal_date = datetime.date.today() + datetime.timedelta(weeks=2)
+        with CaptureQueriesContext(connection) as context:
+            response = self.post(
+                self.loans[:2], "renew", renewal_date=renewal_date
+            )
+        updates = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith('UPDATE "catalog_bookinstance"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertRedirects(response, reverse("all-borrowed"))
+        self.assertEqual(
+            BookInstance.objects.filter(due_back=renewal_date).count(), 2
+        )
+
+    def test_renewal_date_validated(self):
+        for renewal_date in (
+            None,
+            datetime.date.today() - datetime.timedelta(days=1),
+            datetime.date.today() + datetime.timedelta(weeks=5),
+        ):
+            data = {"renewal_date": renewal_date} if renewal_date else {}
+            response = self.post(self.loans, "renew", **data)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("renewal_date", response.context["form"].errors)
+        self.assertFalse(
+            BookInstance.objects.exclude(
+                due_back=self.loans[0].due_back
+            ).filter(status="o")
+        )
+
+    def test_invalid_copy_ids(self):
+        response = self.client.post(
+            reverse("all-borrowed"), {"copies": ["nope"], "action": "return"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_return_updates_stats_and_pages(self):
+        book_etag = (
+            self.client.logout()
+            or self.client.get(self.book.get_absolute_url())["ETag"]
+        )
+        self.client.login(username="librarian", password="2HJ1vRV0Z&3iD")
+        self.post(self.loans + [self.maintenance], "return")
+
+        returned = BookInstance.objects.filter(status="a")
+        self.assertEqual(returned.count(), 3)
+        self.assertFalse(returned.exclude(borrower=None).exists())
+        self.assertEqual(CatalogStats.load().num_instances_available, 3)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 3)
+        self.client.logout()
+        response = self.client.get(
+            self.book.get_absolute_url(), HTTP_IF_NONE_MATCH=book_etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_make_available_skips_loans(self):
+        self.post(self.loans + [self.maintenance], "available")
+        self.assertEqual(
+            list(BookInstance.objects.filter(status="a")), [self.maintenance]
+        )
+        self.assertEqual(CatalogStats.load().num_instances_available, 1)
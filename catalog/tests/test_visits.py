@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import signals, visits
+from catalog.models import CatalogStats, VisitCounter
+
+
+class VisitCounterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CatalogStats.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(visits, "buffer", visits.Buffer())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def visit(self):
+        return self.client.get(reverse("index"))
+
+    def test_index_does_not_write(self):
+        response = self.visit()
+        self.assertIn(visits.COOKIE_NAME, response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.visit()
+        self.assertEqual(response.context["num_visits"], 1)
+        # Кука ставится только при первом посещении.
+        self.assertEqual(response.cookies, {})
+        self.assertFalse(
+            [
+                query
+                for query in queries
+                if not query["sql"].upper().startswith("SELECT")
+            ]
+        )
+
+    def test_flush_copies_cached_counts(self):
+        for _ in range(3):
+            self.visit()
+        visitor = self.client.cookies[visits.COOKIE_NAME].value
+        # Без force запись ждёт FLUSH_INTERVAL.
+        self.assertEqual(visits.flush(force=False), 0)
+        self.assertEqual(visits.flush(), 1)
+        self.assertEqual(VisitCounter.objects.get().count, 3)
+
+        # Счётчик вытеснен из кэша: отсчёт продолжается с сохранённого.
+        cache.clear()
+        self.assertEqual(self.visit().context["num_visits"], 3)
+        visits.flush()
+        self.assertEqual(VisitCounter.objects.get().count, 4)
+        self.assertEqual(
+            self.client.cookies[visits.COOKIE_NAME].value, visitor
+        )
+
+    def test_forged_cookie_is_new_visitor(self):
+        self.client.cookies[visits.COOKIE_NAME] = "forged"
+        response = self.visit()
+        self.assertEqual(response.context["num_visits"], 0)
+        self.assertIn(visits.COOKIE_NAME, response.cookies)
+
+    def test_flush_keeps_visitors_on_database_error(self):
+        self.visit()
+        with mock.patch.object(
+            VisitCounter.objects,
+            "bulk_create",
+            side_effect=OperationalError("database is locked"),
+        ), self.assertLogs("catalog.visits", "ERROR"):
+            self.assertEqual(visits.flush(), 0)
+        self.assertEqual(visits.flush(), 1)
+
+
+class FlushAfterRequestTest(SimpleTestCase):
+    def flush_opening_connection(self, open_before):
+        # Вместо соединения с БД - заглушка: проверяется только close().
+        def flush(force):
+            connection.connection = mock.sentinel.connection
+            return 1
+
+        with mock.patch.object(
+            connection,
+            "connection",
+            mock.sentinel.connection if open_before else None,
+        ), mock.patch.object(connection, "close") as close, mock.patch.object(
+            visits, "flush", side_effect=flush
+        ):
+            signals.flush_visits(sender=None)
+        return close
+
+    def test_closes_connection_it_opened(self):
+        self.flush_opening_connection(False).assert_called_once()
+
+    def test_keeps_persistent_connection(self):
+        self.flush_opening_connection(True).assert_not_called()
@@ -1,32 +1,64 @@
+from django.conf import settings
 from django.urls import re_path
 
-from . import views
+from . import api, async_views, views
 
-urlpatterns = [
-    re_path(r"^$", views.index, name="index"),
-    re_path(r"^books/$", views.BookListView.as_view(), name="books"),
-    re_path(
+# Страницы, у которых есть async-вариант: (regex, name, sync, async).
+PAGES = (
+    (r"^$", "index", views.index, async_views.index),
+    (
+        r"^books/$",
+        "books",
+        views.BookListView.as_view(),
+        async_views.book_list,
+    ),
+    (
         r"^book/(?P<pk>\d+)$",
+        "book-detail",
         views.BookDetailView.as_view(),
-        name="book-detail",
+        async_views.book_detail,
     ),
-    re_path(r"^authors/$", views.AuthorListView.as_view(), name="authors"),
-    re_path(
+    (
+        r"^authors/$",
+        "authors",
+        views.AuthorListView.as_view(),
+        async_views.author_list,
+    ),
+    (
         r"^authors/(?P<pk>\d+)$",
+        "author-detail",
         views.AuthorDetailView.as_view(),
-        name="author-detail",
+        async_views.author_detail,
     ),
-]
-
-urlpatterns += [
-    re_path(
+    (
         r"^mybooks/$",
+        "my-borrowed",
         views.LoanedBooksByUserListView.as_view(),
-        name="my-borrowed",
+        async_views.loaned_books_by_user,
     ),
+)
+
+
+def page_patterns(use_async):
+    """URL patterns of ``PAGES`` served by sync or async views."""
+    return [
+        re_path(regex, async_view if use_async else view, name=name)
+        for regex, name, view, async_view in PAGES
+    ]
+
+
+urlpatterns = page_patterns(settings.CATALOG_ASYNC_VIEWS)
+
+urlpatterns += [
+    re_path(r"^search/$", views.BookSearchView.as_view(), name="search"),
 ]
 
 urlpatterns += [
+    re_path(
+        r"^borrowed/$",
+        views.LoanedBooksAllListView.as_view(),
+        name="all-borrowed",
+    ),
     re_path(
         r"^book/(?P<pk>[-\w]+)/renew/$",
         views.renew_book_librarian,
@@ -34,6 +66,37 @@ urlpatterns += [
     ),
 ]
 
+urlpatterns += [
+    re_path(r"^export/$", views.export_catalog, name="export"),
+]
+
+urlpatterns += [
+    re_path(
+        r"^book/(?P<pk>\d+)/reserve/$", views.reserve_book, name="reserve-book"
+    ),
+    re_path(
+        r"^reservations/(?P<pk>\d+)/cancel/$",
+        views.cancel_reservation,
+        name="cancel-reservation",
+    ),
+]
+
+urlpatterns += [
+    re_path(r"^api/v1/books/$", api.book_list, name="api-books"),
+    re_path(r"^api/v1/books/(?P<pk>\d+)/$", api.book_detail, name="api-book"),
+    re_path(
+        r"^api/v1/books/(?P<pk>\d+)/availability/$",
+        api.book_availability,
+        name="api-book-availability",
+    ),
+    re_path(r"^api/v1/authors/$", api.author_list, name="api-authors"),
+    re_path(
+        r"^api/v1/authors/(?P<pk>\d+)/$",
+        api.author_detail,
+        name="api-author",
+    ),
+]
+
 urlpatterns += [
     re_path(
         r"^author/create/$", views.AuthorCreate.as_view(), name="author_create"
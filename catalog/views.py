@@ -1,63 +1,183 @@
 import datetime
 
-from django.contrib.auth.decorators import permission_required
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import (
+    login_required,
+    permission_required,
+)
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponseRedirect
+from django.db.models import BooleanField, Case, Count, Prefetch, Q, When
+from django.http import (
+    Http404,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import require_POST
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 
-from .forms import RenewBookForm
-from .models import Author, Book, BookInstance
+from . import cache, circulation, export, reservations, search, visits
+from .forms import BulkCirculationForm, RenewBookForm
+from .models import Author, Book, BookInstance, CatalogStats, Reservation
+from .pagination import CursorPaginationMixin
+
+
+def catalog_updated_at():
+    return CatalogStats.load().updated_at
+
+
+def book_updated_at(pk):
+    return (
+        Book.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+    )
+
+
+def author_updated_at(pk):
+    return (
+        Author.objects.filter(pk=pk)
+        .values_list("updated_at", flat=True)
+        .first()
+    )
+
+
+def index_context(stats, num_visits):
+    return {
+        "num_books": stats.num_books,
+        "num_instances": stats.num_instances,
+        "num_instances_available": stats.num_instances_available,
+        "num_authors": stats.num_authors,
+        "num_visits": num_visits,
+        "num_genre": stats.num_genres,
+    }
 
 
 def index(request):
-    num_books = Book.objects.all().count()
-    num_instances = BookInstance.objects.all().count()
-    num_instances_available = BookInstance.objects.filter(
-        status__exact="a"
-    ).count()
-    num_genre = BookInstance.objects.count()
-    num_authors = Author.objects.count()  # The 'all()' is implied by default.
-
-    # Number of visits to this view, as counted in the session variable.
-    num_visits = request.session.get("num_visits", 0)
-    request.session["num_visits"] = num_visits + 1
+    # Счётчики читаются одной строкой из денормализованной таблицы,
+    # без COUNT(*) по каталогу (см. catalog.signals).
+    stats = CatalogStats.load()
 
-    return render(
-        request,
-        "index.html",
-        context={
-            "num_books": num_books,
-            "num_instances": num_instances,
-            "num_instances_available": num_instances_available,
-            "num_authors": num_authors,
-            "num_visits": num_visits,
-            "num_genre": num_genre,
-        },  # num_visits appended
+    # Посещения считаются в кэше (см. catalog.visits), без записи сессии.
+    cookie = visits.get_visitor(request)
+    visitor, num_visits = visits.count_visit(cookie)
+
+    response = render(
+        request, "index.html", context=index_context(stats, num_visits)
     )
+    if cookie is None:
+        visits.set_visitor(response, visitor)
+    return response
 
 
-class BookListView(generic.ListView):
-    model = Book
+@method_decorator(cache.conditional_page(catalog_updated_at), name="dispatch")
+class BookListView(
+    cache.CachedAnonymousPageMixin, CursorPaginationMixin, generic.ListView
+):
+    queryset = Book.objects.select_related("author")
+    cursor_ordering = ("title", "id")
 
 
+class BookSearchView(generic.ListView):
+    """
+    Full-text search over titles, summaries, authors and genres.
+    """
+
+    template_name = "catalog/book_search.html"
+    context_object_name = "book_list"
+    paginate_by = 10
+
+    def get_queryset(self):
+        # Ранжированные id книг из поискового индекса (catalog.search).
+        self.query = self.request.GET.get("q", "").strip()
+        return search.search_books(self.query)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page_ids = context["object_list"]
+        books = Book.objects.select_related("author").in_bulk(page_ids)
+        context["object_list"] = context["book_list"] = [
+            books[book_id] for book_id in page_ids if book_id in books
+        ]
+        context["query"] = self.query
+        # Ранжирована только часть совпадений: лучшие могли не попасть.
+        context["truncated"] = self.object_list.truncated
+        context["candidates"] = search.CANDIDATES
+        return context
+
+
+def book_detail_prefetches():
+    # Экземпляры: сначала доступные, затем по дате возврата.
+    copies = BookInstance.objects.annotate(
+        is_available=Case(
+            When(status="a", then=True),
+            default=False,
+            output_field=BooleanField(),
+        )
+    ).order_by("-is_available", "due_back", "id")
+    return ["genre", Prefetch("bookinstance_set", queryset=copies)]
+
+
+@method_decorator(cache.conditional_page(book_updated_at), name="dispatch")
 class BookDetailView(generic.DetailView):
     model = Book
     paginate_by = 10
 
-
-class AuthorListView(generic.ListView):
+    def get_queryset(self):
+        queryset = Book.objects.select_related("author", "language")
+        # Жанры и экземпляры нужны только фрагменту шаблона; если он
+        # уже в кэше для текущей версии книги, не загружаем их.
+        self.book_version = cache.get_version("book", self.kwargs["pk"])
+        if cache.fragment_cached(
+            "book_detail", self.kwargs["pk"], self.book_version
+        ):
+            return queryset
+
+        return queryset.prefetch_related(*book_detail_prefetches())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["book_version"] = self.book_version
+        return context
+
+
+@method_decorator(cache.conditional_page(catalog_updated_at), name="dispatch")
+class AuthorListView(
+    cache.CachedAnonymousPageMixin, CursorPaginationMixin, generic.ListView
+):
     model = Author
+    cursor_ordering = ("last_name", "first_name", "id")
 
 
+def author_books(author):
+    # Книги автора вместе с числом экземпляров одним запросом,
+    # вместо отдельного COUNT на каждую книгу в шаблоне.
+    return author.book_set.annotate(
+        num_copies=Count("bookinstance"),
+        num_copies_available=Count(
+            "bookinstance", filter=Q(bookinstance__status="a")
+        ),
+    ).order_by("title", "pk")
+
+
+@method_decorator(cache.conditional_page(author_updated_at), name="dispatch")
 class AuthorDetailView(generic.DetailView):
     model = Author
     paginate_by = 10
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["book_list"] = author_books(self.object)
+        context["author_version"] = cache.get_version("author", self.object.pk)
+        return context
+
 
-class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
+class LoanedBooksByUserListView(
+    LoginRequiredMixin, CursorPaginationMixin, generic.ListView
+):
     """
     Generic class-based view listing books on loan to current user.
     """
@@ -65,14 +185,120 @@ class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
     model = BookInstance
     template_name = "catalog/bookinstance_list_borrowed_user.html"
     paginate_by = 10
+    cursor_ordering = ("due_back", "id")
 
     def get_queryset(self):
         return (
             BookInstance.objects.filter(borrower=self.request.user)
             .filter(status__exact="o")
-            .order_by("due_back")
+            .select_related("book")
         )
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["reservation_list"] = reservations_of(self.request.user)
+        return context
+
+
+def reservations_of(user):
+    # Активные брони читателя: отложенные - первыми.
+    return (
+        Reservation.objects.filter(patron=user, status__in=Reservation.ACTIVE)
+        .select_related("book")
+        .order_by("status", "created_at", "id")
+    )
+
+
+@method_decorator(
+    permission_required("catalog.can_mark_returned"), name="dispatch"
+)
+class LoanedBooksAllListView(CursorPaginationMixin, generic.ListView):
+    """
+    All copies on loan, with bulk renewal and return for librarians.
+    """
+
+    model = BookInstance
+    template_name = "catalog/bookinstance_list_borrowed_all.html"
+    paginate_by = 50
+    cursor_ordering = ("due_back", "id")
+
+    def get_queryset(self):
+        return BookInstance.objects.filter(status__exact="o").select_related(
+            "book", "borrower"
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.setdefault(
+            "form",
+            BulkCirculationForm(
+                initial={
+                    "action": circulation.RENEW,
+                    "renewal_date": datetime.date.today()
+                    + datetime.timedelta(weeks=3),
+                }
+            ),
+        )
+        return context
+
+    def post(self, request, *args, **kwargs):
+        form = BulkCirculationForm(request.POST)
+        if not form.is_valid():
+            self.object_list = self.get_queryset()
+            return self.render_to_response(
+                self.get_context_data(form=form), status=400
+            )
+        changed = circulation.circulate(
+            form.cleaned_data["copies"],
+            form.cleaned_data["action"],
+            form.cleaned_data["renewal_date"],
+        )
+        messages.success(
+            request,
+            "%s: %d of %d selected copies."
+            % (
+                dict(circulation.ACTIONS)[form.cleaned_data["action"]],
+                changed,
+                len(form.cleaned_data["copies"]),
+            ),
+        )
+        return HttpResponseRedirect(request.get_full_path())
+
+
+@login_required
+@require_POST
+def reserve_book(request, pk):
+    """Place a hold on a book for the current user."""
+    book = get_object_or_404(Book, pk=pk)
+    reservation, created = reservations.place(book, request.user)
+    if reservation.status == Reservation.READY:
+        messages.success(
+            request, "A copy of %s is waiting for you at the desk." % book
+        )
+    elif created:
+        messages.success(
+            request,
+            "You are number %d in the queue for %s."
+            % (reservations.queue_position(reservation), book),
+        )
+    else:
+        messages.info(request, "You already have a hold on %s." % book)
+    return HttpResponseRedirect(reverse("my-borrowed"))
+
+
+@login_required
+@require_POST
+def cancel_reservation(request, pk):
+    reservation = get_object_or_404(
+        Reservation,
+        pk=pk,
+        patron=request.user,
+        status__in=Reservation.ACTIVE,
+    )
+    reservations.cancel(reservation)
+    messages.success(request, "Hold on %s cancelled." % reservation.book)
+    return HttpResponseRedirect(reverse("my-borrowed"))
+
 
 @permission_required("catalog.can_mark_returned")
 def renew_book_librarian(request, pk):
@@ -84,13 +310,12 @@ def renew_book_librarian(request, pk):
     # If this is a POST request then process the Form data
     if request.method == "POST":
 
-
         form = RenewBookForm(request.POST)
 
         # Check if the form is valid:
         if form.is_valid():
             book_inst.due_back = form.cleaned_data["renewal_date"]
-            book_inst.save()
+            book_inst.save(update_fields=["due_back", "updated_at"])
 
             # redirect to a new URL:
             return HttpResponseRedirect(reverse("all-borrowed"))
@@ -113,6 +338,24 @@ def renew_book_librarian(request, pk):
     )
 
 
+@staff_member_required
+def export_catalog(request):
+    """
+    Stream every book copy with its book, author and genres as CSV or
+    JSON Lines (``?format=csv|jsonl``).
+    """
+    format = request.GET.get("format", "csv")
+    if format not in export.FORMATS:
+        raise Http404("Unknown export format.")
+    response = StreamingHttpResponse(
+        export.export(format), content_type=export.FORMATS[format][1]
+    )
+    response["Content-Disposition"] = 'attachment; filename="%s"' % (
+        "catalog-%s.%s" % (timezone.localdate().isoformat(), format)
+    )
+    return response
+
+
 class AuthorCreate(CreateView):
     model = Author
     fields = "__all__"
@@ -0,0 +1,176 @@
+"""
+Write-behind counter of home page visits.
+
+A visitor is identified by the signed ``visitor`` cookie, set by the
+response to their first visit only. The number of visits is incremented
+in the cache; the worker remembers whom it counted and copies their
+counts to ``VisitCounter`` in one statement, at most every
+``FLUSH_INTERVAL`` seconds, once the response of a request has been
+sent (``request_finished``, see ``catalog.signals``). Serving the home
+page itself only reads the database, when a count is not in the cache.
+
+The row is a copy of the cached count, so it does not matter which
+worker writes it, or how often. Visits counted since the last copy are
+lost if the cache drops them first, and a worker stopped between copies
+leaves them in the cache until the visitor comes back. Workers must
+share the cache (``CACHE_URL``): with a LocMemCache per process each
+worker counts only the visits it served on top of the stored value.
+"""
+
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from .models import VisitCounter
+
+COOKIE_NAME = "visitor"
+COOKIE_SALT = "catalog.visits"
+COOKIE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Время жизни счётчика в кэше, секунды.
+TIMEOUT = 60 * 60 * 24 * 7
+
+# Как часто воркер копирует счётчики в БД, секунды.
+FLUSH_INTERVAL = 10.0
+
+logger = logging.getLogger(__name__)
+
+
+def _key(visitor):
+    return "catalog:visits:%s" % visitor
+
+
+class Buffer:
+    """Visitors whose counts this process has not yet copied."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.visitors = set()
+        self.flushed_at = time.monotonic()
+
+    def add(self, visitor):
+        with self.lock:
+            self.visitors.add(visitor)
+
+    def take(self, force=False):
+        """Empty the buffer if it is due (or ``force``); return its content."""
+        with self.lock:
+            now = time.monotonic()
+            if not self.visitors or (
+                not force and now - self.flushed_at < FLUSH_INTERVAL
+            ):
+                return set()
+            visitors, self.visitors = self.visitors, set()
+            self.flushed_at = now
+            return visitors
+
+
+buffer = Buffer()
+
+
+def get_visitor(request):
+    """Visitor id from the cookie, ``None`` for a first visit."""
+    return request.get_signed_cookie(
+        COOKIE_NAME, default=None, salt=COOKIE_SALT
+    )
+
+
+def set_visitor(response, visitor):
+    response.set_signed_cookie(
+        COOKIE_NAME,
+        visitor,
+        salt=COOKIE_SALT,
+        max_age=COOKIE_MAX_AGE,
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+def count_visit(visitor):
+    """
+    Count a visit of ``visitor`` (``None`` for a new one).
+
+    Return ``(visitor, visits before this one)``.
+    """
+    if visitor is None:
+        visitor = uuid.uuid4().hex
+        cache.set(_key(visitor), 1, TIMEOUT)
+        buffer.add(visitor)
+        return visitor, 0
+    key = _key(visitor)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Счётчика нет в кэше: продолжаем с сохранённого значения.
+        stored = (
+            VisitCounter.objects.filter(visitor=visitor)
+            .values_list("count", flat=True)
+            .first()
+        ) or 0
+        count = stored + 1
+        if not cache.add(key, count, TIMEOUT):
+            count = cache.incr(key)
+    buffer.add(visitor)
+    return visitor, count - 1
+
+
+async def acount_visit(visitor):
+    """Async ``count_visit()``."""
+    if visitor is None:
+        visitor = uuid.uuid4().hex
+        await cache.aset(_key(visitor), 1, TIMEOUT)
+        buffer.add(visitor)
+        return visitor, 0
+    key = _key(visitor)
+    try:
+        count = await cache.aincr(key)
+    except ValueError:
+        stored = (
+            await VisitCounter.objects.filter(visitor=visitor)
+            .values_list("count", flat=True)
+            .afirst()
+        ) or 0
+        count = stored + 1
+        if not await cache.aadd(key, count, TIMEOUT):
+            count = await cache.aincr(key)
+    buffer.add(visitor)
+    return visitor, count - 1
+
+
+def flush(force=True):
+    """
+    Copy the cached counts of buffered visitors to ``VisitCounter``.
+
+    Without ``force`` only if ``FLUSH_INTERVAL`` has passed since the
+    last copy. Return the number of rows written. A database error is
+    logged and the visitors are kept for the next copy.
+    """
+    visitors = buffer.take(force)
+    if not visitors:
+        return 0
+    counts = cache.get_many([_key(visitor) for visitor in visitors])
+    rows = [
+        VisitCounter(visitor=visitor, count=counts[_key(visitor)])
+        for visitor in visitors
+        if _key(visitor) in counts
+    ]
+    try:
+        VisitCounter.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["visitor"],
+            update_fields=["count", "updated_at"],
+        )
+    except DatabaseError:
+        # Например, "database is locked": повторим при следующей записи.
+        logger.exception("Could not store %d visit counters", len(rows))
+        for visitor in visitors:
+            buffer.add(visitor)
+        return 0
+    return len(rows)
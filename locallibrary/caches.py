@@ -0,0 +1,36 @@
+"""
+Cache configuration from a URL, in the spirit of ``dj_database_url``.
+
+``CACHE_URL`` selects the backend shared by all worker processes:
+
+* ``redis://host:6379/0`` (or ``rediss://``) - Redis or any Redis-compatible
+  server (Valkey, KeyDB, ...); atomic counters, the recommended backend;
+* ``file:///var/tmp/locallibrary-cache`` - a directory shared by the
+  workers of one host; counters are not atomic under heavy contention;
+* ``locmem://`` or unset - per-process memory, only suitable for a single
+  process (development, tests).
+"""
+
+from urllib.parse import urlsplit
+
+BACKENDS = {
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "rediss": "django.core.cache.backends.redis.RedisCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "dummy": "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def cache_config(url, key_prefix=""):
+    """Return a ``CACHES`` entry for ``url``."""
+    scheme = urlsplit(url).scheme if url else "locmem"
+    if scheme not in BACKENDS:
+        raise ValueError("Unsupported cache URL scheme: %r" % url)
+
+    config = {"BACKEND": BACKENDS[scheme], "KEY_PREFIX": key_prefix}
+    if scheme in ("redis", "rediss"):
+        config["LOCATION"] = url
+    elif scheme == "file":
+        config["LOCATION"] = urlsplit(url).path
+    return config
@@ -0,0 +1,95 @@
+"""
+Database configuration from ``DATABASE_URL`` with connection reuse.
+
+Without a pool each thread keeps its connection for ``conn_max_age``
+seconds and checks it with a query at the start of every request that
+uses it (``CONN_HEALTH_CHECKS``). With ``DATABASE_POOL=1`` (PostgreSQL
+and ``psycopg[pool]`` only) every worker process opens a psycopg pool:
+a request takes a connection when it first queries and returns it when
+it finishes, so idle threads hold no connections. Django requires
+``CONN_MAX_AGE=0`` with a pool.
+
+Pool options come from ``DATABASE_POOL_<OPTION>`` variables, see
+``POOL_DEFAULTS``. Each worker has its own pool: ``max_size`` times the
+number of workers must stay below PostgreSQL ``max_connections``.
+
+SQLite connections get the ``SQLITE_PRAGMAS`` profile for several worker
+processes sharing one file (``tune_sqlite()``): in WAL mode readers do
+not wait for the writer, and a writer waits up to ``busy_timeout`` for
+another one instead of failing with "database is locked". Transactions
+start with ``BEGIN IMMEDIATE``, so one that reads and then writes takes
+the write lock up front; with the default deferred ``BEGIN`` two such
+transactions can deadlock on the lock upgrade, and SQLite fails one of
+them at once, without waiting.
+"""
+
+import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
+
+# Параметры psycopg_pool.ConnectionPool: значение по умолчанию и тип.
+POOL_DEFAULTS = {
+    # Соединения, открытые всегда, и предел на процесс.
+    "min_size": (2, int),
+    "max_size": (10, int),
+    # Сколько запрос ждёт свободное соединение, секунды (затем ошибка).
+    "timeout": (10.0, float),
+    # Лишние сверх min_size соединения закрываются после простоя.
+    "max_idle": (300.0, float),
+    # Соединения пересоздаются не реже раза в max_lifetime секунд.
+    "max_lifetime": (3600.0, float),
+}
+
+
+# Прагмы каждого нового соединения с SQLite.
+SQLITE_PRAGMAS = {
+    # Журнал сохраняется в файле базы: достаточно одного соединения.
+    "journal_mode": "WAL",
+    # В режиме WAL fsync только при checkpoint; после сбоя питания могут
+    # пропасть последние транзакции, но база останется целой.
+    "synchronous": "NORMAL",
+    # Ожидание блокировки записи, миллисекунды.
+    "busy_timeout": 5000,
+    # Чтение файла через mmap, байты.
+    "mmap_size": 256 * 2**20,
+    # Кэш страниц соединения, минус - в килобайтах.
+    "cache_size": -64_000,
+    "temp_store": "MEMORY",
+}
+
+
+def pool_options(environ):
+    """Pool options from ``DATABASE_POOL_*`` in ``environ``."""
+    return {
+        name: kind(environ.get("DATABASE_POOL_%s" % name.upper(), default))
+        for name, (default, kind) in POOL_DEFAULTS.items()
+    }
+
+
+def database_config(url, conn_max_age=500, pool=None):
+    """Return a ``DATABASES`` entry for ``url``; ``pool`` - pool options."""
+    if pool is None:
+        return dj_database_url.parse(
+            url, conn_max_age=conn_max_age, conn_health_checks=True
+        )
+    config = dj_database_url.parse(url, conn_max_age=0)
+    if config["ENGINE"] != "django.db.backends.postgresql":
+        raise ImproperlyConfigured(
+            "DATABASE_POOL needs PostgreSQL, not %s." % config["ENGINE"]
+        )
+    config.setdefault("OPTIONS", {})["pool"] = pool
+    return config
+
+
+def tune_sqlite(config):
+    """Add ``SQLITE_PRAGMAS`` and ``BEGIN IMMEDIATE`` to a SQLite entry."""
+    if config["ENGINE"] != "django.db.backends.sqlite3":
+        return config
+    options = config.setdefault("OPTIONS", {})
+    options.setdefault(
+        "init_command",
+        ";".join(
+            "PRAGMA %s = %s" % pragma for pragma in SQLITE_PRAGMAS.items()
+        ),
+    )
+    options.setdefault("transaction_mode", "IMMEDIATE")
+    return config
@@ -0,0 +1,238 @@
+"""
+Prometheus metrics (``METRICS=1``) without a client library.
+
+``locallibrary.middleware.MetricsMiddleware`` times every request by URL
+name and counts its SQL queries, session writes and rate limit
+rejections; ``catalog.cache`` counts hits and misses of the page and
+fragment caches. The middleware answers ``GET /metrics`` itself, before
+sessions and rate limits, in the Prometheus text exposition format.
+
+Each worker process keeps its metrics in memory. With ``METRICS_DIR``
+set, it also writes them to ``<METRICS_DIR>/<pid>.json`` (within
+``FLUSH_INTERVAL`` seconds of a request and at exit), and ``/metrics``
+adds up the files of all workers, so whichever gunicorn worker answers
+the scrape reports the whole server. Files of stopped workers are kept so that
+counters never go back; clear the directory before starting the server.
+"""
+
+import bisect
+import hmac
+import json
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed
+
+PATH = "/metrics"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы корзин гистограммы времени ответа, секунды.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Как часто воркер записывает свои метрики в METRICS_DIR, секунды.
+FLUSH_INTERVAL = 1.0
+
+# Имя метрики: тип и описание.
+METRICS = {
+    "http_request_duration_seconds": (
+        "histogram",
+        "Time to serve a request, by URL name.",
+    ),
+    "http_request_queries_total": (
+        "counter",
+        "SQL queries run while serving requests, by URL name.",
+    ),
+    "catalog_cache_requests_total": (
+        "counter",
+        "Catalog cache lookups, by cache and result.",
+    ),
+    "session_writes_total": (
+        "counter",
+        "Requests that saved their session, by URL name.",
+    ),
+    "ratelimit_rejections_total": (
+        "counter",
+        "Requests rejected by a rate limit, by URL name.",
+    ),
+}
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Registry:
+    """Counters and histograms of one process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        # Гистограмма: число наблюдений в каждой корзине (последняя -
+        # +Inf) и их сумма.
+        self.histograms = {}
+        # Процесс, в котором уже запущен таймер записи (после fork
+        # таймер родителя в дочернем процессе не работает).
+        self.flush_scheduled = None
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(BUCKETS) + 2)
+            histogram[bisect.bisect_left(BUCKETS, value)] += 1
+            histogram[-1] += value
+
+    def dump(self):
+        with self.lock:
+            return {
+                "counters": [
+                    [name, labels, value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                "histograms": [
+                    [name, labels, list(histogram)]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def flush(self, directory):
+        """Write this process's metrics to ``directory``."""
+        path = Path(directory) / ("%d.json" % os.getpid())
+        temporary = path.with_suffix(".%d.tmp" % threading.get_ident())
+        temporary.write_text(json.dumps(self.dump()))
+        os.replace(temporary, path)
+
+    def schedule_flush(self, directory):
+        """Flush to ``directory`` in ``FLUSH_INTERVAL`` unless scheduled."""
+        with self.lock:
+            if self.flush_scheduled == os.getpid():
+                return
+            self.flush_scheduled = os.getpid()
+        timer = threading.Timer(
+            FLUSH_INTERVAL, self._scheduled_flush, [directory]
+        )
+        timer.daemon = True
+        timer.start()
+
+    def _scheduled_flush(self, directory):
+        self.flush_scheduled = None
+        self.flush(directory)
+
+
+registry = Registry()
+
+
+def enabled():
+    return getattr(settings, "METRICS", False)
+
+
+def inc(name, amount=1, **labels):
+    """Add ``amount`` to counter ``name`` if metrics are on."""
+    if enabled():
+        registry.inc(name, amount, **labels)
+
+
+def collect(directory=None):
+    """Sum the dumps of all workers in ``directory`` (or this process)."""
+    if not directory:
+        dumps = [registry.dump()]
+    else:
+        registry.flush(directory)
+        dumps = []
+        for path in Path(directory).glob("*.json"):
+            try:
+                dumps.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # Файл удалён или воркер остановлен посреди записи.
+                continue
+
+    counters, histograms = {}, {}
+    for dump in dumps:
+        for name, labels, value in dump["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in dump["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, [0] * len(values))
+            for index, value in enumerate(values):
+                total[index] += value
+    return counters, histograms
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{%s}" % ",".join(
+        '%s="%s"'
+        % (
+            key,
+            value.replace("\\", r"\\")
+            .replace('"', r"\"")
+            .replace("\n", r"\n"),
+        )
+        for key, value in labels
+    )
+
+
+def exposition(counters, histograms):
+    """Metrics in the Prometheus text format."""
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines += [
+            "# HELP %s %s" % (name, help_text),
+            "# TYPE %s %s" % (name, kind),
+        ]
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(
+                        "%s%s %s" % (name, _format_labels(labels), value)
+                    )
+            continue
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(
+                BUCKETS + ("+Inf",), values[:-1], strict=True
+            ):
+                cumulative += count
+                lines.append(
+                    "%s_bucket%s %d"
+                    % (
+                        name,
+                        _format_labels(labels + (("le", str(bound)),)),
+                        cumulative,
+                    )
+                )
+            lines.append(
+                "%s_sum%s %s" % (name, _format_labels(labels), values[-1])
+            )
+            lines.append(
+                "%s_count%s %d" % (name, _format_labels(labels), cumulative)
+            )
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """``/metrics`` response, checking ``METRICS_TOKEN`` if it is set."""
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and not hmac.compare_digest(
+        request.META.get("HTTP_AUTHORIZATION", ""), "Bearer %s" % token
+    ):
+        return HttpResponse("Unauthorized\n", status=401)
+    return HttpResponse(
+        exposition(*collect(getattr(settings, "METRICS_DIR", ""))),
+        content_type=CONTENT_TYPE,
+    )
@@ -0,0 +1,152 @@
+import atexit
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django_ratelimit.core import is_ratelimited
+from django_ratelimit.exceptions import Ratelimited
+
+from locallibrary import metrics, profiling
+
+
+def client_ip(request):
+    """
+    Client address for rate limiting behind the hosting proxy.
+
+    Each proxy appends the address it received the request from to
+    ``X-Forwarded-For``, so only the last ``TRUSTED_PROXY_COUNT`` entries
+    come from trusted proxies; the ones before them are whatever the
+    client sent. The entry added by the outermost trusted proxy is the
+    client; without trusted proxies, or when the header is shorter than
+    expected, ``REMOTE_ADDR``.
+    """
+    hops = getattr(settings, "TRUSTED_PROXY_COUNT", 0)
+    forwarded_for = [
+        address.strip()
+        for address in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+        if address.strip()
+    ]
+    if hops and len(forwarded_for) >= hops:
+        return forwarded_for[-hops]
+    return request.META["REMOTE_ADDR"]
+
+
+class GlobalRatelimitMiddleware:
+    """
+    Apply ``settings.RATELIMIT_GLOBAL`` to every request, per client IP.
+
+    The counters live in the ``RATELIMIT_USE_CACHE`` cache, so the limit
+    only holds across worker processes when that cache is shared between
+    them (see ``locallibrary.caches``).
+    """
+
+    def __init__(self, get_response):
+        self.rate = getattr(settings, "RATELIMIT_GLOBAL", None)
+        if not self.rate:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if is_ratelimited(
+            request, group="global", key="ip", rate=self.rate, increment=True
+        ):
+            # Как декоратор @ratelimit: отметка для MetricsMiddleware.
+            request.limited = True
+            raise Ratelimited
+        return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Time requests, their SQL and template rendering when
+    ``settings.REQUEST_PROFILING`` is on (see ``locallibrary.profiling``).
+
+    Meant to be first in ``MIDDLEWARE`` so that the total includes the
+    rest of the stack.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING", False):
+            raise MiddlewareNotUsed
+        profiling.instrument_templates()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        profile, response = profiling.profile_request(
+            self.get_response, request
+        )
+        total = time.perf_counter() - started
+        response["Server-Timing"] = profile.server_timing(total)
+        # Статика и 404 без view в отчёт не попадают.
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            profiling.report.record(
+                match.view_name or match._func_path, total, profile
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record request metrics and serve ``/metrics`` when
+    ``settings.METRICS`` is on (see ``locallibrary.metrics``).
+
+    Meant to be first in ``MIDDLEWARE``: scrapes are answered before the
+    session, CSRF and rate limit middleware.
+    """
+
+    # Методы вне списка считаются вместе: метка не должна зависеть от
+    # произвольной строки из запроса.
+    METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS", False):
+            raise MiddlewareNotUsed
+        self.directory = getattr(settings, "METRICS_DIR", "")
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(metrics.registry.flush, self.directory)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == metrics.PATH:
+            return metrics.metrics_view(request)
+
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match is not None else "unmatched"
+        method = request.method if request.method in self.METHODS else "other"
+        metrics.registry.observe(
+            "http_request_duration_seconds",
+            elapsed,
+            view=view,
+            method=method,
+            status=response.status_code,
+        )
+        metrics.registry.inc("http_request_queries_total", queries, view=view)
+        session = getattr(request, "session", None)
+        if session is not None and session.modified:
+            metrics.registry.inc("session_writes_total", view=view)
+        # django-ratelimit отмечает запрос сверх лимита в request.limited.
+        if getattr(request, "limited", False) and response.status_code in (
+            403,
+            429,
+        ):
+            metrics.registry.inc("ratelimit_rejections_total", view=view)
+        if self.directory:
+            metrics.registry.schedule_flush(self.directory)
+        return response
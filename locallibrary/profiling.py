@@ -0,0 +1,199 @@
+"""
+Opt-in request profiling (``REQUEST_PROFILING=1``).
+
+``locallibrary.middleware.ProfilingMiddleware`` times every request and
+collects the SQL it runs through ``connection.execute_wrapper`` and the
+time spent rendering templates. Each response gets a ``Server-Timing``
+header (shown in the browser's network panel); requests resolved to a
+view are added to a report of the slowest views and the SQL statements
+most often repeated within one request (an N+1 shows up as the same
+statement run once per row). Staff see the report at ``/profiling/``.
+
+The report is kept in the memory of the worker process: with several
+gunicorn workers each one reports the requests it served. Template time
+includes the queries run while rendering, and queries of a streaming
+response run after the middleware has returned and are not counted.
+"""
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connection
+from django.http import Http404, HttpResponseRedirect
+from django.shortcuts import render
+from django.template.backends.django import Template
+
+# Профиль запроса, который сейчас обрабатывается в этом контексте.
+_current = contextvars.ContextVar("request_profile", default=None)
+
+# Сколько разных SQL-запросов хранит отчёт.
+MAX_STATEMENTS = 1000
+
+
+class RequestProfile:
+    """SQL and template timings of one request."""
+
+    def __init__(self):
+        self.queries = []
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обёртка для connection.execute_wrapper().
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def sql_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """``{sql: repeats}`` of statements run more than once."""
+        counts = Counter(sql for sql, _ in self.queries)
+        return {sql: count - 1 for sql, count in counts.items() if count > 1}
+
+    def server_timing(self, total):
+        """``Server-Timing`` header value, durations in milliseconds."""
+        return (
+            'total;dur=%.1f, sql;dur=%.1f;desc="%d queries, %d duplicates", '
+            "template;dur=%.1f"
+            % (
+                total * 1000,
+                self.sql_time * 1000,
+                len(self.queries),
+                sum(self.duplicates().values()),
+                self.template_time * 1000,
+            )
+        )
+
+
+def profile_request(get_response, request):
+    """Call ``get_response(request)`` collecting a ``RequestProfile``."""
+    profile = RequestProfile()
+    token = _current.set(profile)
+    try:
+        with connection.execute_wrapper(profile):
+            response = get_response(request)
+    finally:
+        _current.reset(token)
+    return profile, response
+
+
+def instrument_templates():
+    """Add the render time of Django templates to the current profile."""
+    render_template = Template.render
+    if getattr(render_template, "profiled", False):
+        return
+
+    # Включённые шаблоны ({% include %}, {% extends %}) рендерятся внутри
+    # шаблона верхнего уровня и отдельно не считаются.
+    @functools.wraps(render_template)
+    def profiled_render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return render_template(self, context, request)
+        started = time.perf_counter()
+        try:
+            return render_template(self, context, request)
+        finally:
+            profile.template_time += time.perf_counter() - started
+
+    profiled_render.profiled = True
+    Template.render = profiled_render
+
+
+class Report:
+    """Per-view timings and repeated SQL aggregated over requests."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            self.statements = Counter()
+            self.statement_views = {}
+
+    def record(self, view_name, total, profile):
+        with self.lock:
+            view = self.views.setdefault(
+                view_name,
+                {
+                    "name": view_name,
+                    "requests": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "queries": 0,
+                    "sql": 0.0,
+                    "template": 0.0,
+                    "duplicates": 0,
+                },
+            )
+            view["requests"] += 1
+            view["total"] += total
+            view["max"] = max(view["max"], total)
+            view["queries"] += len(profile.queries)
+            view["sql"] += profile.sql_time
+            view["template"] += profile.template_time
+            for sql, repeats in profile.duplicates().items():
+                view["duplicates"] += repeats
+                self.statements[sql] += repeats
+                self.statement_views.setdefault(sql, set()).add(view_name)
+            if len(self.statements) > MAX_STATEMENTS:
+                # Редкие запросы вытесняются частыми.
+                kept = dict(self.statements.most_common(MAX_STATEMENTS // 2))
+                self.statements = Counter(kept)
+                self.statement_views = {
+                    sql: self.statement_views[sql] for sql in kept
+                }
+
+    def slowest_views(self, limit=20):
+        """Views by mean response time, with per-request averages."""
+        with self.lock:
+            views = [dict(view) for view in self.views.values()]
+        for view in views:
+            view["mean_queries"] = view["queries"] / view["requests"]
+            for key in ("total", "sql", "template"):
+                view["mean_%s_ms" % key] = view[key] * 1000 / view["requests"]
+            view["max_ms"] = view["max"] * 1000
+        views.sort(key=lambda view: view["mean_total_ms"], reverse=True)
+        return views[:limit]
+
+    def duplicated_sql(self, limit=20):
+        """``(sql, repeats, view names)`` by number of repeats."""
+        with self.lock:
+            return [
+                (sql, repeats, sorted(self.statement_views[sql]))
+                for sql, repeats in self.statements.most_common(limit)
+            ]
+
+
+report = Report()
+
+
+@staff_member_required
+def report_view(request):
+    """Slowest views and most repeated SQL seen by this worker."""
+    if not settings.REQUEST_PROFILING:
+        raise Http404("Request profiling is off.")
+    if request.method == "POST":
+        report.reset()
+        return HttpResponseRedirect(request.path)
+    return render(
+        request,
+        "profiling/report.html",
+        {
+            "views": report.slowest_views(),
+            "statements": report.duplicated_sql(),
+            "pid": os.getpid(),
+        },
+    )
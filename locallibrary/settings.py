@@ -14,9 +14,15 @@ import os
 from os import environ as env
 from pathlib import Path
 
-import dj_database_url
 from dotenv import load_dotenv
 
+from locallibrary.caches import cache_config
+from locallibrary.databases import (
+    database_config,
+    pool_options,
+    tune_sqlite,
+)
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -50,6 +56,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "locallibrary.middleware.MetricsMiddleware",
+    "locallibrary.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -59,7 +67,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     'csp.middleware.CSPMiddleware',
-    'django_ratelimit.middleware.RatelimitMiddleware'
+    'django_ratelimit.middleware.RatelimitMiddleware',
+    "locallibrary.middleware.GlobalRatelimitMiddleware",
 ]
 
 ROOT_URLCONF = "locallibrary.urls"
@@ -142,12 +151,64 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Redirect to home URL after login (Default redirects to /accounts/profile/)
 LOGIN_REDIRECT_URL = "/"
 
+# Профиль SQLite для нескольких воркеров (WAL, прагмы, BEGIN IMMEDIATE);
+# SQLITE_TUNING= (пусто) - настройки SQLite по умолчанию.
+SQLITE_TUNING = bool(env.get("SQLITE_TUNING", True))
+
+# Пул соединений psycopg вместо постоянных соединений (только
+# PostgreSQL). См. locallibrary/databases.py
+DATABASE_POOL = bool(env.get("DATABASE_POOL", False))
+
 if "DATABASE_URL" in os.environ:
-    DATABASES["default"] = dj_database_url.config(
-        conn_max_age=500,
-        conn_health_checks=True,
+    DATABASES["default"] = database_config(
+        env["DATABASE_URL"],
+        conn_max_age=int(env.get("DATABASE_CONN_MAX_AGE", 500)),
+        pool=pool_options(env) if DATABASE_POOL else None,
     )
 
+if SQLITE_TUNING:
+    tune_sqlite(DATABASES["default"])
+
+# Общий для всех воркеров кэш (счётчики rate limit, кэш страниц):
+# redis://... или file:///path, без CACHE_URL - LocMemCache в процессе.
+# См. locallibrary/caches.py
+CACHES = {
+    "default": cache_config(
+        env.get("CACHE_URL", ""), key_prefix=env.get("CACHE_KEY_PREFIX", "")
+    ),
+}
+
+# Сессии читаются из кэша и пишутся в БД только при изменении.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# Почта (уведомления о просрочке, manage.py scan_overdue). Без
+# EMAIL_BACKEND письма выводятся в консоль.
+EMAIL_BACKEND = env.get(
+    "EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend"
+)
+EMAIL_HOST = env.get("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(env.get("EMAIL_PORT", 25))
+EMAIL_HOST_USER = env.get("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = env.get("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = bool(env.get("EMAIL_USE_TLS", False))
+DEFAULT_FROM_EMAIL = env.get("DEFAULT_FROM_EMAIL", "library@localhost")
+
+# Асинхронные варианты страниц каталога (catalog/async_views.py).
+# Выключено и под ASGI: с синхронными middleware они медленнее
+# синхронных views.
+CATALOG_ASYNC_VIEWS = bool(env.get("CATALOG_ASYNC_VIEWS", False))
+
+# Профилирование запросов: заголовок Server-Timing и отчёт /profiling/
+# для сотрудников (locallibrary/profiling.py). Только для отладки.
+REQUEST_PROFILING = bool(env.get("REQUEST_PROFILING", False))
+
+# Метрики Prometheus по адресу /metrics (locallibrary/metrics.py).
+# METRICS_DIR - общий каталог воркеров gunicorn; METRICS_TOKEN - токен
+# для заголовка "Authorization: Bearer ...".
+METRICS = bool(env.get("METRICS", False))
+METRICS_DIR = env.get("METRICS_DIR", "")
+METRICS_TOKEN = env.get("METRICS_TOKEN", "")
+
 STORAGES = {
     # ...
     "staticfiles": {
@@ -199,8 +260,7 @@ else:
     # rate limiting
     RATELIMIT_ENABLE = True
     RATELIMIT_GLOBAL = '100/h' # Глобальный лимит на 100 запросов/час на IP
-    CACHES = {
-        'default': {
-            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        }
-    }
\ No newline at end of file
+    # За прокси REMOTE_ADDR - адрес прокси, клиент берётся из X-Forwarded-For:
+    # запись, добавленная внешним из TRUSTED_PROXY_COUNT доверенных прокси
+    TRUSTED_PROXY_COUNT = int(env.get("TRUSTED_PROXY_COUNT", 1))
+    RATELIMIT_IP_META_KEY = "locallibrary.middleware.client_ip"
@@ -21,8 +21,11 @@ from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import RedirectView
 
+from locallibrary import profiling
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("profiling/", profiling.report_view, name="profiling-report"),
 ]
 
 